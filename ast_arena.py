@@ -0,0 +1,216 @@
+# ast_arena.py
+from array import array
+from parser import ASTNode
+
+NO_NODE = -1
+
+class ASTArena:
+    """Struct-of-arrays storage for an AST.
+
+    Node i is described by kinds[i] (index into kind_names), values[i]
+    (index into value_table, -1 for None), lines[i] and the first_child /
+    next_sibling links. ArenaNode views expose the usual node.type /
+    node.children / node.value / node.lineno interface on top of it.
+    """
+
+    def __init__(self):
+        self.kind_names = [None]           # kind 0 marks a None child
+        self.kind_ids = {None: 0}
+        self.value_table = []
+        self.value_ids = {}
+        self.kinds = array('H')
+        self.values = array('i')
+        self.lines = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @classmethod
+    def from_tree(cls, root):
+        arena = cls()
+        arena.root = arena.adopt(root)
+        return arena
+
+    @property
+    def root(self):
+        return self._root
+
+    @root.setter
+    def root(self, index):
+        self._root = ArenaNode(self, index)
+
+    def kind_id(self, type_):
+        kind = self.kind_ids.get(type_)
+        if kind is None:
+            kind = len(self.kind_names)
+            self.kind_names.append(type_)
+            self.kind_ids[type_] = kind
+        return kind
+
+    def value_id(self, value):
+        if value is None:
+            return NO_NODE
+        # 1, 1.0 and True compare equal, so the type is part of the key
+        key = (type(value), value)
+        index = self.value_ids.get(key)
+        if index is None:
+            index = len(self.value_table)
+            self.value_table.append(value)
+            self.value_ids[key] = index
+        return index
+
+    def add(self, type_, value=None, lineno=None):
+        self.kinds.append(self.kind_id(type_))
+        self.values.append(self.value_id(value))
+        self.lines.append(NO_NODE if lineno is None else lineno)
+        self.first_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        return len(self.kinds) - 1
+
+    def adopt(self, node):
+        """Return the arena index for node, copying plain ASTNode subtrees
+        into the arena (iteratively, so depth is unbounded)."""
+        if isinstance(node, ArenaNode) and node.arena is self:
+            return node.index
+        if node is None:
+            return self.add(None)
+
+        root = self.add(node.type, node.value, node.lineno)
+        stack = [(node, root)]
+        while stack:
+            current, index = stack.pop()
+            prev = NO_NODE
+            for child in current.children:
+                if isinstance(child, ArenaNode) and child.arena is self:
+                    child_index = child.index
+                else:
+                    child_index = self.add(
+                        None if child is None else child.type,
+                        None if child is None else child.value,
+                        None if child is None else child.lineno)
+                    if child is not None and child.children:
+                        stack.append((child, child_index))
+                self._link(index, prev, child_index)
+                prev = child_index
+            if prev != NO_NODE:
+                self.next_sibling[prev] = NO_NODE
+        return root
+
+    def _link(self, parent, prev, child):
+        if prev == NO_NODE:
+            self.first_child[parent] = child
+        else:
+            self.next_sibling[prev] = child
+
+    def child_indices(self, index):
+        result = []
+        child = self.first_child[index]
+        next_sibling = self.next_sibling
+        while child != NO_NODE:
+            result.append(child)
+            child = next_sibling[child]
+        return result
+
+    def set_children(self, index, children):
+        # A node has a single parent: re-linking an existing view moves it
+        indices = [self.adopt(child) for child in children]
+        self.first_child[index] = NO_NODE
+        prev = NO_NODE
+        for child_index in indices:
+            self._link(index, prev, child_index)
+            prev = child_index
+        if prev != NO_NODE:
+            self.next_sibling[prev] = NO_NODE
+
+    def to_tree(self, index=None):
+        """Materialize plain ASTNode objects for the subtree at index."""
+        if index is None:
+            index = self._root.index
+        root = self._make_node(index)
+        stack = [(root, index)]
+        while stack:
+            node, node_index = stack.pop()
+            for child_index in self.child_indices(node_index):
+                child = self._make_node(child_index)
+                node.children.append(child)
+                if child is not None:
+                    stack.append((child, child_index))
+        return root
+
+    def _make_node(self, index):
+        type_ = self.kind_names[self.kinds[index]]
+        if type_ is None:
+            return None
+        value = self.values[index]
+        line = self.lines[index]
+        return ASTNode(type_,
+                       value=None if value == NO_NODE else self.value_table[value],
+                       lineno=None if line == NO_NODE else line)
+
+    def nbytes(self):
+        """Size of the array buffers (excluding the shared value table)."""
+        return sum(buf.itemsize * len(buf) for buf in
+                   (self.kinds, self.values, self.lines, self.first_child, self.next_sibling))
+
+class ArenaNode:
+    """Thin view of one arena slot with the ASTNode attribute interface."""
+
+    __slots__ = ('arena', 'index')
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+    @property
+    def type(self):
+        return self.arena.kind_names[self.arena.kinds[self.index]]
+
+    @type.setter
+    def type(self, type_):
+        self.arena.kinds[self.index] = self.arena.kind_id(type_)
+
+    @property
+    def value(self):
+        value = self.arena.values[self.index]
+        return None if value == NO_NODE else self.arena.value_table[value]
+
+    @value.setter
+    def value(self, value):
+        self.arena.values[self.index] = self.arena.value_id(value)
+
+    @property
+    def lineno(self):
+        line = self.arena.lines[self.index]
+        return None if line == NO_NODE else line
+
+    @lineno.setter
+    def lineno(self, lineno):
+        self.arena.lines[self.index] = NO_NODE if lineno is None else lineno
+
+    @property
+    def children(self):
+        arena = self.arena
+        kinds = arena.kinds
+        return [ArenaNode(arena, i) if kinds[i] else None
+                for i in arena.child_indices(self.index)]
+
+    @children.setter
+    def children(self, children):
+        self.arena.set_children(self.index, children)
+
+    def __eq__(self, other):
+        return (isinstance(other, ArenaNode) and other.arena is self.arena
+                and other.index == self.index)
+
+    def __hash__(self):
+        return hash((id(self.arena), self.index))
+
+    def __repr__(self):
+        value = self.value
+        if value is not None:
+            return f"{self.type}({value})"
+        return f"{self.type}"
+
+__all__ = ['ASTArena', 'ArenaNode']
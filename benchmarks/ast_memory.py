@@ -0,0 +1,94 @@
+# Memory of a generated ~1M-node AST: old dict-backed nodes, __slots__
+# ASTNode, and the ASTArena struct-of-arrays store
+import gc
+import sys
+import time
+import tracemalloc
+
+from ast_arena import ASTArena
+from parser import ASTNode
+
+
+class DictNode:
+    # The pre-__slots__ ASTNode layout
+    def __init__(self, type_, children=None, value=None, lineno=None):
+        self.type = type_
+        self.children = children if children is not None else []
+        self.value = value
+        self.lineno = lineno
+
+
+def build_program(make, target_nodes):
+    """Shape of what CParser produces for
+        int fN(int a, int b) { int x = a + b * K; x = x - a; ... return x; }
+    repeated until about target_nodes nodes exist."""
+    functions = []
+    count = 1
+    line = 1
+    n = 0
+    while count < target_nodes:
+        stmts = []
+        for k in range(20):
+            expr = make('PLUS', [make('Variable', value='a', lineno=line),
+                                 make('TIMES', [make('Variable', value='b', lineno=line),
+                                                make('Literal', value=k, lineno=line)], lineno=line)],
+                        lineno=line)
+            stmts.append(make('VarDecl', [make('Type', value='int', lineno=line),
+                                          make('ID', value=f'x{k}', lineno=line), expr], lineno=line))
+            line += 1
+        stmts.append(make('Return', [make('Variable', value='x0', lineno=line)], lineno=line))
+        params = make('Params', [
+            make('Param', [make('Type', value='int', lineno=line), make('ID', value='a', lineno=line)], lineno=line),
+            make('Param', [make('Type', value='int', lineno=line), make('ID', value='b', lineno=line)], lineno=line),
+        ], lineno=line)
+        functions.append(make('Function', [make('Type', value='int', lineno=line),
+                                           make('ID', value=f'f{n}', lineno=line),
+                                           params, make('Block', stmts, lineno=line)], lineno=line))
+        count += 20 * 8 + 2 + 7 + 4
+        n += 1
+    return make('Program', functions, lineno=1)
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def count_nodes(root):
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(c for c in node.children if c is not None)
+    return count
+
+
+def main(target=1_000_000):
+    mk_dict = lambda t, c=None, value=None, lineno=None: DictNode(t, c, value, lineno)
+    mk_slot = lambda t, c=None, value=None, lineno=None: ASTNode(t, c, value, lineno)
+
+    tree, dict_bytes, dict_time = measure(lambda: build_program(mk_dict, target))
+    nodes = count_nodes(tree)
+    del tree
+
+    tree, slot_bytes, slot_time = measure(lambda: build_program(mk_slot, target))
+    arena, arena_total, arena_time = measure(lambda: ASTArena.from_tree(tree))
+    del tree
+    gc.collect()
+
+    print(f"nodes: {nodes}")
+    print(f"{'dict ASTNode':<16}{dict_bytes / 2**20:9.1f} MiB {dict_bytes / nodes:7.1f} B/node  build {dict_time:6.2f}s")
+    print(f"{'__slots__':<16}{slot_bytes / 2**20:9.1f} MiB {slot_bytes / nodes:7.1f} B/node  build {slot_time:6.2f}s")
+    print(f"{'ASTArena':<16}{arena_total / 2**20:9.1f} MiB {arena_total / nodes:7.1f} B/node  "
+          f"convert {arena_time:6.2f}s (arrays {arena.nbytes() / 2**20:.1f} MiB)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,74 @@
+# Inlining and compile-time evaluation of calls: executed VM instructions
+# with the AST optimizer's interprocedural steps off and on, for generated
+# programs (pure functions called from main with constant arguments) and a
+# loop calling small helpers on variables, plus the added optimizer time.
+import sys
+import time
+
+from benchmarks.program_generator import make_program
+from intermediate_code_generator import IRGenerator
+from ir_optimizer import optimize_ir
+from optimizer import Optimizer
+from parser import get_parser
+from traversal import clone
+from vm import VMError, run_program
+
+HELPERS = """
+int square(int x) {
+    return x * x;
+}
+
+int clamp(int v, int low, int high) {
+    int below = v < low;
+    int above = v > high;
+    return v + below * (low - v) + above * (high - v);
+}
+
+int poly(int x) {
+    int s = square(x);
+    return s * 3 + x * 2 + 1;
+}
+
+int main() {
+    int i = 0;
+    int total = 0;
+    while (i < 20000) {
+        int p = poly(i - 50);
+        total = total + clamp(p, 0, 5000);
+        i = i + 1;
+    }
+    return total + square(12);
+}
+"""
+
+
+def steps(ast, inline, eval_budget):
+    start = time.perf_counter()
+    tree, stats = Optimizer(inline=inline, eval_budget=eval_budget).optimize(clone(ast))
+    elapsed = time.perf_counter() - start
+    generator = IRGenerator()
+    generator.generate(tree)
+    program, _ = optimize_ir(generator.get_ir())
+    return run_program(program, max_steps=50_000_000), stats, elapsed
+
+
+def main(seeds=20):
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    parser = get_parser()
+    cases = [('helpers', parser.parse(HELPERS))]
+    cases += [(f'generated {seed}', parser.parse(make_program(seed, loop_bound=30)))
+              for seed in range(seeds)]
+    print(f"{'program':<14}{'steps':>12}{'+ calls':>12}{'inlined':>9}{'evaluated':>10}{'extra ms':>10}")
+    for name, ast in cases:
+        try:
+            before, _, plain_time = steps(ast, False, 0)
+        except VMError:
+            continue
+        after, stats, time_with = steps(ast, True, Optimizer().eval_budget)
+        assert before.value == after.value, name
+        print(f"{name:<14}{before.steps:12,d}{after.steps:12,d}{stats['inline']:9d}"
+              f"{stats['call_eval']:10d}{(time_with - plain_time) * 1e3:10.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
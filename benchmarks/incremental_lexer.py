@@ -0,0 +1,62 @@
+# Re-lexing cost after a one-line edit: full CLexer pass vs IncrementalLexer
+import sys
+import time
+
+from lexer import CLexer, IncrementalLexer
+
+
+def make_source(lines):
+    body = []
+    for i in range(lines):
+        body.append(f"    int v{i} = v{i - 1} * {i % 97} + {i % 13}; /* line {i} */")
+    return "int main() {\n    int v-1 = 0;\n" + "\n".join(body) + "\n    return 0;\n}\n"
+
+
+def full_lex(text):
+    lexer = CLexer()
+    lexer.input(text)
+    count = 0
+    while lexer.token():
+        count += 1
+    return count
+
+
+def main(lines=100_000, edits=50):
+    text = make_source(lines)
+
+    start = time.perf_counter()
+    count = full_lex(text)
+    full = time.perf_counter() - start
+
+    inc = IncrementalLexer()
+    inc.lex(text)
+    line_starts = [0]
+    for i, ch in enumerate(text):
+        if ch == '\n':
+            line_starts.append(i + 1)
+
+    elapsed = 0.0
+    relexed = 0
+    for k in range(edits):
+        line = (k * 7919) % lines + 2
+        pos = line_starts[line] + 4
+        # Same-length edit keeps line_starts valid for the next iteration
+        start = time.perf_counter()
+        inc.edit(pos, pos + 3, "int")
+        elapsed += time.perf_counter() - start
+        relexed += inc.relexed
+
+    start = time.perf_counter()
+    inc.edit(len(text) // 2, len(text) // 2, "\n    x = 1;\n")
+    insert = time.perf_counter() - start
+
+    print(f"source: {lines} lines, {count} tokens")
+    print(f"full re-lex          {full * 1e3:10.2f} ms")
+    print(f"incremental edit     {elapsed / edits * 1e3:10.2f} ms  "
+          f"({relexed / edits:.1f} tokens re-lexed per edit)")
+    print(f"line insertion       {insert * 1e3:10.2f} ms  (shifts line numbers of the tail)")
+    assert len(inc.tokens) == full_lex(inc.text)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,86 @@
+# Identifier interning on an identifier-heavy program: retained memory of the
+# parsed AST with fresh strings per token vs shared Names, and the cost of
+# name-keyed lookups (fresh str keys, Names, integer ids).
+import gc
+import sys
+import time
+import tracemalloc
+
+from lexer import CLexer
+from names import name_id
+from parser import get_parser
+from traversal import walk
+
+
+class FreshLexer(CLexer):
+    # The lexer before interning: every identifier is a new str object
+    def t_ID(self, t):
+        r'[a-zA-Z_][a-zA-Z0-9_]*'
+        t.type = self.reserved.get(t.value, 'ID')
+        return t
+
+
+def make_source(names, statements):
+    lines = ["int main() {"]
+    lines += [f"    int accumulator_{i} = {i};" for i in range(names)]
+    for s in range(statements):
+        a, b, c = s % names, (s * 7 + 3) % names, (s * 13 + 5) % names
+        lines.append(f"    accumulator_{a} = accumulator_{b} + accumulator_{c} * accumulator_{a};")
+    lines.append("    return accumulator_0;")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def retained_ast(parser, source):
+    gc.collect()
+    tracemalloc.start()
+    ast = parser.parse(source)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return ast, size
+
+
+def lookup_time(keys, table, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for key in keys:
+            table[key]
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(names=200, statements=50_000):
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    source = make_source(names, statements)
+    parser = get_parser()
+
+    interned_ast, interned_bytes = retained_ast(parser, source)
+    shared = parser.lexer
+    parser.lexer = FreshLexer()
+    fresh_ast, fresh_bytes = retained_ast(parser, source)
+    parser.lexer = shared
+
+    print(f"{statements:,} statements over {names} names")
+    print(f"retained AST: fresh strings {fresh_bytes / 2**20:.1f} MiB, "
+          f"interned {interned_bytes / 2**20:.1f} MiB ({1 - interned_bytes / fresh_bytes:.0%} less)")
+
+    fresh = [node.value for node, _ in walk(fresh_ast) if node.type == 'Variable']
+    interned = [node.value for node, _ in walk(interned_ast) if node.type == 'Variable']
+    ids = [name_id(value) for value in interned]
+    # Tables keyed by the declarations' own name objects, as a symbol table is
+    def declared(ast):
+        return [node.children[1].value for node, _ in walk(ast) if node.type == 'VarDecl']
+    by_fresh = {name: i for i, name in enumerate(declared(fresh_ast))}
+    by_name = {name: i for i, name in enumerate(declared(interned_ast))}
+    by_id = {name_id(name): i for i, name in enumerate(declared(interned_ast))}
+
+    fresh_time = lookup_time(fresh, by_fresh)
+    name_time = lookup_time(interned, by_name)
+    id_time = lookup_time(ids, by_id)
+    print(f"{len(fresh):,} lookups: fresh str {fresh_time * 1e3:.1f} ms, "
+          f"Name {name_time * 1e3:.1f} ms, int id {id_time * 1e3:.1f} ms")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
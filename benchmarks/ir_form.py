@@ -0,0 +1,70 @@
+# IR generation as formatted strings (the old self.code list) vs the
+# structured IRProgram arrays: generation time and retained memory.
+import gc
+import sys
+import time
+import tracemalloc
+
+from benchmarks.optimizer_fused import make_source
+from intermediate_code_generator import IRGenerator
+from ir import NONE, format_instruction
+from parser import get_parser
+
+
+class TextIRGenerator(IRGenerator):
+    """Formats every instruction when it is emitted, like the old generator."""
+
+    def __init__(self):
+        super().__init__()
+        self.code = []
+
+    def emit(self, op, dst=NONE, a=NONE, b=NONE):
+        self.code.append(format_instruction(self.operands, op, dst, a, b))
+
+
+def timed(generator_class, ast, repeat=3):
+    # Timed without tracemalloc, which slows allocation-heavy code down a lot
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        generator_class().generate(ast)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def retained(generator_class, ast):
+    gc.collect()
+    tracemalloc.start()
+    generator = generator_class()
+    generator.generate(ast)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return generator, current
+
+
+def main(functions=2000):
+    ast = get_parser().parse(make_source(functions))
+
+    text_time = timed(TextIRGenerator, ast)
+    struct_time = timed(IRGenerator, ast)
+    text_gen, text_mem = retained(TextIRGenerator, ast)
+    struct_gen, struct_mem = retained(IRGenerator, ast)
+    count = len(struct_gen.program)
+    assert struct_gen.get_code() == text_gen.code
+
+    start = time.perf_counter()
+    struct_gen.program._text = None
+    struct_gen.program.to_text()
+    render = time.perf_counter() - start
+
+    print(f"{count} instructions, {len(struct_gen.operands)} operands")
+    print(f"{'strings':<12}{text_time * 1e3:9.1f} ms {text_mem / 2**20:8.2f} MiB "
+          f"{text_mem / count:6.1f} B/instr")
+    print(f"{'structured':<12}{struct_time * 1e3:9.1f} ms {struct_mem / 2**20:8.2f} MiB "
+          f"{struct_mem / count:6.1f} B/instr  (arrays {struct_gen.program.nbytes() / 2**20:.2f} MiB)")
+    print(f"to_text() on demand {render * 1e3:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
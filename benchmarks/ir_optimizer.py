@@ -0,0 +1,61 @@
+# IR optimizer scaling: one generated function of growing size, timing the
+# CFG/liveness passes and the instruction counts before and after.
+import random
+import sys
+import time
+
+from intermediate_code_generator import IRGenerator
+from ir_optimizer import IROptimizer
+from parser import get_parser
+
+
+def make_function(statements, seed=1):
+    rng = random.Random(seed)
+    names = ['p', 'q']
+    out = ["int big(int p, int q) {"]
+    for s in range(statements):
+        kind = rng.randrange(5)
+        a, b = rng.choice(names), rng.choice(names)
+        name = f"v{s}"
+        if kind == 0:
+            out.append(f"    int {name} = {a} + {b} * {rng.randint(1, 9)};")
+        elif kind == 1:
+            out.append(f"    int {name} = ({a} + {b}) * ({a} + {b});")
+        elif kind == 2:
+            out.append(f"    int {name} = {a};")
+            out.append(f"    if ({a} < {b}) {{ {name} = {name} + 1; }} else {{ {name} = {b}; }}")
+        elif kind == 3:
+            out.append(f"    int {name} = 0;")
+            out.append(f"    while ({name} < {a}) {{ {name} = {name} + {b}; }}")
+        else:
+            out.append(f"    int {name} = {a} - {b};")
+            out.append(f"    {name} = {a} * 2;")
+        names.append(name)
+        if len(names) > 12:
+            names.pop(2)
+    out.append(f"    return {names[-1]};")
+    out.append("}")
+    return "\n".join(out) + "\n"
+
+
+def main(statements=2000, steps=4):
+    parser = get_parser()
+    print(f"{'instrs':>8} {'after':>8} {'ms':>9} {'us/instr':>9}  copies   cse  dead")
+    for step in range(steps):
+        size = statements << step
+        generator = IRGenerator()
+        generator.generate(parser.parse(make_function(size)))
+        program = generator.get_ir()
+
+        start = time.perf_counter()
+        _, stats = IROptimizer().optimize(program)
+        elapsed = time.perf_counter() - start
+
+        count = stats['instructions_before']
+        print(f"{count:8d} {stats['instructions_after']:8d} {elapsed * 1e3:9.1f} "
+              f"{elapsed * 1e6 / count:9.2f}  {stats['copies_propagated']:6d} "
+              f"{stats['cse']:5d} {stats['dead_stores']:5d}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
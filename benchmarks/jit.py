@@ -0,0 +1,77 @@
+# Python-source JIT vs the bytecode VM on a loop-heavy and a call-heavy
+# program, plus cold and cached JIT compile times.
+import sys
+import time
+
+from intermediate_code_generator import IRGenerator
+from ir_optimizer import optimize_ir
+from jit import CodeCache, compile_program
+from optimizer import optimize_ast
+from parser import get_parser
+from traversal import clone
+from vm import VM, assemble
+
+LOOPS = """
+int main() {
+    int i = 0;
+    int total = 0;
+    while (i < %d) {
+        int j = 0;
+        while (j < 10) {
+            if (j - j / 2 * 2 == 0) {
+                total = total + i * j;
+            } else {
+                total = total - j;
+            }
+            j = j + 1;
+        }
+        i = i + 1;
+    }
+    return total;
+}
+"""
+
+CALLS = """
+int fib(int n) {
+    if (n < 2) {
+        return n;
+    }
+    return fib(n - 1) + fib(n - 2);
+}
+
+int main() {
+    return fib(%d);
+}
+"""
+
+
+def measure(name, source):
+    ast, _ = optimize_ast(get_parser().parse(source))
+
+    generator = IRGenerator()
+    generator.generate(clone(ast))
+    program, _ = optimize_ir(generator.get_ir())
+    vm_run = VM(assemble(program)).run('main')
+
+    cache = CodeCache()
+    start = time.perf_counter()
+    jit_program = compile_program(ast, cache)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    compile_program(ast, cache)
+    warm = time.perf_counter() - start
+    jit_run = jit_program.run('main')
+    assert jit_run.value == vm_run.value
+
+    print(f"{name:<8} vm {vm_run.seconds:7.3f} s ({vm_run.steps:,} steps)   "
+          f"jit {jit_run.seconds:7.3f} s   {vm_run.seconds / jit_run.seconds:5.1f}x   "
+          f"compile {cold * 1e3:.2f} ms cold / {warm * 1e3:.2f} ms cached")
+
+
+def main(iterations=100_000, fib=24):
+    measure('loops', LOOPS % iterations)
+    measure('calls', CALLS % fib)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
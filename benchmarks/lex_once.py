@@ -0,0 +1,52 @@
+# Lexing twice (a token list for display, then the parser's own lexer) vs
+# lexing once and replaying the buffered tokens, vs streaming tokens lazily
+# into the parser with nothing kept.
+import gc
+import sys
+import time
+
+from benchmarks.program_generator import make_program
+from parser import get_parser
+from pipeline import lex_source
+
+
+def lex_twice(parser, source):
+    tokens = lex_source(source, parser.lexer)
+    return tokens, parser.parse(source)
+
+
+def lex_once(parser, source):
+    tokens = lex_source(source, parser.lexer)
+    return tokens, parser.parse(tokens=tokens)
+
+
+def streamed(parser, source):
+    return None, parser.parse(source)
+
+
+def best_of(fn, parser, source, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn(parser, source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(functions=(10, 40, 160), repeat=3):
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    parser = get_parser()
+    print(f"{'tokens':>8}{'lex twice':>12}{'lex once':>12}{'streamed':>12}{'saving':>9}")
+    for count in functions:
+        source = make_program(1, functions=count, statements=20)
+        tokens = len(lex_source(source, parser.lexer))
+        twice = best_of(lex_twice, parser, source, repeat)
+        once = best_of(lex_once, parser, source, repeat)
+        stream = best_of(streamed, parser, source, repeat)
+        print(f"{tokens:>8}{twice * 1e3:10.1f}ms{once * 1e3:10.1f}ms{stream * 1e3:10.1f}ms"
+              f"{1 - once / twice:9.0%}")
+
+
+if __name__ == '__main__':
+    main(tuple(int(n) for n in sys.argv[1].split(',')) if len(sys.argv) > 1 else (10, 40, 160))
@@ -0,0 +1,101 @@
+# Loop optimizations on loop-heavy kernels: executed VM instructions and
+# multiplications left inside loops with the IR optimizer's loop pass off
+# and on (after the AST optimizer, as the pipeline runs).
+import sys
+
+from cfg import FunctionCFG, function_ranges
+from intermediate_code_generator import IRGenerator
+from ir import Op
+from ir_optimizer import IROptimizer
+from loops import natural_loops
+from optimizer import optimize_ast
+from parser import get_parser
+from ssa import dominators
+from vm import run_program
+
+KERNELS = {
+    'row sums': """
+int main() {{
+    int total = 0;
+    int width = 12;
+    int row = 0;
+    while (row < {n}) {{
+        int col = 0;
+        while (col < width) {{
+            total = total + row * width + col * 4;
+            col = col + 1;
+        }}
+        row = row + 1;
+    }}
+    return total;
+}}
+""",
+    'invariant math': """
+int mix(int a, int b) {{
+    int i = 0;
+    int acc = 0;
+    while (i < {n}) {{
+        int scale = a * b + a / b;
+        int offset = scale * 2 - b;
+        acc = acc + i * 8 + scale - offset;
+        i = i + 1;
+    }}
+    return acc;
+}}
+
+int main() {{
+    return mix(7, 3);
+}}
+""",
+    'params': """
+int kernel(int n, int k, int base) {{
+    int i = 0;
+    int sum = 0;
+    while (i < n) {{
+        int stride = k * 16 + base;
+        sum = sum + stride + i * 6;
+        i = i + 2;
+    }}
+    return sum;
+}}
+
+int main() {{
+    return kernel({n}, 3, 5) + kernel({n} / 2, 7, 1);
+}}
+""",
+}
+
+
+def loop_multiplies(program):
+    """Static MUL instructions inside any loop."""
+    count = 0
+    for start, end in function_ranges(program):
+        cfg = FunctionCFG(program, start, end)
+        inside = set()
+        for loop in natural_loops(cfg, dominators(cfg)):
+            inside |= loop.blocks
+        for block in cfg.blocks:
+            if block.index in inside:
+                count += sum(instr[0] == Op.MUL for _, instr in cfg.instructions(block))
+    return count
+
+
+def main(n=20_000):
+    parser = get_parser()
+    print(f"{'kernel':<16}{'steps':>12}{'+ loops':>12}{'saved':>8}{'muls':>6}{'+ loops':>9}  hoisted  reduced")
+    for name, template in KERNELS.items():
+        ast, _ = optimize_ast(parser.parse(template.format(n=n)))
+        generator = IRGenerator()
+        generator.generate(ast)
+        program = generator.get_ir()
+        plain, _ = IROptimizer(loops=False).optimize(program)
+        looped, stats = IROptimizer().optimize(program)
+        before, after = run_program(plain), run_program(looped)
+        assert before.value == after.value, name
+        print(f"{name:<16}{before.steps:12,d}{after.steps:12,d}{1 - after.steps / before.steps:8.1%}"
+              f"{loop_multiplies(plain):6d}{loop_multiplies(looped):9d}"
+              f"  {stats['licm_hoisted']:7d}  {stats['iv_reduced']:7d}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,78 @@
+# Differential check of the x86-64 backend: random programs are compiled with
+# codegen.CodeGenerator, assembled and linked by the system gcc, and the
+# value main() returns is compared with the bytecode VM as reference.
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.program_generator import make_program
+from codegen import CodeGenerator
+from intermediate_code_generator import IRGenerator
+from ir_optimizer import optimize_ir
+from parser import get_parser
+from vm import VMError, run_program
+
+# main() is renamed to mc_main in the object file so the driver can print
+# the full 64-bit result instead of an 8-bit exit status
+DRIVER = """#include <stdio.h>
+long mc_main(void);
+int main(void) { printf("%ld\\n", mc_main()); return 0; }
+"""
+
+
+def wrap64(value):
+    return (value + 2**63) % 2**64 - 2**63
+
+
+def run_native(asm_lines, workdir):
+    asm = os.path.join(workdir, 'prog.s')
+    obj = os.path.join(workdir, 'prog.o')
+    driver = os.path.join(workdir, 'driver.c')
+    exe = os.path.join(workdir, 'prog')
+    with open(asm, 'w') as f:
+        f.write("\n".join(asm_lines) + "\n")
+    with open(driver, 'w') as f:
+        f.write(DRIVER)
+    subprocess.run(['gcc', '-c', asm, '-o', obj], check=True, capture_output=True)
+    subprocess.run(['objcopy', '--redefine-sym', 'main=mc_main', obj], check=True)
+    subprocess.run(['gcc', driver, obj, '-o', exe], check=True, capture_output=True)
+    output = subprocess.run([exe], check=True, capture_output=True, text=True, timeout=10)
+    return int(output.stdout.split()[-1])
+
+
+def main(count=50, first_seed=0):
+    if shutil.which('gcc') is None or shutil.which('objcopy') is None:
+        print("gcc and objcopy are required")
+        return 1
+    parser = get_parser()
+    passed = failed = skipped = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        for seed in range(first_seed, first_seed + count):
+            generator = IRGenerator()
+            generator.generate(parser.parse(make_program(seed)))
+            plain = generator.get_ir()
+            for label, program in (('plain', plain), ('optimized', optimize_ir(plain)[0])):
+                try:
+                    expected = wrap64(run_program(program, max_steps=1_000_000).value)
+                except VMError:
+                    skipped += 1
+                    continue
+                try:
+                    actual = run_native(CodeGenerator(program).generate(), workdir)
+                except subprocess.CalledProcessError as error:
+                    print(f"seed {seed} ({label}): toolchain failed: {error.stderr}")
+                    failed += 1
+                    continue
+                if actual == expected:
+                    passed += 1
+                else:
+                    print(f"seed {seed} ({label}): native {actual}, reference {expected}")
+                    failed += 1
+    print(f"{passed} passed, {failed} failed, {skipped} skipped")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*(int(arg) for arg in sys.argv[1:3])))
@@ -0,0 +1,77 @@
+# Fused worklist optimizer vs the original four-pass pipeline on a generated
+# program: wall time and how many rewrites each finds; then the fused
+# optimizer on an ASTArena root, which must give the same tree.
+import random
+import sys
+import time
+
+from ast_arena import ASTArena
+from optimizer import Optimizer
+from parser import get_parser
+from traversal import clone, subtree_hash, walk
+
+
+def make_source(functions, seed=1):
+    rng = random.Random(seed)
+    out = ["int add(int x, int y) {", "    return x + y;", "}"]
+    for f in range(functions):
+        out.append(f"int f{f}(int p, int q) {{")
+        out.append("    int a = 3;")
+        out.append(f"    int b = a * {rng.randint(1, 9)} + 0;")
+        out.append("    int c = add(p, b);")
+        for s in range(20):
+            kind = rng.randrange(4)
+            if kind == 0:
+                out.append(f"    int v{s} = p * 1 + {rng.randint(0, 9)} + {rng.randint(0, 9)};")
+            elif kind == 1:
+                out.append(f"    int v{s} = (a + b) * (q - 0) / 1;")
+            elif kind == 2:
+                out.append(f"    int v{s} = b;")
+                out.append(f"    if (a < b) {{ v{s} = v{s} + 1; }} else {{ v{s} = 0; }}")
+            else:
+                out.append(f"    int v{s} = 0;")
+                out.append(f"    while (v{s} < q) {{ v{s} = v{s} + a * 2; }}")
+        out.append("    return b;")
+        out.append("    a = 1;")
+        out.append("}")
+    return "\n".join(out) + "\n"
+
+
+def count_nodes(root):
+    return sum(1 for _ in walk(root))
+
+
+def main(functions=2000):
+    source = make_source(functions)
+    ast = get_parser().parse(source)
+    print(f"{functions} functions, {count_nodes(ast)} AST nodes")
+
+    tree = clone(ast)
+    start = time.perf_counter()
+    passes_tree, removed = Optimizer().optimize_passes(tree)
+    passes = time.perf_counter() - start
+
+    tree = clone(ast)
+    start = time.perf_counter()
+    fused_tree, stats = Optimizer().optimize(tree)
+    fused = time.perf_counter() - start
+
+    print(f"four passes   {passes * 1e3:9.1f} ms   {count_nodes(passes_tree):8d} nodes left "
+          f"(removed_count={removed})")
+    print(f"fused         {fused * 1e3:9.1f} ms   {count_nodes(fused_tree):8d} nodes left "
+          f"({passes / fused:.2f}x)")
+    for rule, count in stats.items():
+        print(f"    {rule:<22}{count:8d}")
+
+    arena = ASTArena.from_tree(clone(ast))
+    start = time.perf_counter()
+    arena_tree, arena_stats = Optimizer().optimize(arena.root)
+    elapsed = time.perf_counter() - start
+    assert arena_stats == stats and subtree_hash(arena_tree) == subtree_hash(fused_tree), \
+        "optimizer differs on an arena root"
+    print(f"fused, arena  {elapsed * 1e3:9.1f} ms   {count_nodes(arena_tree):8d} nodes left "
+          f"(same tree)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
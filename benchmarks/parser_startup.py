@@ -0,0 +1,44 @@
+# Compare the cost of getting a ready-to-use CParser:
+#   cold   - full LALR construction from the p_* docstrings (old behaviour)
+#   cached - signature check + load of the persisted parsetab.py
+#   CParser() - construction once this process already holds the tables
+#   shared - get_parser() returning the process-wide instance
+import sys
+import time
+
+import ply.yacc as yacc
+
+from parser import CParser, TABLE_MODULE, get_parser
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def yacc_build(tabmodule):
+    instance = CParser.__new__(CParser)
+    instance.errors = []
+    return yacc.yacc(module=instance, start='program', debug=False,
+                     write_tables=False, tabmodule=tabmodule,
+                     errorlog=yacc.NullLogger())
+
+
+def main(repeat=10):
+    cold = best_of(lambda: yacc_build('_parsetab_missing'), repeat)
+    get_parser()  # make sure parsetab.py exists and is imported
+    cached = best_of(lambda: yacc_build(TABLE_MODULE), repeat)
+    rebind = best_of(CParser, repeat)
+    shared = best_of(get_parser, repeat)
+
+    print(f"{'cold build':<14}{cold * 1e3:10.3f} ms")
+    for name, t in (('cached load', cached), ('CParser()', rebind), ('shared', shared)):
+        print(f"{name:<14}{t * 1e3:10.3f} ms  ({cold / t:8.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,82 @@
+# Peephole pass: instruction, jump and label counts over a generated corpus
+# for the generator's raw IR with only the peephole pass, and for the full IR
+# optimizer with the pass off and on; then the pass's time per instruction
+# on one growing function (collector paused), which stays flat.
+import gc
+import sys
+import time
+
+from benchmarks.ir_optimizer import make_function
+from benchmarks.program_generator import make_program
+from cfg import FunctionCFG, JUMPS, function_ranges
+from intermediate_code_generator import IRGenerator
+from ir import Op
+from ir_optimizer import IROptimizer
+from parser import get_parser
+from peephole import peephole
+from vm import VMError, run_program
+
+CONFIGURATIONS = (
+    ('generator', dict(max_rounds=0, sccp=False, loops=False, tail_calls=False, peephole=False)),
+    ('+ peephole', dict(max_rounds=0, sccp=False, loops=False, tail_calls=False)),
+    ('optimizer', dict(peephole=False)),
+    ('+ peephole', dict()),
+)
+
+
+def lower(ast):
+    generator = IRGenerator()
+    generator.generate(ast)
+    return generator.get_ir()
+
+
+def counts(program):
+    jumps = sum(op in JUMPS for op in program.ops)
+    labels = sum(op == Op.LABEL for op in program.ops)
+    return len(program), jumps, labels
+
+
+def scaling(parser, statements, steps):
+    print(f"\n{'instrs':>8} {'ms':>9} {'us/instr':>9}  removed")
+    for step in range(steps):
+        program = lower(parser.parse(make_function(statements << step)))
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        removed = 0
+        for begin, end in function_ranges(program):
+            cfg = FunctionCFG(program, begin, end)
+            peephole(cfg)
+            removed += end - begin - len(cfg.code)
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        print(f"{len(program):8d} {elapsed * 1e3:9.1f} {elapsed * 1e6 / len(program):9.2f}  {removed:7d}")
+
+
+def main(seeds=60, statements=2000, steps=4):
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    parser = get_parser()
+    programs = [lower(parser.parse(make_program(seed))) for seed in range(seeds)]
+    print(f"{seeds} generated programs")
+    print(f"{'':<12}{'instrs':>9}{'jumps':>8}{'labels':>8}{'steps':>12}")
+    baseline = None
+    for label, options in CONFIGURATIONS:
+        instrs = jumps = labels = executed = 0
+        for program in programs:
+            optimized, _ = IROptimizer(**options).optimize(program)
+            size, jump_count, label_count = counts(optimized)
+            instrs += size
+            jumps += jump_count
+            labels += label_count
+            try:
+                executed += run_program(optimized, max_steps=1_000_000).steps
+            except VMError:
+                pass
+        saved = f"{1 - instrs / baseline:8.1%}" if label.startswith('+') else ''
+        baseline = instrs
+        print(f"{label:<12}{instrs:9,d}{jumps:8,d}{labels:8,d}{executed:12,d}{saved}")
+    scaling(parser, statements, steps)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,104 @@
+# Seeded random Mini C programs for benchmarks and differential checks.
+# Every knob scales one dimension of the input: number of functions,
+# statements per function, block nesting, expression length, locals and how
+# often expressions call earlier functions. Loops are counter-bounded and
+# calls only go to earlier functions, so generated programs terminate.
+import random
+import sys
+
+OPERATORS = ('+', '-', '*', '/', '<', '>', '==', '!=', '<=', '>=')
+
+
+class ProgramGenerator:
+    def __init__(self, seed=0, functions=3, statements=12, max_depth=2, expr_depth=3,
+                 expr_chain=0, locals_=0, call_rate=0.1, loop_bound=5):
+        self.rng = random.Random(seed)
+        self.functions = functions
+        self.statements = statements
+        self.max_depth = max_depth
+        self.expr_depth = expr_depth
+        self.expr_chain = expr_chain
+        self.locals = locals_
+        self.call_rate = call_rate
+        self.loop_bound = loop_bound
+        self.names = []
+
+    def generate(self):
+        lines = []
+        for f in range(self.functions):
+            lines += self.function(f"f{f}")
+            self.names.append(f"f{f}")
+        lines.append("int main() {")
+        lines.append(f"return {self.names[-1]}(3, 4) + {self.names[0]}(5, 2);")
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def function(self, name):
+        self.variables = ['a', 'b']
+        lines = [f"int {name}(int a, int b) {{"]
+        for k in range(self.locals):
+            local = f"l{k}"
+            lines.append(f"int {local} = {self.expr()};")
+            self.variables.append(local)
+        lines += self.block(self.statements)
+        lines.append(f"return {self.expr()};")
+        lines.append("}")
+        return lines
+
+    def expr(self, depth=0):
+        rng = self.rng
+        if depth == 0 and self.expr_chain:
+            # Long flat chains stress the parser's left recursion and the
+            # optimizer's reassociation
+            terms = [self.expr(self.expr_depth) for _ in range(self.expr_chain)]
+            return "(" + f" {rng.choice('+-*')} ".join(terms) + ")"
+        r = rng.random()
+        if depth > self.expr_depth or r < 0.3:
+            return str(rng.randint(0, 9)) if rng.random() < 0.4 else rng.choice(self.variables)
+        if r < 0.3 + self.call_rate and self.names:
+            return f"{rng.choice(self.names)}({self.expr(depth + 1)}, {self.expr(depth + 1)})"
+        return f"({self.expr(depth + 1)} {rng.choice(OPERATORS)} {self.expr(depth + 1)})"
+
+    def block(self, count, depth=0):
+        rng = self.rng
+        variables = self.variables
+        # Declarations in a nested block go out of scope at its closing brace
+        visible = len(variables)
+        out = []
+        for _ in range(count):
+            r = rng.random()
+            if r < 0.3:
+                name = f"v{len(variables)}"
+                out.append(f"int {name} = {self.expr()};")
+                variables.append(name)
+            elif r < 0.55:
+                out.append(f"{rng.choice(variables)} = {self.expr()};")
+            elif r < 0.7 and depth < self.max_depth:
+                out.append(f"if ({self.expr()}) {{")
+                out += self.block(2, depth + 1)
+                out.append("} else {")
+                out += self.block(2, depth + 1)
+                out.append("}")
+            elif r < 0.8 and depth < self.max_depth:
+                counter = f"c{len(variables)}"
+                variables.append(counter)
+                out.append(f"int {counter} = 0;")
+                out.append(f"while ({counter} < {rng.randint(1, self.loop_bound)}) {{")
+                out.append(f"{counter} = {counter} + 1;")
+                out += self.block(2, depth + 1)
+                out.append("}")
+            elif r < 0.85:
+                out.append(f"if ({self.expr()}) {{ return {self.expr()}; }}")
+            else:
+                out.append(f"{rng.choice(variables)} = {rng.choice(variables)};")
+        if depth:
+            del variables[visible:]
+        return out
+
+
+def make_program(seed, **knobs):
+    return ProgramGenerator(seed, **knobs).generate()
+
+
+if __name__ == '__main__':
+    print(make_program(int(sys.argv[1]) if len(sys.argv) > 1 else 0))
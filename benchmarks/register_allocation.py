@@ -0,0 +1,42 @@
+# Linear-scan allocation time on single functions with thousands of
+# temporaries, next to the cost of emitting the whole function.
+import sys
+import time
+
+from benchmarks.ir_optimizer import make_function
+from cfg import FunctionCFG, Liveness, function_ranges
+from codegen import CodeGenerator, LinearScan, live_intervals
+from intermediate_code_generator import IRGenerator
+from parser import get_parser
+
+
+def main(statements=1000, steps=5):
+    parser = get_parser()
+    print(f"{'instrs':>8} {'intervals':>9} {'spilled':>8} {'liveness ms':>12} "
+          f"{'scan ms':>9} {'codegen ms':>11}")
+    for step in range(steps):
+        generator = IRGenerator()
+        generator.generate(parser.parse(make_function(statements << step)))
+        program = generator.get_ir()
+        start, end = function_ranges(program)[0]
+        cfg = FunctionCFG(program, start, end)
+
+        begin = time.perf_counter()
+        intervals = live_intervals(cfg, Liveness(cfg))
+        liveness = time.perf_counter() - begin
+
+        scan = LinearScan()
+        begin = time.perf_counter()
+        scan.allocate(intervals)
+        allocation = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        CodeGenerator(program).generate()
+        total = time.perf_counter() - begin
+
+        print(f"{len(program):8d} {len(intervals):9d} {scan.slots:8d} {liveness * 1e3:12.1f} "
+              f"{allocation * 1e3:9.1f} {total * 1e3:11.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
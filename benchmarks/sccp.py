@@ -0,0 +1,78 @@
+# Sparse conditional constant propagation: executed VM instructions over a
+# generated corpus with the IR optimizer's SCCP pass off and on (after the
+# AST optimizer, as the pipeline runs, and without it), and the SSA + SCCP
+# time per instruction on one growing function (collector paused, so the
+# timings show the passes' own scaling).
+import gc
+import sys
+import time
+
+from benchmarks.ir_optimizer import make_function
+from benchmarks.program_generator import make_program
+from cfg import FunctionCFG, function_ranges
+from intermediate_code_generator import IRGenerator
+from ir_optimizer import IROptimizer
+from optimizer import optimize_ast
+from parser import get_parser
+from ssa import propagate_constants
+from traversal import clone
+from vm import VMError, run_program
+
+
+def lower(ast):
+    generator = IRGenerator()
+    generator.generate(ast)
+    return generator.get_ir()
+
+
+def corpus(parser, seeds):
+    programs = []
+    for seed in range(seeds):
+        ast = parser.parse(make_program(seed, functions=4, statements=16, loop_bound=20))
+        programs.append((lower(clone(ast)), lower(optimize_ast(clone(ast))[0])))
+    return programs
+
+
+def executed(programs, which, sccp):
+    instructions = steps = 0
+    for pair in programs:
+        program, _ = IROptimizer(sccp=sccp).optimize(pair[which])
+        try:
+            run = run_program(program, max_steps=5_000_000)
+        except VMError:
+            continue
+        instructions += len(program)
+        steps += run.steps
+    return instructions, steps
+
+
+def scaling(parser, statements, steps):
+    print(f"\n{'instrs':>8} {'ms':>9} {'us/instr':>9}  folded")
+    for step in range(steps):
+        program = lower(parser.parse(make_function(statements << step)))
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        folded = 0
+        for begin, end in function_ranges(program):
+            folded += sum(propagate_constants(FunctionCFG(program, begin, end)))
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        print(f"{len(program):8d} {elapsed * 1e3:9.1f} {elapsed * 1e6 / len(program):9.2f}  {folded:6d}")
+
+
+def main(seeds=40, statements=2000, steps=4):
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    parser = get_parser()
+    programs = corpus(parser, seeds)
+    print(f"{seeds} generated programs")
+    print(f"{'':<12}{'instrs':>9}{'steps':>14}{'+ SCCP instrs':>15}{'steps':>14}{'saved':>8}")
+    for label, which in (('IR only', 0), ('AST + IR', 1)):
+        size, plain = executed(programs, which, False)
+        sccp_size, sccp = executed(programs, which, True)
+        print(f"{label:<12}{size:9,d}{plain:14,d}{sccp_size:15,d}{sccp:14,d}{1 - sccp / plain:8.1%}")
+    scaling(parser, statements, steps)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
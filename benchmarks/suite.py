@@ -0,0 +1,206 @@
+# Phase-level benchmark suite. Generates seeded programs at increasing sizes,
+# measures time (best of --repeat) and peak traced memory of every compiler
+# phase, fits time ~ c * tokens^k per phase, and writes JSON that a later
+# run can be compared against with a regression threshold.
+#
+#   python -m benchmarks.suite --output base.json
+#   python -m benchmarks.suite --baseline base.json --threshold 0.2
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.program_generator import make_program
+from codegen import CodeGenerator
+from intermediate_code_generator import IRGenerator
+from ir_optimizer import optimize_ir
+from optimizer import optimize_ast
+from parser import get_parser
+from pipeline import lex_source
+from semantic_analyzer import SemanticAnalyzer
+from traversal import clone
+
+PHASES = ('lex', 'parse', 'semantic', 'optimize', 'irgen', 'ir_optimize', 'codegen')
+
+# Program shape at size 1; --sizes multiplies the number of functions
+BASE_KNOBS = {'functions': 4, 'statements': 20, 'max_depth': 2, 'expr_depth': 3,
+              'expr_chain': 6, 'locals_': 8, 'call_rate': 0.1}
+
+
+def phase_input(name, state):
+    """Arguments for one phase, built outside the timed region."""
+    if name in ('lex', 'parse'):
+        return state['source']
+    if name == 'semantic':
+        return state['ast']
+    if name == 'optimize':
+        return clone(state['ast'])
+    if name == 'irgen':
+        return state['optimized_ast']
+    if name == 'ir_optimize':
+        return state['ir']
+    return state['optimized_ir']
+
+
+def run_phase(name, arg):
+    if name == 'lex':
+        return lex_source(arg)
+    if name == 'parse':
+        return get_parser().parse(arg)
+    if name == 'semantic':
+        analyzer = SemanticAnalyzer()
+        analyzer.analyze(arg)
+        return analyzer.global_scope
+    if name == 'optimize':
+        return optimize_ast(arg)[0]
+    if name == 'irgen':
+        generator = IRGenerator()
+        generator.generate(arg)
+        return generator.get_ir()
+    if name == 'ir_optimize':
+        return optimize_ir(arg)[0]
+    return CodeGenerator(arg).generate()
+
+
+STATE_KEYS = {'lex': 'tokens', 'parse': 'ast', 'semantic': 'symbol_table', 'optimize': 'optimized_ast',
+              'irgen': 'ir', 'ir_optimize': 'optimized_ir', 'codegen': 'asm'}
+
+
+def measure(source, repeat):
+    get_parser()
+    state = {'source': source}
+    timings, peaks = {}, {}
+    for name in PHASES:
+        best = float('inf')
+        for _ in range(repeat):
+            arg = phase_input(name, state)
+            gc.collect()
+            start = time.perf_counter()
+            output = run_phase(name, arg)
+            best = min(best, time.perf_counter() - start)
+        state[STATE_KEYS[name]] = output
+        timings[name] = best
+
+        # Separate run for memory: tracemalloc slows allocation-heavy code
+        arg = phase_input(name, state)
+        gc.collect()
+        tracemalloc.start()
+        run_phase(name, arg)
+        peaks[name] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return len(state['tokens']), timings, peaks
+
+
+def fit_power_law(xs, ys):
+    """Least squares fit of log y = log c + k log x; returns (k, c)."""
+    points = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if x > 0 and y > 0]
+    if len(points) < 2:
+        return None, None
+    mean_x = sum(p[0] for p in points) / len(points)
+    mean_y = sum(p[1] for p in points) / len(points)
+    sxx = sum((p[0] - mean_x) ** 2 for p in points)
+    if sxx == 0:
+        return None, None
+    k = sum((p[0] - mean_x) * (p[1] - mean_y) for p in points) / sxx
+    return k, math.exp(mean_y - k * mean_x)
+
+
+def run_suite(sizes, seed=1, repeat=3):
+    results = {name: {'tokens': [], 'seconds': [], 'peak_bytes': []} for name in PHASES}
+    for size in sizes:
+        knobs = dict(BASE_KNOBS, functions=BASE_KNOBS['functions'] * size)
+        tokens, timings, peaks = measure(make_program(seed, **knobs), repeat)
+        for name in PHASES:
+            results[name]['tokens'].append(tokens)
+            results[name]['seconds'].append(timings[name])
+            results[name]['peak_bytes'].append(peaks[name])
+    for name, data in results.items():
+        data['exponent'], data['coefficient'] = fit_power_law(data['tokens'], data['seconds'])
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeat': repeat,
+            'sizes': list(sizes),
+            'knobs': BASE_KNOBS,
+        },
+        'phases': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Per phase ratios of total time and peak memory over the sizes both
+    runs measured; returns the list of regressions."""
+    regressions = []
+    print(f"{'phase':<12}{'time':>10}{'memory':>10}")
+    for name in PHASES:
+        now, before = current['phases'].get(name), baseline['phases'].get(name)
+        if not now or not before:
+            continue
+        shared = [i for i, t in enumerate(now['tokens']) if t in before['tokens']]
+        if not shared:
+            continue
+        index = {t: i for i, t in enumerate(before['tokens'])}
+        ratios = []
+        for key in ('seconds', 'peak_bytes'):
+            total_now = sum(now[key][i] for i in shared)
+            total_before = sum(before[key][index[now['tokens'][i]]] for i in shared)
+            ratios.append(total_now / total_before if total_before else 1.0)
+        flags = []
+        for label, ratio in zip(('time', 'memory'), ratios):
+            if ratio > 1 + threshold:
+                regressions.append((name, label, ratio))
+                flags.append(label)
+        mark = f"  REGRESSION ({', '.join(flags)})" if flags else ""
+        print(f"{name:<12}{ratios[0]:9.2f}x{ratios[1]:9.2f}x{mark}")
+    return regressions
+
+
+def report(results):
+    phases = results['phases']
+    tokens = phases[PHASES[0]]['tokens']
+    print(f"{'phase':<12}" + "".join(f"{t:>12d}" for t in tokens) + f"{'exponent':>10}{'peak MiB':>10}")
+    for name in PHASES:
+        data = phases[name]
+        exponent = f"{data['exponent']:.2f}" if data['exponent'] is not None else '-'
+        print(f"{name:<12}" + "".join(f"{s * 1e3:10.1f}ms" for s in data['seconds'])
+              + f"{exponent:>10}{max(data['peak_bytes']) / 2**20:10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-phase compiler benchmarks over a size sweep.")
+    parser.add_argument('--sizes', default='1,2,4,8', help="comma separated size multipliers")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per phase; the best is kept")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="compare against a JSON file written by --output")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed slowdown/growth before a phase counts as regressed (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    results = run_suite(sizes, args.seed, args.repeat)
+    report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('seed') != args.seed:
+            print("warning: baseline was generated with a different seed")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
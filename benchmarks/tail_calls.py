@@ -0,0 +1,126 @@
+# Tail-call elimination on recursive kernels: VM run time, executed
+# instructions and call-stack depth with the IR optimizer's tail-call pass
+# off and on, at a depth the VM's frame limit allows and at one far past it.
+# The last column runs the kernel through the JIT, which loops on self tail
+# calls on its own.
+import sys
+
+from intermediate_code_generator import IRGenerator
+from ir_optimizer import IROptimizer
+from jit import compile_program
+from parser import get_parser
+from vm import VM, VMError, assemble
+
+KERNELS = {
+    'countdown': """
+int loop(int n, int acc) {{
+    if (n == 0) {{
+        return acc;
+    }}
+    return loop(n - 1, acc + n * 3);
+}}
+
+int main() {{
+    return loop({n}, 0);
+}}
+""",
+    'sum': """
+int sum(int n) {{
+    if (n == 0) {{
+        return 0;
+    }}
+    return n + sum(n - 1);
+}}
+
+int main() {{
+    return sum({n});
+}}
+""",
+    'factorial': """
+int fact(int n) {{
+    if (n <= 1) {{
+        return 1;
+    }}
+    return n * fact(n - 1);
+}}
+
+int main() {{
+    return fact({n} / 100) / fact({n} / 100 - 2);
+}}
+""",
+    'fibonacci': """
+int fib(int n) {{
+    if (n < 2) {{
+        return n;
+    }}
+    return fib(n - 1) + fib(n - 2);
+}}
+
+int main() {{
+    return fib({n});
+}}
+""",
+}
+
+# fibonacci keeps one real call per level, so it only runs at a small size
+SIZES = {'fibonacci': (22,)}
+
+
+def compile_kernel(parser, source, tail_calls):
+    generator = IRGenerator()
+    generator.generate(parser.parse(source))
+    program, stats = IROptimizer(tail_calls=tail_calls).optimize(generator.get_ir())
+    return assemble(program), stats
+
+
+def stack_depth(bytecode):
+    """Fewest frames the program runs in: binary search on the VM's limit."""
+    low, high = 0, 1
+    while True:
+        try:
+            VM(bytecode, max_depth=high).run()
+            break
+        except VMError:
+            low, high = high, high * 2
+    while high - low > 1:
+        middle = (low + high) // 2
+        try:
+            VM(bytecode, max_depth=middle).run()
+            high = middle
+        except VMError:
+            low = middle
+    return high
+
+
+def run(bytecode):
+    try:
+        return VM(bytecode).run()
+    except VMError:
+        return None
+
+
+def main(shallow=5_000, deep=500_000):
+    parser = get_parser()
+    print(f"{'kernel':<12}{'n':>9}{'ms':>10}{'+ tail':>10}{'steps':>12}{'+ tail':>12}"
+          f"{'frames':>9}{'+ tail':>8}{'jit ms':>9}")
+    for name, template in KERNELS.items():
+        for n in SIZES.get(name, (shallow, deep)):
+            source = template.format(n=n)
+            plain, _ = compile_kernel(parser, source, False)
+            tail, stats = compile_kernel(parser, source, True)
+            assert stats['tail_calls'], name
+            before, after = run(plain), run(tail)
+            if before is None:
+                ms = steps = frames = 'overflow'
+            else:
+                assert before.value == after.value, name
+                ms, steps = f"{before.seconds * 1e3:.1f}", f"{before.steps:,d}"
+                frames = stack_depth(plain)
+            jit = compile_program(parser.parse(source), cache=None).run()
+            assert jit.value == after.value, name
+            print(f"{name:<12}{n:9,d}{ms:>10}{after.seconds * 1e3:10.1f}{steps:>12}{after.steps:12,d}"
+                  f"{frames:>9}{stack_depth(tail):8d}{jit.seconds * 1e3:9.1f}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,124 @@
+# Temp recycling: distinct temps, VM frame sizes and memory for the IR of a
+# generated corpus and of one large function, with the generator's old
+# numbering (one new temp per subexpression, program-wide) and with recycled
+# temps; then the same after the IR optimizer with compaction off and on, and
+# the best-of-three run time of a call-heavy program whose frames are
+# copied on each call.
+import sys
+
+from benchmarks.ir_optimizer import make_function
+from benchmarks.program_generator import make_program
+from cfg import function_ranges
+from intermediate_code_generator import IRGenerator
+from ir import Kind
+from ir_optimizer import IROptimizer
+from parser import get_parser
+from vm import assemble, run_program
+
+
+class UniqueTemps(IRGenerator):
+    # The generator before recycling: a program-wide counter, nothing released
+    def __init__(self):
+        super().__init__()
+        self.serial = 0
+
+    def new_temp(self):
+        self.serial += 1
+        return self.operands.intern(Kind.TEMP, self.serial)
+
+    def release(self, operand):
+        pass
+
+    def end_statement(self):
+        pass
+
+
+def lower(generator_class, ast):
+    generator = generator_class()
+    generator.generate(ast)
+    return generator.get_ir()
+
+
+def function_temps(program):
+    """Distinct temps per function, summed."""
+    kinds = program.operands.kinds
+    total = 0
+    for start, end in function_ranges(program):
+        seen = set()
+        for column in (program.dst, program.arg1, program.arg2):
+            seen.update(v for v in column[start:end] if v >= 0 and kinds[v] == Kind.TEMP)
+        total += len(seen)
+    return total
+
+
+def measure(programs):
+    """Temps, VM registers, the largest frame and the frames' memory."""
+    temps = registers = largest = size = 0
+    for program in programs:
+        temps += function_temps(program)
+        for function in assemble(program).functions:
+            registers += len(function.template)
+            largest = max(largest, len(function.template))
+            size += sys.getsizeof(function.template)
+    return temps, registers, largest, size
+
+
+def report(title, asts):
+    print(title)
+    print(f"{'':<22}{'temps':>9}{'registers':>11}{'largest':>9}{'frames KiB':>12}")
+    unique = [lower(UniqueTemps, ast) for ast in asts]
+    recycled = [lower(IRGenerator, ast) for ast in asts]
+    rows = [
+        ('unique temps', unique),
+        ('recycled', recycled),
+        ('optimized, no compact', [IROptimizer(compact=False).optimize(p)[0] for p in recycled]),
+        ('optimized + compact', [IROptimizer().optimize(p)[0] for p in recycled]),
+    ]
+    for label, programs in rows:
+        temps, registers, largest, size = measure(programs)
+        print(f"{label:<22}{temps:9,d}{registers:11,d}{largest:9,d}{size / 1024:12.1f}")
+
+
+def make_callee(statements):
+    # Straight-line arithmetic: make_function's loops need not terminate
+    lines = ["int big(int p, int q) {", "    int v0 = p + q;"]
+    for i in range(1, statements):
+        lines.append(f"    int v{i} = (v{i - 1} + p * {i % 7 + 1}) - (q + v{i // 2}) / 3;")
+    lines += [f"    return v{statements - 1};", "}"]
+    return "\n".join(lines)
+
+
+CALLS = """
+int main() {{
+    int i = 0;
+    int total = 0;
+    while (i < {calls}) {{
+        total = total + big(i, 3) / 1000;
+        i = i + 1;
+    }}
+    return total;
+}}
+"""
+
+
+def main(seeds=60, statements=4000, calls=2000):
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    parser = get_parser()
+    report(f"{seeds} generated programs",
+           [parser.parse(make_program(seed)) for seed in range(seeds)])
+    print()
+    report(f"one function of {statements} statements",
+           [parser.parse(make_function(statements))])
+
+    print(f"\n{calls} calls of a {statements // 20}-statement function")
+    ast = parser.parse(make_callee(statements // 20) + CALLS.format(calls=calls))
+    for label, generator_class in (('unique temps', UniqueTemps), ('recycled', IRGenerator)):
+        program = lower(generator_class, ast)
+        frame = max(len(f.template) for f in assemble(program).functions)
+        results = [run_program(program) for _ in range(3)]
+        best = min(result.seconds for result in results)
+        print(f"{label:<22}{frame:5d} registers  {best * 1e3:8.1f} ms  {results[0].steps:,d} steps")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
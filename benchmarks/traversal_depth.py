@@ -0,0 +1,97 @@
+# Depth scaling of the explicit-stack passes against the recursive shape they
+# replaced, on a left-associative "a+a+...+a" chain (tree depth == terms).
+import sys
+import time
+
+from intermediate_code_generator import BINARY_OPS, IRGenerator
+from optimizer import Optimizer
+from parser import ASTNode
+from traversal import clone, walk
+
+
+def chain(terms):
+    node = ASTNode('Variable', value='a')
+    for i in range(1, terms):
+        right = ASTNode('Literal', value=i) if i % 2 else ASTNode('Variable', value='a')
+        node = ASTNode('PLUS', children=[node, right])
+    return node
+
+
+# Recursive reference implementations, shaped like the code before the port
+def recursive_fold(optimizer, node):
+    node.children = [recursive_fold(optimizer, child) for child in node.children]
+    return optimizer._fold(node)
+
+
+class RecursiveIR:
+    def __init__(self):
+        self.code = []
+        self.temp_count = 0
+
+    def generate(self, node):
+        return getattr(self, f'generate_{node.type}', self.generate_binary)(node)
+
+    def generate_binary(self, node):
+        left = self.generate(node.children[0])
+        right = self.generate(node.children[1])
+        self.temp_count += 1
+        temp = f"t{self.temp_count}"
+        self.code.append(f"{temp} = {left} {BINARY_OPS[node.type]} {right}")
+        return temp
+
+    def generate_Literal(self, node):
+        return node.value
+
+    def generate_Variable(self, node):
+        return node.value
+
+
+def recursive_display(node, depth=0):
+    parts = [f"{'  ' * depth}- {node.type}\n"]
+    for child in node.children:
+        parts.append(recursive_display(child, depth + 1))
+    return "".join(parts)
+
+
+def iterative_display(node):
+    return "\n".join(f"{'  ' * depth}- {n.type}" for n, depth in walk(node))
+
+
+def timed(fn, tree):
+    tree = clone(tree)
+    start = time.perf_counter()
+    try:
+        fn(tree)
+    except RecursionError:
+        return None
+    return time.perf_counter() - start
+
+
+def fmt(t):
+    return f"{t * 1e3:9.2f}" if t is not None else "  (crash)"
+
+
+def main(sizes=(250, 1000, 4000, 16000, 64000)):
+    sys.setrecursionlimit(10000)
+    opt = Optimizer()
+    cases = [
+        ('fold', lambda t: recursive_fold(opt, t), opt.constant_folding),
+        ('ir', lambda t: RecursiveIR().generate(t), lambda t: IRGenerator().generate(t)),
+        ('display', recursive_display, iterative_display),
+    ]
+    print(f"recursion limit {sys.getrecursionlimit()}; times in ms (recursive / explicit stack)")
+    print(f"{'depth':>8}" + "".join(f"{name:>24}" for name, _, _ in cases))
+    for n in sizes:
+        tree = chain(n)
+        row = f"{n:>8}"
+        for name, recursive, iterative in cases:
+            if name == 'display' and n > 1000:
+                # Output grows with depth squared (indentation)
+                row += f"{'-':>24}"
+                continue
+            row += f"   {fmt(timed(recursive, tree))} /{fmt(timed(iterative, tree))}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Bytecode VM on a counting loop: executed instructions and wall time with
+# no optimization, the IR optimizer alone, and AST + IR optimizers.
+import sys
+
+from intermediate_code_generator import IRGenerator
+from ir_optimizer import optimize_ir
+from optimizer import optimize_ast
+from parser import get_parser
+from traversal import clone
+from vm import VM, assemble
+
+
+def make_source(iterations):
+    return f"""
+int step(int x) {{
+    return x * 3 / 2;
+}}
+
+int main() {{
+    int i = 0;
+    int total = 0;
+    int scale = 4 * 1 + 0;
+    while (i < {iterations}) {{
+        int doubled = i * scale;
+        total = total + doubled - i * scale + i;
+        if (i - i / 100 * 100 == 0) {{
+            total = total + step(i);
+        }}
+        i = i + 1;
+    }}
+    return total;
+}}
+"""
+
+
+def build(ast, ast_opt, ir_opt):
+    tree = clone(ast)
+    if ast_opt:
+        tree, _ = optimize_ast(tree)
+    generator = IRGenerator()
+    generator.generate(tree)
+    program = generator.get_ir()
+    if ir_opt:
+        program, _ = optimize_ir(program)
+    return assemble(program)
+
+
+def main(iterations=1_000_000):
+    ast = get_parser().parse(make_source(iterations))
+    print(f"{iterations} loop iterations")
+    for label, ast_opt, ir_opt in (('unoptimized', False, False),
+                                   ('IR optimizer', False, True),
+                                   ('AST + IR', True, True)):
+        bytecode = build(ast, ast_opt, ir_opt)
+        run = VM(bytecode).run('main')
+        print(f"{label:<14}{len(bytecode):6d} ops {run.steps:12,d} steps {run.seconds:8.2f} s "
+              f"{run.steps_per_second / 1e6:6.2f} M/s  -> {run.value}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,310 @@
+# cfg.py
+# Basic blocks, control-flow graph and bit-vector liveness over IRProgram
+# functions. Instructions are (op, dst, a, b) tuples; passes may replace an
+# entry of FunctionCFG.code with None to delete it.
+from ir import Kind, NONE, Op
+
+JUMPS = (Op.GOTO, Op.IF_FALSE, Op.IF_TRUE)
+BLOCK_ENDS = (Op.GOTO, Op.IF_FALSE, Op.IF_TRUE, Op.RETURN)
+PURE_DEFS = (Op.COPY, Op.ADD, Op.SUB, Op.MUL, Op.DIV,
+             Op.EQ, Op.NE, Op.LT, Op.GT, Op.LE, Op.GE)
+
+def function_ranges(program):
+    """(start, end) instruction ranges, one per FUNC header."""
+    starts = [i for i, op in enumerate(program.ops) if op == Op.FUNC]
+    ends = starts[1:] + [len(program)]
+    return list(zip(starts, ends))
+
+def is_variable(kinds, operand):
+    return operand >= 0 and kinds[operand] <= Kind.VAR
+
+def defs_uses(kinds, instr):
+    """Variable defined (or NONE) and tuple of variables used by instr."""
+    op, dst, a, b = instr
+    if op >= Op.ADD:
+        uses = tuple(x for x in (a, b) if is_variable(kinds, x))
+        return dst, uses
+    if op == Op.COPY:
+        return dst, ((a,) if is_variable(kinds, a) else ())
+    if op == Op.CALL:
+        return dst, ()
+    if op == Op.PARAM:
+        return a, ()
+    if op in (Op.ARG, Op.IF_FALSE, Op.IF_TRUE, Op.RETURN):
+        return NONE, ((a,) if is_variable(kinds, a) else ())
+    return NONE, ()
+
+def exposed_temps(kinds, code):
+    """Temps some block reads before writing them. Every other temp is
+    block-local: each read sees a write earlier in the same block."""
+    exposed = set()
+    written = set()
+    for instr in code:
+        if instr is None:
+            continue
+        if instr[0] == Op.LABEL:
+            written = set()
+            continue
+        d, used = defs_uses(kinds, instr)
+        for v in used:
+            if v not in written and kinds[v] == Kind.TEMP:
+                exposed.add(v)
+        if d != NONE:
+            written.add(d)
+        if instr[0] in BLOCK_ENDS:
+            written = set()
+    return exposed
+
+def temp_deaths(kinds, code, exposed):
+    """For straight-line code with blocks delimited by labels and jumps:
+    (deaths, dead_defs). deaths[i] holds the block-local temps instruction i
+    reads for the last time before they are written again; dead_defs the
+    indexes whose block-local temp result is never read."""
+    deaths = [()] * len(code)
+    dead_defs = set()
+    live = set()
+    for i in range(len(code) - 1, -1, -1):
+        instr = code[i]
+        if instr is None:
+            continue
+        if instr[0] in BLOCK_ENDS or instr[0] == Op.LABEL:
+            live = set()
+        d, used = defs_uses(kinds, instr)
+        local = [v for v in used if kinds[v] == Kind.TEMP and v not in exposed]
+        if d != NONE and kinds[d] == Kind.TEMP and d not in exposed:
+            if d not in live:
+                dead_defs.add(i)
+            live.discard(d)
+        if local:
+            deaths[i] = tuple(v for v in local if v not in live)
+            live.update(local)
+    return deaths, dead_defs
+
+class BasicBlock:
+    __slots__ = ('index', 'start', 'end', 'succs', 'preds')
+
+    def __init__(self, index, start, end):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.succs = []
+        self.preds = []
+
+    def __repr__(self):
+        return f"B{self.index}[{self.start}:{self.end}]"
+
+class FunctionCFG:
+    def __init__(self, program, start, end):
+        self.program = program
+        self.operands = program.operands
+        self.code = list(zip(program.ops[start:end], program.dst[start:end],
+                             program.arg1[start:end], program.arg2[start:end]))
+        self.blocks = []
+        self.label_blocks = {}
+        self._build()
+
+    def rebuild(self):
+        """Drop deleted entries and recompute the blocks, after a pass that
+        removed or redirected jumps."""
+        self.code = [instr for instr in self.code if instr is not None]
+        self.blocks = []
+        self.label_blocks = {}
+        self._build()
+
+    def _build(self):
+        code = self.code
+        leaders = {0}
+        for i, (op, _, _, _) in enumerate(code):
+            if op == Op.LABEL:
+                leaders.add(i)
+            elif op in BLOCK_ENDS and i + 1 < len(code):
+                leaders.add(i + 1)
+        starts = sorted(leaders)
+        ends = starts[1:] + [len(code)]
+        for index, (start, end) in enumerate(zip(starts, ends)):
+            block = BasicBlock(index, start, end)
+            self.blocks.append(block)
+            for i in range(start, end):
+                if code[i][0] != Op.LABEL:
+                    break
+                self.label_blocks[code[i][2]] = block
+
+        for block in self.blocks:
+            op, _, a, b = code[block.end - 1]
+            targets = []
+            if op == Op.GOTO:
+                targets.append(self.label_blocks[a])
+            elif op in (Op.IF_FALSE, Op.IF_TRUE):
+                targets.append(self.label_blocks[b])
+            if op not in (Op.GOTO, Op.RETURN) and block.index + 1 < len(self.blocks):
+                targets.append(self.blocks[block.index + 1])
+            for target in targets:
+                if target not in block.succs:
+                    block.succs.append(target)
+                    target.preds.append(block)
+
+    def instructions(self, block):
+        code = self.code
+        for i in range(block.start, block.end):
+            if code[i] is not None:
+                yield i, code[i]
+
+    def reverse_postorder(self):
+        order = []
+        seen = set()
+        if not self.blocks:
+            return order
+        stack = [(self.blocks[0], 0)]
+        seen.add(0)
+        while stack:
+            block, i = stack.pop()
+            if i < len(block.succs):
+                stack.append((block, i + 1))
+                succ = block.succs[i]
+                if succ.index not in seen:
+                    seen.add(succ.index)
+                    stack.append((succ, 0))
+            else:
+                order.append(block)
+        order.reverse()
+        return order
+
+    def emit_into(self, program):
+        for instr in self.code:
+            if instr is not None:
+                program.emit(*instr)
+
+class Liveness:
+    """Backward may-analysis with Python ints as bit vectors.
+
+    bit[v] is the bit position of variable operand v; live_in/live_out are
+    indexed by block index.
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        kinds = cfg.operands.kinds
+        self.bit = {}
+        self.uses = []
+        self.defs = []
+        self.instr_info = {}
+        for block in cfg.blocks:
+            use = defs = 0
+            for i, instr in cfg.instructions(block):
+                d, used = defs_uses(kinds, instr)
+                used_mask = 0
+                for v in used:
+                    used_mask |= 1 << self._bit(v)
+                def_mask = (1 << self._bit(d)) if d != NONE else 0
+                self.instr_info[i] = (def_mask, used_mask)
+                use |= used_mask & ~defs
+                defs |= def_mask
+            self.uses.append(use)
+            self.defs.append(defs)
+        self.live_in = [0] * len(cfg.blocks)
+        self.live_out = [0] * len(cfg.blocks)
+        self._solve()
+
+    def _bit(self, v):
+        bit = self.bit.get(v)
+        if bit is None:
+            bit = self.bit[v] = len(self.bit)
+        return bit
+
+    def _solve(self):
+        blocks = self.cfg.blocks
+        live_in, live_out = self.live_in, self.live_out
+        # Postorder (reverse of RPO) converges fastest for a backward problem
+        order = list(reversed(self.cfg.reverse_postorder()))
+        reachable = {block.index for block in order}
+        order += [block for block in blocks if block.index not in reachable]
+        pending = set(block.index for block in order)
+        worklist = list(reversed(order))
+        while worklist:
+            block = worklist.pop()
+            pending.discard(block.index)
+            out = 0
+            for succ in block.succs:
+                out |= live_in[succ.index]
+            live_out[block.index] = out
+            new_in = self.uses[block.index] | (out & ~self.defs[block.index])
+            if new_in != live_in[block.index]:
+                live_in[block.index] = new_in
+                for pred in block.preds:
+                    if pred.index not in pending:
+                        pending.add(pred.index)
+                        worklist.append(pred)
+
+    def is_live_in(self, block, v):
+        bit = self.bit.get(v)
+        return bit is not None and (self.live_in[block.index] >> bit) & 1
+
+    def is_live_out(self, block, v):
+        bit = self.bit.get(v)
+        return bit is not None and (self.live_out[block.index] >> bit) & 1
+
+class StrongLiveness:
+    """Strongly live variables: a pure definition of a dead variable does
+    not make its operands live, so one solution finds a whole chain of dead
+    stores (and a value that only feeds itself round a loop).
+
+    Live sets are plain sets of operands rather than bit vectors: only a few
+    variables are live at any point, while a bit vector is as wide as the
+    function has variables, so this stays linear in the function's size.
+    The transfer function depends on the live set, so a block is walked
+    instruction by instruction every time it is visited.
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        kinds = cfg.operands.kinds
+        self.instr_info = {}
+        for block in cfg.blocks:
+            for i, instr in cfg.instructions(block):
+                self.instr_info[i] = defs_uses(kinds, instr)
+        self.live_in = [frozenset()] * len(cfg.blocks)
+        self.live_out = [frozenset()] * len(cfg.blocks)
+        self._solve()
+
+    def _solve(self):
+        blocks = self.cfg.blocks
+        live_in, live_out = self.live_in, self.live_out
+        order = list(reversed(self.cfg.reverse_postorder()))
+        reachable = {block.index for block in order}
+        order += [block for block in blocks if block.index not in reachable]
+        pending = set(block.index for block in order)
+        worklist = list(reversed(order))
+        while worklist:
+            block = worklist.pop()
+            pending.discard(block.index)
+            out = set()
+            for succ in block.succs:
+                out |= live_in[succ.index]
+            live_out[block.index] = out
+            new_in = self.walk(block, out)
+            if new_in != live_in[block.index]:
+                live_in[block.index] = new_in
+                for pred in block.preds:
+                    if pred.index not in pending:
+                        pending.add(pred.index)
+                        worklist.append(pred)
+
+    def walk(self, block, out, dead=None):
+        """Variables live on entry to block given those live on exit; the
+        pure definitions found dead on the way go into dead when given."""
+        code = self.cfg.code
+        info = self.instr_info
+        live = set(out)
+        for i in range(block.end - 1, block.start - 1, -1):
+            instr = code[i]
+            if instr is None:
+                continue
+            d, used = info[i]
+            if d != NONE:
+                if d not in live and instr[0] in PURE_DEFS:
+                    if dead is not None:
+                        dead.append(i)
+                    continue
+                live.discard(d)
+            live.update(used)
+        return live
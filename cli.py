@@ -0,0 +1,184 @@
+# cli.py
+# Headless batch compiler: python cli.py [options] PATH...
+# PATH may be a file, a directory (searched recursively for --pattern) or a
+# glob. Files are compiled in a process pool whose workers each build the
+# parser once; results are reported in input order.
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from parser import get_parser
+from pipeline import compile_source
+
+GLOB_CHARS = '*?['
+
+def collect_sources(paths, pattern='*.c'):
+    """Expand files, directories and globs into a sorted, de-duplicated list."""
+    found = []
+    for path in paths:
+        if any(ch in path for ch in GLOB_CHARS):
+            matches = sorted(glob.glob(path, recursive=True))
+        elif os.path.isdir(path):
+            matches = sorted(glob.glob(os.path.join(path, '**', pattern), recursive=True))
+        else:
+            matches = [path]
+        found.extend(m for m in matches if os.path.isfile(m) or m == path)
+    seen = set()
+    unique = []
+    for path in found:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+def output_base(path, root, out_dir, keep_extension=False):
+    """out_dir/<path relative to root> without its extension (unless
+    keep_extension), or next to the source when no out_dir is given."""
+    if out_dir is not None:
+        path = os.path.join(out_dir, os.path.relpath(os.path.abspath(path), root))
+    return path if keep_extension else os.path.splitext(path)[0]
+
+def output_bases(files, root, out_dir):
+    """output_base for each file; files that would share one (foo.c and
+    foo.txt) keep their extension, so foo.c.ir and foo.txt.ir."""
+    bases = [output_base(path, root, out_dir) for path in files]
+    taken = {}
+    for base in bases:
+        key = os.path.normcase(os.path.abspath(base))
+        taken[key] = taken.get(key, 0) + 1
+    return [output_base(path, root, out_dir, keep_extension=True)
+            if taken[os.path.normcase(os.path.abspath(base))] > 1 else base
+            for path, base in zip(files, bases)]
+
+def _init_worker():
+    # Loads the LALR tables once per process; every file reuses the parser
+    get_parser()
+
+def compile_file(job):
+    """Compile one file and write its outputs. Runs in a worker process and
+    returns only a small summary so little crosses the process boundary."""
+    path, base, options, emit = job
+    summary = {'path': path, 'ok': False, 'phase': None, 'errors': [], 'warnings': [],
+               'lines': 0, 'instructions': 0, 'seconds': 0.0}
+    start = time.perf_counter()
+    try:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+    except (OSError, UnicodeDecodeError) as error:
+        summary['phase'] = 'read'
+        summary['errors'] = [str(error)]
+        return summary
+    summary['lines'] = source.count('\n') + (not source.endswith('\n') and bool(source))
+    try:
+        result = compile_source(source, options)
+    except Exception as error:
+        summary['phase'] = 'internal'
+        summary['errors'] = [f"{type(error).__name__}: {error}"]
+        summary['seconds'] = time.perf_counter() - start
+        return summary
+
+    summary['seconds'] = time.perf_counter() - start
+    if not result.ok:
+        summary['phase'] = result.failed_phase
+        summary['errors'] = [str(e) for e in result.errors]
+        return summary
+
+    summary['ok'] = True
+    summary['instructions'] = len(result.ir)
+    outputs = []
+    if 'ir' in emit:
+        outputs.append(('.ir', result.ir_code))
+    if 'asm' in emit:
+        if result.codegen_errors:
+            # The backend is integer-only; the IR is still written
+            summary['warnings'] = [f"no assembly: {error}" for error in result.codegen_errors]
+        else:
+            outputs.append(('.s', result.asm_code))
+    try:
+        if outputs:
+            os.makedirs(os.path.dirname(base) or '.', exist_ok=True)
+        for suffix, lines in outputs:
+            with open(base + suffix, 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+    except OSError as error:
+        # One unwritable output fails this file, not the whole batch
+        summary['ok'] = False
+        summary['phase'] = 'write'
+        summary['errors'] = [str(error)]
+    return summary
+
+def run_batch(files, options, emit=('ir', 'asm'), out_dir=None, jobs=None, chunksize=None):
+    """Yield one summary per file, in the order of files."""
+    if not files:
+        return
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in files])
+    work = [(path, base, options, emit) for path, base in zip(files, output_bases(files, root, out_dir))]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        _init_worker()
+        yield from map(compile_file, work)
+        return
+    if chunksize is None:
+        # A few chunks per worker keeps IPC overhead low and the load balanced
+        chunksize = max(1, min(64, len(work) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        # Executor.map returns results in submission order however workers finish
+        yield from pool.map(compile_file, work, chunksize=chunksize)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile Mini C sources to IR and x86-64 assembly.")
+    parser.add_argument('paths', nargs='+', help="source files, directories or glob patterns")
+    parser.add_argument('-o', '--out-dir', help="write outputs here, mirroring the input tree "
+                                                "(default: next to each source)")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--pattern', default='*.c', help="file pattern for directories (default: *.c)")
+    parser.add_argument('--emit', default='ir,asm', help="comma separated outputs: ir, asm (default: ir,asm)")
+    parser.add_argument('--no-optimize', action='store_true', help="skip the AST optimizer")
+    parser.add_argument('--no-ir-optimize', action='store_true', help="skip the IR optimizer")
+    parser.add_argument('--chunksize', type=int, default=None, help="files per task sent to a worker")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print failures and the summary")
+    args = parser.parse_args(argv)
+
+    emit = tuple(part for part in args.emit.split(',') if part)
+    unknown = set(emit) - {'ir', 'asm'}
+    if unknown:
+        parser.error(f"unknown --emit value(s): {', '.join(sorted(unknown))}")
+    # Nothing reads the token list in batch mode, let the parser stream it
+    options = {'optimize': not args.no_optimize, 'ir_optimize': not args.no_ir_optimize,
+               'keep_tokens': False}
+
+    files = collect_sources(args.paths, args.pattern)
+    if not files:
+        print("no source files found", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    compiled = failed = lines = 0
+    for summary in run_batch(files, options, emit, args.out_dir, args.jobs, args.chunksize):
+        lines += summary['lines']
+        if summary['ok']:
+            compiled += 1
+            if not args.quiet:
+                print(f"ok    {summary['path']}  ({summary['instructions']} IR instructions, "
+                      f"{summary['seconds'] * 1e3:.1f} ms)")
+                for warning in summary['warnings']:
+                    print(f"        {warning}")
+        else:
+            failed += 1
+            print(f"FAIL  {summary['path']}  [{summary['phase']}]")
+            for error in summary['errors']:
+                print(f"        {error}")
+    elapsed = time.perf_counter() - start
+
+    rate = len(files) / elapsed if elapsed else 0.0
+    line_rate = lines / elapsed if elapsed else 0.0
+    print(f"{len(files)} files, {compiled} compiled, {failed} failed in {elapsed:.2f} s "
+          f"({rate:.1f} files/s, {line_rate:.0f} lines/s)")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
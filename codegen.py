@@ -0,0 +1,483 @@
+# codegen.py
+# x86-64 backend: live intervals from cfg.Liveness, linear-scan register
+# allocation, and GAS assembly (Intel syntax) following the System V AMD64
+# calling convention. Recycled temps are split back into one name per value
+# first, so each gets a short interval.
+# Every value is a 64-bit integer held in a general-purpose register: there
+# is no SSE/XMM code, so a function with a float constant (or a string used
+# as a value) raises CodegenError. The pipeline records that on the result
+# and keeps the IR and bytecode; the VM and the JIT run such programs.
+import bisect
+import time
+
+from cfg import FunctionCFG, Liveness, defs_uses, function_ranges
+from ir import Kind, NONE, Op
+from temps import split_temps
+from tracing import tracer
+
+ARG_REGISTERS = ('rdi', 'rsi', 'rdx', 'rcx', 'r8', 'r9')
+CALLER_SAVED = ('rcx', 'rsi', 'rdi', 'r8', 'r9', 'r10')
+CALLEE_SAVED = ('rbx', 'r12', 'r13', 'r14', 'r15')
+# rax and rdx are taken by idiv and call results; r11 is the scratch register
+SCRATCH = 'r11'
+
+ARITHMETIC = {Op.ADD: 'add', Op.SUB: 'sub', Op.MUL: 'imul'}
+CONDITIONS = {Op.EQ: 'e', Op.NE: 'ne', Op.LT: 'l', Op.GT: 'g', Op.LE: 'le', Op.GE: 'ge'}
+NEGATED = {'e': 'ne', 'ne': 'e', 'l': 'ge', 'ge': 'l', 'g': 'le', 'le': 'g'}
+SWAPPED = {'e': 'e', 'ne': 'ne', 'l': 'g', 'g': 'l', 'le': 'ge', 'ge': 'le'}
+EVALUATE = {
+    'e': lambda x, y: x == y, 'ne': lambda x, y: x != y,
+    'l': lambda x, y: x < y, 'g': lambda x, y: x > y,
+    'le': lambda x, y: x <= y, 'ge': lambda x, y: x >= y,
+}
+
+class CodegenError(Exception):
+    pass
+
+class Interval:
+    __slots__ = ('operand', 'start', 'end', 'crosses_call', 'register', 'slot')
+
+    def __init__(self, operand, start):
+        self.operand = operand
+        self.start = start
+        self.end = start
+        self.crosses_call = False
+        self.register = None
+        self.slot = None
+
+    def __repr__(self):
+        where = self.register if self.register else f"slot {self.slot}"
+        return f"Interval({self.operand}, {self.start}-{self.end}, {where})"
+
+def live_intervals(cfg, liveness):
+    """One interval per variable or temp, covering every position where it is live."""
+    kinds = cfg.operands.kinds
+    variables = [None] * len(liveness.bit)
+    for v, bit in liveness.bit.items():
+        variables[bit] = v
+    intervals = {}
+
+    def touch(v, pos):
+        interval = intervals.get(v)
+        if interval is None:
+            intervals[v] = Interval(v, pos)
+        elif pos < interval.start:
+            interval.start = pos
+        elif pos > interval.end:
+            interval.end = pos
+
+    for block in cfg.blocks:
+        for mask, pos in ((liveness.live_in[block.index], block.start),
+                          (liveness.live_out[block.index], block.end - 1)):
+            while mask:
+                low = mask & -mask
+                touch(variables[low.bit_length() - 1], pos)
+                mask ^= low
+        for i, instr in cfg.instructions(block):
+            d, used = defs_uses(kinds, instr)
+            if d != NONE:
+                touch(d, i)
+            for v in used:
+                touch(v, i)
+
+    calls = [i for i, instr in enumerate(cfg.code) if instr is not None and instr[0] == Op.CALL]
+    for interval in intervals.values():
+        k = bisect.bisect_right(calls, interval.start)
+        interval.crosses_call = k < len(calls) and calls[k] < interval.end
+    return sorted(intervals.values(), key=lambda interval: (interval.start, interval.operand))
+
+class LinearScan:
+    """Poletto & Sarkar linear scan. Intervals live across a call may only
+    take callee-saved registers; the rest prefer caller-saved ones."""
+
+    def __init__(self, caller_saved=CALLER_SAVED, callee_saved=CALLEE_SAVED):
+        self.caller_saved = caller_saved
+        self.callee_saved = callee_saved
+        self.slots = 0
+        self.used = set()
+
+    def allocate(self, intervals):
+        free_caller = list(reversed(self.caller_saved))
+        free_callee = list(reversed(self.callee_saved))
+        active = []               # (end, operand, interval), sorted by end
+        for interval in intervals:
+            while active and active[0][0] < interval.start:
+                _, _, done = active.pop(0)
+                (free_callee if done.register in self.callee_saved else free_caller).append(done.register)
+
+            if not interval.crosses_call and free_caller:
+                interval.register = free_caller.pop()
+            elif free_callee:
+                interval.register = free_callee.pop()
+            else:
+                self._spill_at(interval, active)
+                continue
+            self.used.add(interval.register)
+            bisect.insort(active, (interval.end, interval.operand, interval))
+
+    def _spill_at(self, interval, active):
+        # Evict the eligible active interval that ends last, if it outlives this one
+        for k in range(len(active) - 1, -1, -1):
+            victim = active[k][2]
+            if interval.crosses_call and victim.register not in self.callee_saved:
+                continue
+            if victim.end > interval.end:
+                interval.register = victim.register
+                victim.register = None
+                self._assign_slot(victim)
+                del active[k]
+                bisect.insort(active, (interval.end, interval.operand, interval))
+                return
+            break
+        self._assign_slot(interval)
+
+    def _assign_slot(self, interval):
+        interval.slot = self.slots
+        self.slots += 1
+
+def is_register(location):
+    return isinstance(location, str) and not location.startswith('QWORD')
+
+def fits_imm32(value):
+    return -2**31 <= value < 2**31
+
+class _FunctionEmitter:
+    def __init__(self, generator, cfg):
+        self.generator = generator
+        self.operands = cfg.operands
+        self.cfg = cfg
+        if split_temps(cfg):
+            cfg.rebuild()
+        self.name = self.operands.value(cfg.code[0][2])
+        self.lines = generator.lines
+        self.pushed = 0
+
+    def allocate(self):
+        start = time.perf_counter()
+        liveness = Liveness(self.cfg)
+        self.intervals = live_intervals(self.cfg, liveness)
+        self.entry_live = [v for v, bit in liveness.bit.items()
+                           if self.cfg.blocks and (liveness.live_in[0] >> bit) & 1]
+        self.scan = LinearScan()
+        self.scan.allocate(self.intervals)
+        self.saved = [r for r in CALLEE_SAVED if r in self.scan.used]
+        self.locations = {}
+        for interval in self.intervals:
+            if interval.register is not None:
+                self.locations[interval.operand] = interval.register
+            else:
+                offset = 8 * len(self.saved) + 8 * (interval.slot + 1)
+                self.locations[interval.operand] = f"QWORD PTR [rbp-{offset}]"
+        return {
+            'function': self.name,
+            'instructions': sum(1 for instr in self.cfg.code if instr is not None),
+            'intervals': len(self.intervals),
+            'spilled': self.scan.slots,
+            'registers': len(self.scan.used),
+            'seconds': time.perf_counter() - start,
+        }
+
+    def emit(self, text):
+        self.lines.append(f"    {text}")
+
+    def location(self, operand):
+        kind = self.operands.kinds[operand]
+        if kind == Kind.CONST:
+            value = self.operands.value(operand)
+            if not isinstance(value, int):
+                raise CodegenError(f"{self.name}: non-integer constant {value!r} is not supported")
+            return int(value)
+        if kind == Kind.STRING:
+            raise CodegenError(f"{self.name}: string constant used as a value")
+        # A variable that is never live has no interval; park it in the scratch register
+        return self.locations.get(operand, SCRATCH)
+
+    def load(self, register, source):
+        if isinstance(source, int) or source != register:
+            self.emit(f"mov {register}, {source}")
+
+    def move(self, dst, source):
+        if dst == source:
+            return
+        if is_register(dst):
+            self.load(dst, source)
+        elif is_register(source) or (isinstance(source, int) and fits_imm32(source)):
+            self.emit(f"mov {dst}, {source}")
+        else:
+            self.load(SCRATCH, source)
+            self.emit(f"mov {dst}, {SCRATCH}")
+
+    def source(self, value):
+        """value as the second operand of an ALU instruction."""
+        if isinstance(value, int) and not fits_imm32(value):
+            self.load('rax', value)
+            return 'rax'
+        return value
+
+    # -- function body ---------------------------------------------------------
+
+    def generate(self):
+        stats = self.allocate()
+        self.prologue()
+        code = self.cfg.code
+        uses = self.use_counts()
+        i = 1
+        while i < len(code):
+            instr = code[i]
+            i += 1
+            if instr is None:
+                continue
+            op, d, a, b = instr
+            if op in CONDITIONS:
+                # Fuse a compare that only feeds the following branch
+                following = code[i] if i < len(code) else None
+                if following is not None and following[0] in (Op.IF_TRUE, Op.IF_FALSE) \
+                        and following[2] == d and uses.get(d) == 1 \
+                        and self.operands.kinds[d] == Kind.TEMP:
+                    i += 1
+                    self.branch_compare(op, a, b, following[0] == Op.IF_TRUE, following[3])
+                    continue
+                self.compare_value(op, d, a, b)
+            elif op in ARITHMETIC:
+                self.arithmetic(op, d, a, b)
+            elif op == Op.DIV:
+                self.divide(d, a, b)
+            elif op == Op.COPY:
+                self.copy(d, a)
+            elif op == Op.LABEL:
+                self.lines.append(f"{self.label(a)}:")
+            elif op == Op.GOTO:
+                self.emit(f"jmp {self.label(a)}")
+            elif op in (Op.IF_TRUE, Op.IF_FALSE):
+                self.branch(self.location(a), op == Op.IF_TRUE, b)
+            elif op == Op.ARG:
+                self.push(self.location(a))
+            elif op == Op.CALL:
+                self.call(d, a, b)
+            elif op == Op.RETURN:
+                self.epilogue(a)
+        return stats
+
+    def use_counts(self):
+        counts = {}
+        for instr in self.cfg.code:
+            if instr is not None:
+                for v in defs_uses(self.operands.kinds, instr)[1]:
+                    counts[v] = counts.get(v, 0) + 1
+        return counts
+
+    def label(self, operand):
+        return f".L{self.operands.value(operand)}"
+
+    def prologue(self):
+        self.lines.append(f"    .globl {self.name}")
+        self.lines.append(f"    .type {self.name}, @function")
+        self.lines.append(f"{self.name}:")
+        self.emit("push rbp")
+        self.emit("mov rbp, rsp")
+        for register in self.saved:
+            self.emit(f"push {register}")
+        frame = 8 * self.scan.slots
+        if (8 * len(self.saved) + frame) % 16:
+            frame += 8
+        if frame:
+            self.emit(f"sub rsp, {frame}")
+
+        # Incoming arguments to their allocated homes: register sources as a
+        # parallel move first, then the ones passed on the stack
+        params = [instr[2] for instr in self.cfg.code if instr is not None and instr[0] == Op.PARAM]
+        moves = []
+        for k, param in enumerate(params):
+            home = self.locations.get(param)
+            if home is None:
+                continue
+            incoming = ARG_REGISTERS[k] if k < len(ARG_REGISTERS) else \
+                f"QWORD PTR [rbp+{16 + 8 * (k - len(ARG_REGISTERS))}]"
+            moves.append((home, incoming))
+        self.parallel_move([m for m in moves if is_register(m[1])])
+        for home, incoming in moves:
+            if not is_register(incoming):
+                self.move(home, incoming)
+        # Variables read before any assignment start out as 0, as in the VM
+        for v in self.entry_live:
+            if v not in params:
+                self.move(self.locations[v], 0)
+
+    def parallel_move(self, moves):
+        pending = [(dst, src) for dst, src in moves if dst != src]
+        while pending:
+            sources = {src for _, src in pending}
+            for k, (dst, src) in enumerate(pending):
+                if dst not in sources:
+                    self.move(dst, src)
+                    del pending[k]
+                    break
+            else:
+                # Every destination is still needed: break the cycle via scratch
+                dst, src = pending[0]
+                self.emit(f"mov {SCRATCH}, {src}")
+                pending = [(d, SCRATCH if s == src else s) for d, s in pending]
+
+    def epilogue(self, value):
+        if value != NONE:
+            self.load('rax', self.location(value))
+        if self.saved:
+            self.emit(f"lea rsp, [rbp-{8 * len(self.saved)}]")
+            for register in reversed(self.saved):
+                self.emit(f"pop {register}")
+        else:
+            self.emit("mov rsp, rbp")
+        self.emit("pop rbp")
+        self.emit("ret")
+
+    # -- instructions ----------------------------------------------------------
+
+    def copy(self, d, a):
+        dst = self.location(d)
+        if self.operands.kinds[a] == Kind.STRING:
+            label = self.generator.string_label(self.operands.value(a))
+            register = dst if is_register(dst) else SCRATCH
+            self.emit(f"lea {register}, {label}[rip]")
+            self.move(dst, register)
+            return
+        self.move(dst, self.location(a))
+
+    def arithmetic(self, op, d, a, b):
+        mnemonic = ARITHMETIC[op]
+        dst, left, right = self.location(d), self.location(a), self.location(b)
+        if is_register(dst) and dst != right:
+            self.load(dst, left)
+            self.emit(f"{mnemonic} {dst}, {self.source(right)}")
+        elif is_register(dst) and op != Op.SUB:
+            # dst already holds the right operand of a commutative op
+            self.emit(f"{mnemonic} {dst}, {self.source(left)}")
+        else:
+            self.load(SCRATCH, left)
+            self.emit(f"{mnemonic} {SCRATCH}, {self.source(right)}")
+            self.move(dst, SCRATCH)
+
+    def divide(self, d, a, b):
+        # Truncating division; x / 0 is 0 as in ir.c_divide instead of a trap
+        n = self.generator.next_local()
+        self.load(SCRATCH, self.location(b))
+        self.load('rax', self.location(a))
+        self.emit(f"test {SCRATCH}, {SCRATCH}")
+        self.emit(f"je .Ldz{n}")
+        self.emit("cqo")
+        self.emit(f"idiv {SCRATCH}")
+        self.emit(f"jmp .Ldd{n}")
+        self.lines.append(f".Ldz{n}:")
+        self.emit("xor eax, eax")
+        self.lines.append(f".Ldd{n}:")
+        self.move(self.location(d), 'rax')
+
+    def compare(self, op, a, b):
+        """Emit cmp for a <op> b; returns the condition code, or a bool when
+        both sides are constants."""
+        cond = CONDITIONS[op]
+        left, right = self.location(a), self.location(b)
+        if isinstance(left, int):
+            if isinstance(right, int):
+                return EVALUATE[cond](left, right)
+            left, right, cond = right, left, SWAPPED[cond]
+        elif not is_register(left) and not is_register(right) and not isinstance(right, int):
+            self.load(SCRATCH, left)
+            left = SCRATCH
+        self.emit(f"cmp {left}, {self.source(right)}")
+        return cond
+
+    def compare_value(self, op, d, a, b):
+        cond = self.compare(op, a, b)
+        if isinstance(cond, bool):
+            self.move(self.location(d), int(cond))
+            return
+        self.emit(f"set{cond} al")
+        self.emit("movzx eax, al")
+        self.move(self.location(d), 'rax')
+
+    def branch_compare(self, op, a, b, when_true, target):
+        cond = self.compare(op, a, b)
+        if isinstance(cond, bool):
+            if cond == when_true:
+                self.emit(f"jmp {self.label(target)}")
+            return
+        self.emit(f"j{cond if when_true else NEGATED[cond]} {self.label(target)}")
+
+    def branch(self, value, when_true, target):
+        if isinstance(value, int):
+            if bool(value) == when_true:
+                self.emit(f"jmp {self.label(target)}")
+            return
+        self.emit(f"cmp {value}, 0")
+        self.emit(f"{'jne' if when_true else 'je'} {self.label(target)}")
+
+    def push(self, value):
+        if isinstance(value, int) and not fits_imm32(value):
+            self.load(SCRATCH, value)
+            value = SCRATCH
+        self.emit(f"push {value}")
+        self.pushed += 1
+
+    def call(self, d, a, b):
+        name = self.operands.value(a)
+        count = self.operands.value(b)
+        on_stack = max(0, count - len(ARG_REGISTERS))
+        # Arguments were pushed first to last; System V wants argument 7 at
+        # [rsp] at the call, so stack arguments are pushed again in reverse
+        pad = 8 if (self.pushed + on_stack) % 2 else 0
+        if pad:
+            self.emit("sub rsp, 8")
+        for k in range(on_stack):
+            index = count - 1 - k
+            self.emit(f"push QWORD PTR [rsp+{pad + 8 * k + 8 * (count - 1 - index)}]")
+        base = pad + 8 * on_stack
+        for index in range(min(count, len(ARG_REGISTERS))):
+            self.emit(f"mov {ARG_REGISTERS[index]}, QWORD PTR [rsp+{base + 8 * (count - 1 - index)}]")
+        self.emit("xor eax, eax")
+        self.emit(f"call {name}" if name in self.generator.defined else f"call {name}@PLT")
+        released = 8 * (count + on_stack) + pad
+        if released:
+            self.emit(f"add rsp, {released}")
+        self.pushed -= count
+        self.move(self.location(d), 'rax')
+
+class CodeGenerator:
+    """Translate an IRProgram into x86-64 assembly lines."""
+
+    def __init__(self, program):
+        self.program = program
+        self.lines = []
+        self.strings = {}
+        self.defined = set()
+        self.allocation_stats = []
+        self._locals = 0
+
+    def next_local(self):
+        self._locals += 1
+        return self._locals
+
+    def string_label(self, value):
+        label = self.strings.get(value)
+        if label is None:
+            label = self.strings[value] = f".LC{len(self.strings)}"
+        return label
+
+    def generate(self):
+        program = self.program
+        ranges = function_ranges(program)
+        self.defined = {program.operands.value(program.arg1[start]) for start, _ in ranges}
+        self.lines = [".intel_syntax noprefix", ".text"]
+        for start, end in ranges:
+            with tracer.span('CodeGenerator.function', 'codegen', instructions=end - start):
+                emitter = _FunctionEmitter(self, FunctionCFG(program, start, end))
+                self.allocation_stats.append(emitter.generate())
+            self.lines.append("")
+        if self.strings:
+            self.lines.append(".section .rodata")
+            for value, label in self.strings.items():
+                self.lines.append(f"{label}:")
+                self.lines.append(f"    .string \"{value}\"")
+        self.lines.append(".section .note.GNU-stack,\"\",@progbits")
+        return self.lines
+
+__all__ = ['CodeGenerator', 'CodegenError', 'LinearScan', 'Interval', 'live_intervals']
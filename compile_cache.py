@@ -0,0 +1,135 @@
+# compile_cache.py
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+def make_key(source, options):
+    """Content address of a compile: hash of the source text plus options."""
+    digest = hashlib.sha256()
+    digest.update(source.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def estimate_size(obj):
+    """Approximate deep size in bytes, walked with an explicit stack so that
+    deep ASTs do not hit the recursion limit."""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+
+        if isinstance(item, (str, bytes, int, float, bool)) or item is None:
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        else:
+            attrs = getattr(item, '__dict__', None)
+            if attrs is not None:
+                stack.append(attrs)
+            for slot in getattr(type(item), '__slots__', ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
+
+class CacheEntry:
+    def __init__(self, key, result, size):
+        self.key = key
+        self.result = result
+        self.size = size
+        self.hits = 0
+
+class CompileCache:
+    """LRU cache of CompileResult objects bounded by entry count and bytes.
+    Safe to share between threads (the Streamlit app keeps one for all
+    sessions); compiling and sizing a result happen outside the lock."""
+
+    def __init__(self, max_entries=32, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            return entry.result
+
+    def put(self, key, result):
+        size = estimate_size(result)
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.size
+            if size > self.max_bytes:
+                # Larger than the whole budget: serve it once, never store it
+                return result
+
+            self.entries[key] = CacheEntry(key, result, size)
+            self.total_bytes += size
+            self._evict()
+        return result
+
+    def get_or_compile(self, source, options, compile_fn):
+        key = make_key(source, options)
+        result = self.get(key)
+        if result is None:
+            result = self.put(key, compile_fn(source, options))
+        return result
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def _evict(self):
+        # Called with the lock held
+        while self.entries and (len(self.entries) > self.max_entries or
+                                self.total_bytes > self.max_bytes):
+            _, entry = self.entries.popitem(last=False)
+            self.total_bytes -= entry.size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+            }
+
+    def entry_info(self):
+        """Most recently used first, for display."""
+        with self._lock:
+            return [
+                {'Key': entry.key[:12], 'Size (KB)': round(entry.size / 1024, 1), 'Hits': entry.hits}
+                for entry in reversed(self.entries.values())
+            ]
@@ -1,225 +1,245 @@
+import heapq
+
+from ir import AST_BINARY_OPS, IRProgram, Kind, NONE, Op
+from tracing import tracer
+from traversal import trampoline
+
 class IRGenerator:
     def __init__(self):
+        # Temps are numbered per function and recycled: an expression's
+        # operands go back to the pool once consumed, and the whole pool is
+        # free again after every statement
         self.temp_count = 0
+        self.reserved_temps = 0   # temps live for the whole function (the return value)
+        self.free_temps = []      # released temp numbers, lowest first
         self.label_count = 0
-        self.code = []
+        self.program = IRProgram()
+        self.operands = self.program.operands
         self.current_function = None
         self.return_label = None
         self.return_temp = None
+        # Set once the current function touches a float or string value;
+        # functions that never do are recorded in program.integer_functions
+        self.uses_float = False
+        self.float_functions = set()
+        self._handlers = {}
 
     def new_temp(self):
+        if self.free_temps:
+            return self.operands.intern(Kind.TEMP, heapq.heappop(self.free_temps))
         self.temp_count += 1
-        return f"t{self.temp_count}"
+        return self.operands.intern(Kind.TEMP, self.temp_count)
+
+    def release(self, operand):
+        """Give a temp back to the pool once its value has been consumed."""
+        if self.operands.kinds[operand] == Kind.TEMP and operand != self.return_temp:
+            heapq.heappush(self.free_temps, self.operands.values[operand])
+
+    def end_statement(self):
+        self.free_temps = list(range(self.reserved_temps + 1, self.temp_count + 1))
 
     def new_label(self):
         self.label_count += 1
-        return f"L{self.label_count}"
+        return self.operands.intern(Kind.LABEL, self.label_count)
+
+    def emit(self, op, dst=NONE, a=NONE, b=NONE):
+        self.program.emit(op, dst, a, b)
+
+    def var(self, name):
+        return self.operands.intern(Kind.VAR, name)
+
+    def const(self, value):
+        return self.operands.intern(Kind.CONST, value)
 
     def generate(self, node):
         if node is None:
             return None
+        return trampoline(node, self._dispatch)
 
-        method_name = f'generate_{node.type}'
-        method = getattr(self, method_name, self.generate_default)
-        return method(node)
+    # Handlers either return a value directly (leaves) or are generators that
+    # yield child nodes and receive their results; see traversal.trampoline.
+    def _dispatch(self, node):
+        if node is None:
+            return None
+        handler = self._handlers.get(node.type)
+        if handler is None:
+            if node.type in AST_BINARY_OPS:
+                handler = self.generate_binary
+            else:
+                handler = getattr(self, f'generate_{node.type}', self.generate_default)
+            self._handlers[node.type] = handler
+        return handler(node)
 
     def generate_default(self, node):
         results = []
         for child in node.children:
-            result = self.generate(child)
+            result = yield child
             if result is not None:
                 results.append(result)
         return results[0] if results else None
 
     def generate_Program(self, node):
+        self.float_functions = {child.children[1].value for child in node.children
+                                if child.children[0].value == 'float'}
         for child in node.children:
-            self.generate(child)
+            yield child
 
-    def generate_FunctionDef(self, node):
+    def generate_Function(self, node):
         func_name = node.children[1].value
         return_type = node.children[0].value
-        
+
         prev_function = self.current_function
         prev_return_label = self.return_label
         prev_return_temp = self.return_temp
-        
+        prev_uses_float = self.uses_float
+
         self.current_function = func_name
+        self.uses_float = return_type == 'float'
+        self.temp_count = 0
+        self.free_temps = []
         self.return_label = self.new_label()
         self.return_temp = self.new_temp() if return_type != 'void' else None
-        
-        self.code.append(f"func {func_name}:")
-        
-        if len(node.children) > 3 and node.children[2].type == 'ParamList':
+        self.reserved_temps = self.temp_count
+
+        func = self.operands.intern(Kind.FUNC, func_name)
+        self.emit(Op.FUNC, a=func)
+
+        if len(node.children) > 3 and node.children[2].type == 'Params':
             for param in node.children[2].children:
                 param_name = param.children[1].value
-                self.code.append(f"param {param_name}")
-        
-        self.generate(node.children[-1])
-        
-        if return_type == 'void':
-            self.code.append("return")
-        
-        self.code.append(f"{self.return_label}:")
-        
+                if param.children[0].value == 'float':
+                    self.uses_float = True
+                self.emit(Op.PARAM, a=self.var(param_name))
+
+        first = len(self.program)
+        with tracer.span('IRGenerator.function', 'irgen', function=func_name) as span:
+            yield node.children[-1]
+
+            # Single exit: every return jumps here and the value leaves explicitly
+            self.emit(Op.LABEL, a=self.return_label)
+            self.emit(Op.RETURN, a=self.return_temp if self.return_temp is not None else NONE)
+            span.set(instructions=len(self.program) - first)
+        if return_type != 'void' and not self.uses_float:
+            self.program.integer_functions.add(func)
+
         self.current_function = prev_function
         self.return_label = prev_return_label
         self.return_temp = prev_return_temp
+        self.uses_float = prev_uses_float
 
     def generate_Block(self, node):
         for stmt in node.children:
-            self.generate(stmt)
+            yield stmt
+            self.end_statement()
 
-    def generate_Declaration(self, node):
+    def generate_VarDecl(self, node):
         var_name = node.children[1].value
-        
+        if node.children[0].value == 'float':
+            self.uses_float = True
+
         if len(node.children) > 2:
-            expr_result = self.generate(node.children[2])
-            self.code.append(f"{var_name} = {expr_result}")
+            expr_result = yield node.children[2]
+            self.emit(Op.COPY, self.var(var_name), expr_result)
+            self.release(expr_result)
 
     def generate_Assignment(self, node):
         var_name = node.children[0].value
-        expr_result = self.generate(node.children[1])
-        self.code.append(f"{var_name} = {expr_result}")
+        expr_result = yield node.children[1]
+        self.emit(Op.COPY, self.var(var_name), expr_result)
+        self.release(expr_result)
 
     def generate_Return(self, node):
         if len(node.children) > 0:
-            expr_result = self.generate(node.children[0])
-            if self.return_temp:
-                self.code.append(f"{self.return_temp} = {expr_result}")
-            self.code.append(f"goto {self.return_label}")
+            expr_result = yield node.children[0]
+            if self.return_temp is not None:
+                self.emit(Op.COPY, self.return_temp, expr_result)
+            self.release(expr_result)
+            self.emit(Op.GOTO, a=self.return_label)
         else:
-            self.code.append(f"goto {self.return_label}")
+            self.emit(Op.GOTO, a=self.return_label)
 
     def generate_If(self, node):
-        cond_result = self.generate(node.children[0])
+        cond_result = yield node.children[0]
         false_label = self.new_label()
         end_label = self.new_label()
-        
-        self.code.append(f"if not {cond_result} goto {false_label}")
-        self.generate(node.children[1])
-        self.code.append(f"goto {end_label}")
-        self.code.append(f"{false_label}:")
-        self.code.append(f"{end_label}:")
+
+        self.emit(Op.IF_FALSE, a=cond_result, b=false_label)
+        self.release(cond_result)
+        yield node.children[1]
+        self.emit(Op.GOTO, a=end_label)
+        self.emit(Op.LABEL, a=false_label)
+        self.emit(Op.LABEL, a=end_label)
 
     def generate_IfElse(self, node):
-        cond_result = self.generate(node.children[0])
+        cond_result = yield node.children[0]
         false_label = self.new_label()
         end_label = self.new_label()
-        
-        self.code.append(f"if not {cond_result} goto {false_label}")
-        self.generate(node.children[1])
-        self.code.append(f"goto {end_label}")
-        self.code.append(f"{false_label}:")
-        self.generate(node.children[2])
-        self.code.append(f"{end_label}:")
+
+        self.emit(Op.IF_FALSE, a=cond_result, b=false_label)
+        self.release(cond_result)
+        yield node.children[1]
+        self.emit(Op.GOTO, a=end_label)
+        self.emit(Op.LABEL, a=false_label)
+        yield node.children[2]
+        self.emit(Op.LABEL, a=end_label)
 
     def generate_While(self, node):
         start_label = self.new_label()
         cond_label = self.new_label()
         end_label = self.new_label()
-        
-        self.code.append(f"goto {cond_label}")
-        self.code.append(f"{start_label}:")
-        self.generate(node.children[1])
-        self.code.append(f"{cond_label}:")
-        cond_result = self.generate(node.children[0])
-        self.code.append(f"if {cond_result} goto {start_label}")
-        self.code.append(f"{end_label}:")
-
-    def generate_FunctionCall(self, node):
+
+        self.emit(Op.GOTO, a=cond_label)
+        self.emit(Op.LABEL, a=start_label)
+        yield node.children[1]
+        self.emit(Op.LABEL, a=cond_label)
+        cond_result = yield node.children[0]
+        self.emit(Op.IF_TRUE, a=cond_result, b=start_label)
+        self.release(cond_result)
+        self.emit(Op.LABEL, a=end_label)
+
+    def generate_Call(self, node):
         func_name = node.children[0].value
+        if func_name in self.float_functions:
+            self.uses_float = True
         args = []
-        
+
         if len(node.children) > 1:
             for arg in node.children[1].children:
-                arg_result = self.generate(arg)
+                arg_result = yield arg
                 args.append(arg_result)
-                self.code.append(f"param {arg_result}")
-        
+                self.emit(Op.ARG, a=arg_result)
+                self.release(arg_result)
+
         result_temp = self.new_temp()
-        self.code.append(f"{result_temp} = call {func_name}, {len(args)}")
+        self.emit(Op.CALL, result_temp, self.operands.intern(Kind.FUNC, func_name),
+                  self.const(len(args)))
         return result_temp
 
-    def generate_PLUS(self, node):
-        left = self.generate(node.children[0])
-        right = self.generate(node.children[1])
-        temp = self.new_temp()
-        self.code.append(f"{temp} = {left} + {right}")
-        return temp
-
-    def generate_MINUS(self, node):
-        left = self.generate(node.children[0])
-        right = self.generate(node.children[1])
-        temp = self.new_temp()
-        self.code.append(f"{temp} = {left} - {right}")
-        return temp
-
-    def generate_TIMES(self, node):
-        left = self.generate(node.children[0])
-        right = self.generate(node.children[1])
-        temp = self.new_temp()
-        self.code.append(f"{temp} = {left} * {right}")
-        return temp
-
-    def generate_DIVIDE(self, node):
-        left = self.generate(node.children[0])
-        right = self.generate(node.children[1])
-        temp = self.new_temp()
-        self.code.append(f"{temp} = {left} / {right}")
-        return temp
-
-    def generate_EQ(self, node):
-        left = self.generate(node.children[0])
-        right = self.generate(node.children[1])
-        temp = self.new_temp()
-        self.code.append(f"{temp} = {left} == {right}")
-        return temp
-
-    def generate_NEQ(self, node):
-        left = self.generate(node.children[0])
-        right = self.generate(node.children[1])
+    def generate_binary(self, node):
+        left = yield node.children[0]
+        right = yield node.children[1]
+        self.release(left)
+        self.release(right)
         temp = self.new_temp()
-        self.code.append(f"{temp} = {left} != {right}")
-        return temp
-
-    def generate_LT(self, node):
-        left = self.generate(node.children[0])
-        right = self.generate(node.children[1])
-        temp = self.new_temp()
-        self.code.append(f"{temp} = {left} < {right}")
-        return temp
-
-    def generate_GT(self, node):
-        left = self.generate(node.children[0])
-        right = self.generate(node.children[1])
-        temp = self.new_temp()
-        self.code.append(f"{temp} = {left} > {right}")
-        return temp
-
-    def generate_LE(self, node):
-        left = self.generate(node.children[0])
-        right = self.generate(node.children[1])
-        temp = self.new_temp()
-        self.code.append(f"{temp} = {left} <= {right}")
-        return temp
-
-    def generate_GE(self, node):
-        left = self.generate(node.children[0])
-        right = self.generate(node.children[1])
-        temp = self.new_temp()
-        self.code.append(f"{temp} = {left} >= {right}")
+        self.emit(AST_BINARY_OPS[node.type], temp, left, right)
         return temp
 
     def generate_Literal(self, node):
-        return node.value
+        if type(node.value) is float:
+            self.uses_float = True
+        return self.const(node.value)
 
     def generate_Variable(self, node):
-        return node.value
+        return self.var(node.value)
 
     def generate_StringLiteral(self, node):
+        self.uses_float = True
         temp = self.new_temp()
-        self.code.append(f"{temp} = \"{node.value}\"")
+        self.emit(Op.COPY, temp, self.operands.intern(Kind.STRING, node.value))
         return temp
 
+    def get_ir(self):
+        return self.program
+
     def get_code(self):
-        return self.code
+        return self.program.to_text()
@@ -0,0 +1,418 @@
+# interprocedural.py
+# Whole-program passes over the parser's tree that look across Call nodes.
+# CallGraph records which functions each function calls, which ones are
+# recursive (strongly connected components) and which are pure: no printf,
+# no string literal and no unknown callee, transitively. Inliner splices
+# small straight-line functions into the statements that call them.
+# Evaluator runs a pure function on constant arguments at compile time,
+# under a step budget so that a runaway loop or recursion just leaves the
+# call in place.
+import math
+
+from ir import AST_BINARY_OPS, FOLDS
+from names import canonical, name_id
+from parser import ASTNode
+from traversal import clone, trampoline, walk
+
+INLINE_MAX_NODES = 40             # largest callee body inlined, in AST nodes
+INLINE_MAX_GROWTH = 4000          # nodes the inliner may add to one program
+EVAL_BUDGET = 200_000             # evaluator steps for a whole program
+EVAL_CALL_BUDGET = 20_000         # evaluator steps for one call
+INT64 = range(-2 ** 63, 2 ** 63)
+
+# Statements an inlined body may consist of, besides a final return
+STRAIGHT_LINE = ('VarDecl', 'Assignment', 'ExprStmt')
+
+class CallGraph:
+    def __init__(self, program):
+        self.functions = {}       # name id -> Function node
+        self.callees = {}         # name id -> ids of the functions it calls
+        effects = set()           # functions printing a string themselves
+        for function in program.children:
+            key = name_id(function.children[1].value)
+            self.functions[key] = function
+            calls = set()
+            for node, _ in walk(function.children[-1]):
+                if node.type == 'Call':
+                    calls.add(name_id(node.children[0].value))
+                elif node.type == 'StringLiteral':
+                    effects.add(key)
+            self.callees[key] = calls
+        self.recursive = self._recursive()
+        self.pure = self._pure(effects)
+
+    def _pure(self, effects):
+        callers = {}
+        impure = set(effects)
+        for key, calls in self.callees.items():
+            for callee in calls:
+                callers.setdefault(callee, []).append(key)
+                if callee not in self.functions:
+                    impure.add(key)   # printf, or a function never defined
+        work = list(impure)
+        while work:
+            for caller in callers.get(work.pop(), ()):
+                if caller not in impure:
+                    impure.add(caller)
+                    work.append(caller)
+        return set(self.functions) - impure
+
+    def _recursive(self):
+        """Functions on a call cycle, by Tarjan's algorithm with an explicit stack."""
+        index, low = {}, {}
+        stack, on_stack = [], set()
+        recursive = set()
+        for root in self.functions:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self.callees[root]))]
+            while work:
+                key, callees = work[-1]
+                for callee in callees:
+                    if callee not in self.functions:
+                        continue
+                    if callee not in index:
+                        index[callee] = low[callee] = len(index)
+                        stack.append(callee)
+                        on_stack.add(callee)
+                        work.append((callee, iter(self.callees[callee])))
+                        break
+                    if callee in on_stack:
+                        low[key] = min(low[key], index[callee])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[key])
+                    if low[key] == index[key]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == key:
+                                break
+                        if len(component) > 1 or key in self.callees[key]:
+                            recursive.update(component)
+        return recursive
+
+# -- inlining ------------------------------------------------------------------
+
+def _call_site(stmt):
+    """The Call a statement consists of (int x = f(..); x = f(..);
+    f(..); return f(..);), or None."""
+    if stmt is None:
+        return None
+    if stmt.type == 'VarDecl':
+        call = stmt.children[2] if len(stmt.children) > 2 else None
+    elif stmt.type == 'Assignment':
+        call = stmt.children[1]
+    elif stmt.type in ('ExprStmt', 'Return'):
+        call = stmt.children[0] if stmt.children else None
+    else:
+        return None
+    return call if call is not None and call.type == 'Call' else None
+
+class Inliner:
+    """Replaces statement-level calls to small, straight-line, non-recursive
+    functions by the callee's statements.
+
+    Parameters become declarations initialized with the arguments, in order,
+    so arguments are evaluated once and left to right as before. Parameters
+    and locals get fresh names, and a local declared without a value starts
+    at 0 as in a new frame. The callee's returned expression takes the
+    call's place in the statement.
+    """
+
+    def __init__(self, graph, max_nodes=INLINE_MAX_NODES, max_growth=INLINE_MAX_GROWTH):
+        self.graph = graph
+        self.max_nodes = max_nodes
+        self.growth = max_growth
+        self.inlined = 0
+        self._bodies = {}
+        self._taken = None
+        self._serial = 0
+
+    def run(self, program):
+        """Inline throughout program; returns the number of calls inlined."""
+        self._taken = {node.value for node, _ in walk(program) if isinstance(node.value, str)}
+        for node, _ in walk(program):
+            if node.type == 'Block':
+                self._inline_block(node)
+        return self.inlined
+
+    def body(self, key):
+        """(return type, params, statements, returned expression, size) of
+        an inlinable function, or None."""
+        if key in self._bodies:
+            return self._bodies[key]
+        result = None
+        function = self.graph.functions.get(key)
+        if function is not None and key not in self.graph.recursive:
+            statements = list(function.children[-1].children)
+            size = sum(1 for stmt in statements for _ in walk(stmt))
+            returned = None
+            if statements and statements[-1] is not None and statements[-1].type == 'Return':
+                final = statements.pop()
+                returned = final.children[0] if final.children else None
+            if size <= self.max_nodes and all(stmt is not None and stmt.type in STRAIGHT_LINE
+                                              for stmt in statements):
+                params = []
+                if function.children[2].type == 'Params':
+                    params = [(param.children[0].value, param.children[1].value)
+                              for param in function.children[2].children]
+                result = (function.children[0].value, params, statements, returned, size)
+        self._bodies[key] = result
+        return result
+
+    def fresh(self, function, name):
+        while True:
+            self._serial += 1
+            fresh = f"{function}_{name}_{self._serial}"
+            if fresh not in self._taken:
+                self._taken.add(fresh)
+                return canonical(fresh)
+
+    def _inline_block(self, block):
+        out = []
+        pending = list(reversed(block.children))
+        changed = False
+        while pending:
+            stmt = pending.pop()
+            expansion = self._expand(stmt)
+            if expansion is None:
+                out.append(stmt)
+            else:
+                # The spliced statements may hold further calls to inline
+                pending.extend(reversed(expansion))
+                changed = True
+        if changed:
+            block.children = out
+
+    def _expand(self, stmt):
+        call = _call_site(stmt)
+        if call is None:
+            return None
+        name = call.children[0].value
+        body = self.body(name_id(name))
+        args = call.children[1].children
+        if body is None or len(args) != len(body[1]) or body[4] > self.growth:
+            return None
+        return_type, params, statements, returned, size = body
+        lineno = call.lineno
+
+        renames = {}
+        for _, param in params:
+            renames[name_id(param)] = self.fresh(name, param)
+        for local in statements:
+            if local.type == 'VarDecl' and name_id(local.children[1].value) not in renames:
+                renames[name_id(local.children[1].value)] = self.fresh(name, local.children[1].value)
+
+        expansion = []
+        for (type_, param), arg in zip(params, args):
+            expansion.append(self._declare(type_, renames[name_id(param)], arg, lineno))
+        for local in statements:
+            local = self._renamed(local, renames)
+            if local.type == 'VarDecl' and len(local.children) == 2:
+                local.children.append(ASTNode('Literal', value=0, lineno=lineno))
+            expansion.append(local)
+
+        if returned is not None:
+            value = self._renamed(returned, renames)
+        elif return_type != 'void':
+            value = ASTNode('Literal', value=0, lineno=lineno)   # fell off the end
+        else:
+            value = None
+        # Assigned whole: an arena node's children list is a fresh copy
+        if stmt.type == 'VarDecl':
+            stmt.children = stmt.children[:2] + [value]
+        elif stmt.type == 'Assignment':
+            stmt.children = [stmt.children[0], value]
+        elif stmt.type == 'Return':
+            stmt.children = [value] if value is not None else []
+        elif value is None or value.type == 'Literal':
+            stmt = None               # a bare call whose result is dropped
+        else:
+            stmt.children = [value]
+        if stmt is not None:
+            expansion.append(stmt)
+        self.inlined += 1
+        self.growth -= size
+        return expansion
+
+    @staticmethod
+    def _declare(type_, name, value, lineno):
+        return ASTNode('VarDecl', children=[
+            ASTNode('Type', value=type_, lineno=lineno),
+            ASTNode('ID', value=name, lineno=lineno),
+            value,
+        ], lineno=lineno)
+
+    @staticmethod
+    def _renamed(node, renames):
+        copy = clone(node)
+        for current, _ in walk(copy):
+            if current.type in ('Variable', 'ID') and current.value is not None:
+                fresh = renames.get(name_id(current.value))
+                if fresh is not None:
+                    current.value = fresh
+        return copy
+
+# -- compile-time evaluation -----------------------------------------------------
+
+class Unevaluable(Exception):
+    """A call that cannot be computed at compile time."""
+
+class _Returned:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+class Evaluator:
+    """Runs pure functions of the program on constant arguments.
+
+    Semantics follow the VM: one flat set of variables per call, reading an
+    unassigned variable gives 0, falling off the end of a non-void function
+    returns 0, division is ir.c_divide and comparisons give 0 or 1. Results
+    are memoized per (function, arguments). Every node visited costs a step;
+    one call may use EVAL_CALL_BUDGET of them and the whole program budget
+    steps, after which every evaluation raises Unevaluable.
+    """
+
+    def __init__(self, graph, budget=EVAL_BUDGET, call_budget=EVAL_CALL_BUDGET):
+        self.graph = graph
+        self.budget = budget
+        self.call_budget = call_budget
+        self.steps = 0
+        self.limit = 0
+        self.memo = {}
+        self.env = None
+        self._handlers = {}
+
+    def evaluate(self, name, args):
+        """Value of name(*args), an int64 or finite float; raises Unevaluable."""
+        call = ASTNode('Call', children=[
+            ASTNode('ID', value=name),
+            ASTNode('Args', children=[ASTNode('Literal', value=arg) for arg in args]),
+        ])
+        self.steps = 0
+        self.limit = min(self.budget, self.call_budget)
+        self.env = {}
+        try:
+            value = trampoline(call, self._dispatch)
+        except Unevaluable:
+            raise
+        except (ArithmeticError, TypeError, ValueError) as error:
+            raise Unevaluable(str(error)) from error
+        finally:
+            self.budget -= self.steps
+            self.env = None
+        if type(value) is int and value in INT64:
+            return value
+        if type(value) is float and math.isfinite(value):
+            return value
+        raise Unevaluable(f"{name}() returned {value!r}")
+
+    # Statement handlers return None, or a _Returned once a return ran;
+    # expression handlers return the value. Generators yield child nodes
+    # (see traversal.trampoline).
+    def _dispatch(self, node):
+        self.steps += 1
+        if self.steps > self.limit:
+            raise Unevaluable("compile-time step budget exhausted")
+        handler = self._handlers.get(node.type)
+        if handler is None:
+            if node.type in AST_BINARY_OPS:
+                handler = self.eval_binary
+            else:
+                handler = getattr(self, f'eval_{node.type}', None)
+                if handler is None:
+                    raise Unevaluable(f"cannot evaluate {node.type}")
+            self._handlers[node.type] = handler
+        return handler(node)
+
+    def eval_Block(self, node):
+        for stmt in node.children:
+            if stmt is not None:
+                result = yield stmt
+                if result is not None:
+                    return result
+        return None
+
+    def eval_VarDecl(self, node):
+        if len(node.children) > 2:
+            self.env[name_id(node.children[1].value)] = yield node.children[2]
+
+    def eval_Assignment(self, node):
+        self.env[name_id(node.children[0].value)] = yield node.children[1]
+
+    def eval_ExprStmt(self, node):
+        yield node.children[0]
+
+    def eval_Return(self, node):
+        value = (yield node.children[0]) if node.children else None
+        return _Returned(value)
+
+    def eval_If(self, node):
+        if (yield node.children[0]):
+            return (yield node.children[1])
+        return None
+
+    def eval_IfElse(self, node):
+        if (yield node.children[0]):
+            return (yield node.children[1])
+        return (yield node.children[2])
+
+    def eval_While(self, node):
+        while (yield node.children[0]):
+            result = yield node.children[1]
+            if result is not None:
+                return result
+        return None
+
+    def eval_Call(self, node):
+        name = node.children[0].value
+        key = name_id(name)
+        args = []
+        for arg in node.children[1].children:
+            args.append((yield arg))
+        if key not in self.graph.pure:
+            raise Unevaluable(f"{name}() is not pure")
+        # 1, 1.0 and True are equal but give different results
+        memo_key = (key, tuple((type(arg), arg) for arg in args))
+        if memo_key in self.memo:
+            return self.memo[memo_key]
+        function = self.graph.functions[key]
+        params = []
+        if function.children[2].type == 'Params':
+            params = [param.children[1].value for param in function.children[2].children]
+        if len(params) != len(args):
+            raise Unevaluable(f"{name}() called with {len(args)} argument(s)")
+        caller = self.env
+        self.env = {name_id(param): arg for param, arg in zip(params, args)}
+        result = yield function.children[-1]
+        self.env = caller
+        if result is not None:
+            value = result.value
+        else:
+            value = None if function.children[0].value == 'void' else 0
+        self.memo[memo_key] = value
+        return value
+
+    def eval_binary(self, node):
+        left = yield node.children[0]
+        right = yield node.children[1]
+        return FOLDS[AST_BINARY_OPS[node.type]](left, right)
+
+    def eval_Literal(self, node):
+        return node.value
+
+    def eval_Variable(self, node):
+        return self.env.get(name_id(node.value), 0)
+
+__all__ = ['CallGraph', 'Inliner', 'Evaluator', 'Unevaluable',
+           'INLINE_MAX_NODES', 'INLINE_MAX_GROWTH', 'EVAL_BUDGET', 'EVAL_CALL_BUDGET']
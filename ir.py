@@ -0,0 +1,209 @@
+# ir.py
+# Three-address code as quadruples: parallel arrays of opcode, destination and
+# two source operands. Operands are small integers indexing an OperandTable
+# that interns temps, variables, labels, functions and constants; text is only
+# produced on demand by IRProgram.to_text().
+import operator
+from array import array
+from enum import IntEnum
+
+from names import name_id
+
+NONE = -1
+
+class Op(IntEnum):
+    FUNC = 0        # func a:
+    PARAM = 1       # param a          (formal parameter)
+    ARG = 2         # param a          (argument of the next call)
+    CALL = 3        # dst = call a, b  (b: argument count constant)
+    RETURN = 4      # return [a]
+    LABEL = 5       # a:
+    GOTO = 6        # goto a
+    IF_FALSE = 7    # if not a goto b
+    IF_TRUE = 8     # if a goto b
+    COPY = 9        # dst = a
+    ADD = 10        # dst = a + b
+    SUB = 11
+    MUL = 12
+    DIV = 13
+    EQ = 14
+    NE = 15
+    LT = 16
+    GT = 17
+    LE = 18
+    GE = 19
+
+BINARY_SYMBOLS = {
+    Op.ADD: '+', Op.SUB: '-', Op.MUL: '*', Op.DIV: '/',
+    Op.EQ: '==', Op.NE: '!=', Op.LT: '<', Op.GT: '>', Op.LE: '<=', Op.GE: '>=',
+}
+
+# AST operator node type -> opcode
+AST_BINARY_OPS = {
+    'PLUS': Op.ADD, 'MINUS': Op.SUB, 'TIMES': Op.MUL, 'DIVIDE': Op.DIV,
+    'EQ': Op.EQ, 'NEQ': Op.NE, 'LT': Op.LT, 'GT': Op.GT, 'LE': Op.LE, 'GE': Op.GE,
+}
+
+def c_divide(a, b):
+    """Division as the target performs it: integer operands truncate toward
+    zero, floats divide exactly, and division by zero yields 0."""
+    if b == 0:
+        return 0
+    if isinstance(a, int) and isinstance(b, int):
+        q = abs(a) // abs(b)
+        return q if (a < 0) == (b < 0) else -q
+    return a / b
+
+# Binary opcode -> the value it computes from two constants, as the VM does
+FOLDS = {
+    Op.ADD: operator.add, Op.SUB: operator.sub, Op.MUL: operator.mul, Op.DIV: c_divide,
+    Op.EQ: lambda a, b: int(a == b), Op.NE: lambda a, b: int(a != b),
+    Op.LT: lambda a, b: int(a < b), Op.GT: lambda a, b: int(a > b),
+    Op.LE: lambda a, b: int(a <= b), Op.GE: lambda a, b: int(a >= b),
+}
+
+class Kind(IntEnum):
+    TEMP = 0
+    VAR = 1
+    LABEL = 2
+    FUNC = 3
+    CONST = 4
+    STRING = 5
+
+class OperandTable:
+    """Interns (kind, value) pairs to dense integer ids."""
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.values = []
+        self._ids = {}
+        self.last_temp = 0        # highest temp number interned so far
+        self.last_label = 0       # highest label number interned so far
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, kind, value):
+        if kind == Kind.VAR or kind == Kind.FUNC:
+            # Keyed by interned name id, so the lexer's Name and a plain str
+            # with the same text share one operand
+            key = (kind, name_id(value))
+        elif kind == Kind.STRING:
+            key = (kind, str(value))
+        else:
+            # 1, 1.0 and True are equal dict keys, so the value type is part of the key
+            key = (kind, type(value), value)
+        operand = self._ids.get(key)
+        if operand is None:
+            operand = len(self.values)
+            self.kinds.append(kind)
+            self.values.append(value)
+            self._ids[key] = operand
+            if kind == Kind.TEMP and value > self.last_temp:
+                self.last_temp = value
+            elif kind == Kind.LABEL and value > self.last_label:
+                self.last_label = value
+        return operand
+
+    def new_temp(self):
+        """A temp no instruction refers to yet, for passes that introduce values."""
+        return self.intern(Kind.TEMP, self.last_temp + 1)
+
+    def new_label(self):
+        """A label no instruction refers to yet."""
+        return self.intern(Kind.LABEL, self.last_label + 1)
+
+    def kind(self, operand):
+        return self.kinds[operand]
+
+    def value(self, operand):
+        return self.values[operand]
+
+    def is_const(self, operand):
+        return self.kinds[operand] == Kind.CONST
+
+    def text(self, operand):
+        kind = self.kinds[operand]
+        value = self.values[operand]
+        if kind == Kind.TEMP:
+            return f"t{value}"
+        if kind == Kind.LABEL:
+            return f"L{value}"
+        if kind == Kind.STRING:
+            return f"\"{value}\""
+        return str(value)
+
+def format_instruction(operands, op, dst, a, b):
+    text = operands.text
+    if op in BINARY_SYMBOLS:
+        return f"{text(dst)} = {text(a)} {BINARY_SYMBOLS[op]} {text(b)}"
+    if op == Op.COPY:
+        return f"{text(dst)} = {text(a)}"
+    if op == Op.LABEL:
+        return f"{text(a)}:"
+    if op == Op.GOTO:
+        return f"goto {text(a)}"
+    if op == Op.IF_FALSE:
+        return f"if not {text(a)} goto {text(b)}"
+    if op == Op.IF_TRUE:
+        return f"if {text(a)} goto {text(b)}"
+    if op == Op.PARAM or op == Op.ARG:
+        return f"param {text(a)}"
+    if op == Op.CALL:
+        return f"{text(dst)} = call {text(a)}, {text(b)}"
+    if op == Op.RETURN:
+        return "return" if a == NONE else f"return {text(a)}"
+    if op == Op.FUNC:
+        return f"func {text(a)}:"
+    raise ValueError(f"Unknown opcode {op}")
+
+class IRProgram:
+    """Instruction stream of quadruples (op, dst, a, b) in parallel arrays."""
+
+    def __init__(self, operands=None):
+        self.operands = operands if operands is not None else OperandTable()
+        self.ops = array('B')
+        self.dst = array('i')
+        self.arg1 = array('i')
+        self.arg2 = array('i')
+        # FUNC operands of functions that only ever compute with integers,
+        # where + and * may be reassociated without changing a result
+        self.integer_functions = set()
+        self._text = None
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __iter__(self):
+        return zip(self.ops, self.dst, self.arg1, self.arg2)
+
+    def emit(self, op, dst=NONE, a=NONE, b=NONE):
+        self.ops.append(op)
+        self.dst.append(dst)
+        self.arg1.append(a)
+        self.arg2.append(b)
+        self._text = None
+        return len(self.ops) - 1
+
+    def instruction(self, i):
+        return self.ops[i], self.dst[i], self.arg1[i], self.arg2[i]
+
+    def derive(self):
+        """Empty program sharing this program's operand table."""
+        program = IRProgram(self.operands)
+        program.integer_functions = self.integer_functions
+        return program
+
+    def format(self, i):
+        return format_instruction(self.operands, self.ops[i], self.dst[i], self.arg1[i], self.arg2[i])
+
+    def to_text(self):
+        """The instruction stream as text lines, built once and cached."""
+        if self._text is None:
+            self._text = [self.format(i) for i in range(len(self.ops))]
+        return self._text
+
+    def nbytes(self):
+        return sum(buf.itemsize * len(buf) for buf in (self.ops, self.dst, self.arg1, self.arg2))
+
+__all__ = ['Op', 'Kind', 'NONE', 'OperandTable', 'IRProgram', 'format_instruction', 'BINARY_SYMBOLS', 'AST_BINARY_OPS', 'FOLDS', 'c_divide']
@@ -0,0 +1,284 @@
+# ir_optimizer.py
+# Flow-sensitive clean-up of the three-address code: self tail calls turned
+# into jumps (tail_calls.py), sparse conditional constant propagation over
+# SSA (ssa.py) and loop-invariant code motion with induction-variable
+# strength reduction (loops.py) once per function, then
+# global copy propagation (available copies), local common-subexpression
+# elimination and dead-store elimination driven by liveness, repeated until
+# nothing changes, and last a peephole pass over the jumps, labels and
+# copies left in the instruction stream (peephole.py). The generator's
+# recycled temps are split into one name per value before all of this and
+# compacted into few, densely numbered ones after it (temps.py).
+from cfg import FunctionCFG, StrongLiveness, defs_uses, function_ranges, is_variable
+from ir import Kind, NONE, Op
+from loops import optimize_loops
+from peephole import peephole
+from ssa import propagate_constants
+from tail_calls import eliminate_tail_calls
+from temps import compact_temps, split_temps
+from tracing import tracer
+
+COMMUTATIVE = (Op.ADD, Op.MUL, Op.EQ, Op.NE)
+
+class IROptimizer:
+    def __init__(self, max_rounds=4, sccp=True, loops=True, tail_calls=True, peephole=True,
+                 compact=True):
+        self.max_rounds = max_rounds
+        self.peephole = peephole
+        self.compact = compact
+        self.tail_calls = tail_calls
+        self.sccp = sccp
+        self.loops = loops
+        self.stats = {}
+
+    def optimize(self, program):
+        self.stats = {
+            'instructions_before': len(program),
+            'instructions_after': 0,
+            'tail_calls': 0,
+            'tail_accumulated': 0,
+            'sccp_constants': 0,
+            'sccp_branches': 0,
+            'sccp_unreachable': 0,
+            'licm_hoisted': 0,
+            'iv_reduced': 0,
+            'copies_propagated': 0,
+            'cse': 0,
+            'dead_stores': 0,
+            'peephole_jumps': 0,
+            'peephole_labels': 0,
+            'peephole_copies': 0,
+            'peephole_unreachable': 0,
+            'temps_split': 0,
+            'temps_before': 0,
+            'temps_after': 0,
+        }
+        self.kinds = program.operands.kinds
+        result = program.derive()
+        for start, end in function_ranges(program):
+            with tracer.span('IROptimizer.function', 'ir_optimize', instructions=end - start):
+                cfg = FunctionCFG(program, start, end)
+                self.optimize_function(cfg)
+                cfg.emit_into(result)
+        self.stats['instructions_after'] = len(result)
+        return result, self.stats
+
+    def optimize_function(self, cfg):
+        self.stats['temps_split'] += split_temps(cfg)
+        if self.tail_calls:
+            self.eliminate_tail_calls(cfg)
+        if self.sccp:
+            self.propagate_constants(cfg)
+        if self.loops:
+            self.optimize_loops(cfg)
+        for _ in range(self.max_rounds):
+            changed = self.propagate_copies(cfg)
+            changed += self.eliminate_common_subexpressions(cfg)
+            changed += self.eliminate_dead_stores(cfg)
+            if not changed:
+                break
+        if self.peephole:
+            self.simplify_stream(cfg)
+        if self.compact:
+            before, after = compact_temps(cfg)
+            self.stats['temps_before'] += before
+            self.stats['temps_after'] += after
+
+    # -- tail calls ------------------------------------------------------------
+
+    def eliminate_tail_calls(self, cfg):
+        """Self tail calls become jumps; integer-only functions also get
+        an accumulator for calls under + or *."""
+        with tracer.span('IROptimizer.tail_calls', 'ir_optimize'):
+            integer = cfg.code[0][2] in cfg.program.integer_functions
+            calls, accumulated = eliminate_tail_calls(cfg, integer)
+        self.stats['tail_calls'] += calls
+        self.stats['tail_accumulated'] += accumulated
+        return calls
+
+    # -- constant propagation --------------------------------------------------
+
+    def propagate_constants(self, cfg):
+        """SCCP over the whole function; rebuilds the CFG when a branch or
+        an unreachable block went away."""
+        with tracer.span('IROptimizer.sccp', 'ir_optimize'):
+            constants, branches, unreachable = propagate_constants(cfg)
+        self.stats['sccp_constants'] += constants
+        self.stats['sccp_branches'] += branches
+        self.stats['sccp_unreachable'] += unreachable
+        if branches or unreachable:
+            cfg.rebuild()
+        return constants + branches + unreachable
+
+    # -- loops -----------------------------------------------------------------
+
+    def optimize_loops(self, cfg):
+        """Invariant code motion and induction-variable strength reduction."""
+        with tracer.span('IROptimizer.loops', 'ir_optimize'):
+            hoisted, reduced = optimize_loops(cfg, self.max_rounds)
+        self.stats['licm_hoisted'] += hoisted
+        self.stats['iv_reduced'] += reduced
+        return hoisted + reduced
+
+    # -- copy propagation ------------------------------------------------------
+
+    def propagate_copies(self, cfg):
+        """Replace uses of x by y wherever the copy x = y reaches on every path."""
+        kinds = self.kinds
+        code = cfg.code
+        facts = []                # fact index -> (dst, src)
+        fact_of = {}              # instruction index -> fact index
+        by_dst = {}               # variable -> mask of facts defining it
+        kill = {}                 # variable -> mask of facts it invalidates
+        for block in cfg.blocks:
+            for i, (op, dst, a, b) in cfg.instructions(block):
+                if op == Op.COPY and dst != a and kinds[a] != Kind.STRING:
+                    f = len(facts)
+                    facts.append((dst, a))
+                    fact_of[i] = f
+                    by_dst[dst] = by_dst.get(dst, 0) | (1 << f)
+                    kill[dst] = kill.get(dst, 0) | (1 << f)
+                    if is_variable(kinds, a):
+                        kill[a] = kill.get(a, 0) | (1 << f)
+        if not facts:
+            return 0
+
+        # Forward must-analysis: in = AND over predecessors. The masks are as
+        # wide as the function has copies, so only definitions that kill
+        # some fact (most temps kill none) touch them.
+        gen, kills = [], []
+        for block in cfg.blocks:
+            avail = killed = 0
+            for i, instr in cfg.instructions(block):
+                d, _ = defs_uses(kinds, instr)
+                mask = kill.get(d)
+                if mask is not None:
+                    avail &= ~mask
+                    killed |= mask
+                f = fact_of.get(i)
+                if f is not None:
+                    avail |= 1 << f
+            gen.append(avail)
+            kills.append(killed)
+
+        everything = (1 << len(facts)) - 1
+        avail_in = [everything] * len(cfg.blocks)
+        avail_out = [everything] * len(cfg.blocks)
+        order = cfg.reverse_postorder()
+        reachable = {block.index for block in order}
+        changed = True
+        while changed:
+            changed = False
+            for block in order:
+                if block.index == 0:
+                    new_in = 0
+                else:
+                    new_in = everything
+                    for pred in block.preds:
+                        if pred.index in reachable:
+                            new_in &= avail_out[pred.index]
+                new_out = gen[block.index] | (new_in & ~kills[block.index])
+                avail_in[block.index] = new_in
+                if new_out != avail_out[block.index]:
+                    avail_out[block.index] = new_out
+                    changed = True
+
+        replaced = 0
+        for block in order:
+            avail = avail_in[block.index]
+            for i, instr in cfg.instructions(block):
+                op, dst, a, b = instr
+                new_a = self._copy_source(a, avail, by_dst, facts) if self._reads_a(op) else a
+                new_b = self._copy_source(b, avail, by_dst, facts) if op >= Op.ADD else b
+                if new_a != a or new_b != b:
+                    replaced += (new_a != a) + (new_b != b)
+                    instr = (op, dst, new_a, new_b)
+                    code[i] = instr
+                d, _ = defs_uses(kinds, instr)
+                mask = kill.get(d)
+                if mask is not None:
+                    avail &= ~mask
+                # A rewritten copy x = z still makes x equal to the original
+                # source at this point, so the fact keeps holding
+                f = fact_of.get(i)
+                if f is not None:
+                    avail |= 1 << f
+        self.stats['copies_propagated'] += replaced
+        return replaced
+
+    @staticmethod
+    def _reads_a(op):
+        return op >= Op.ADD or op in (Op.COPY, Op.ARG, Op.IF_FALSE, Op.IF_TRUE, Op.RETURN)
+
+    @staticmethod
+    def _copy_source(operand, avail, by_dst, facts):
+        # The lowest available fact for operand, as one mask operation
+        hit = avail & by_dst.get(operand, 0)
+        if not hit:
+            return operand
+        return facts[(hit & -hit).bit_length() - 1][1]
+
+    # -- local CSE -------------------------------------------------------------
+
+    def eliminate_common_subexpressions(self, cfg):
+        """Within each block, reuse the holder of an already computed a op b."""
+        kinds = self.kinds
+        code = cfg.code
+        replaced = 0
+        for block in cfg.blocks:
+            available = {}        # (op, a, b) -> variable holding the value
+            depends = {}          # variable -> keys to drop when it changes
+            for i, (op, dst, a, b) in cfg.instructions(block):
+                key = None
+                if op >= Op.ADD:
+                    if op in COMMUTATIVE and b < a:
+                        a, b = b, a
+                    key = (op, a, b)
+                    holder = available.get(key)
+                    if holder is not None and holder != dst:
+                        code[i] = (Op.COPY, dst, holder, NONE)
+                        replaced += 1
+                        key = None
+                d, _ = defs_uses(kinds, code[i])
+                if d != NONE:
+                    for stale in depends.pop(d, ()):
+                        available.pop(stale, None)
+                if key is not None and d != a and d != b:
+                    available[key] = d
+                    for v in (a, b, d):
+                        if is_variable(kinds, v):
+                            depends.setdefault(v, []).append(key)
+        self.stats['cse'] += replaced
+        return replaced
+
+    # -- dead stores -----------------------------------------------------------
+
+    def eliminate_dead_stores(self, cfg):
+        """Delete pure definitions whose value is never read afterwards.
+        One strong-liveness solution covers whole dead chains, so there is
+        no re-solving after each layer of deletions."""
+        code = cfg.code
+        liveness = StrongLiveness(cfg)
+        dead = []
+        for block in cfg.blocks:
+            liveness.walk(block, liveness.live_out[block.index], dead)
+        for i in dead:
+            code[i] = None
+        self.stats['dead_stores'] += len(dead)
+        return len(dead)
+
+    # -- peephole --------------------------------------------------------------
+
+    def simplify_stream(self, cfg):
+        """Thread and drop jumps, drop dead labels and code, fold copies."""
+        with tracer.span('IROptimizer.peephole', 'ir_optimize'):
+            jumps, labels, copies, unreachable = peephole(cfg)
+        self.stats['peephole_jumps'] += jumps
+        self.stats['peephole_labels'] += labels
+        self.stats['peephole_copies'] += copies
+        self.stats['peephole_unreachable'] += unreachable
+        return jumps + labels + copies + unreachable
+
+def optimize_ir(program):
+    """Optimize an IRProgram; returns (new program, statistics)."""
+    return IROptimizer().optimize(program)
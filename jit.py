@@ -0,0 +1,471 @@
+# jit.py
+# Translates each function of an (optimized) AST to Python source and
+# compiles it with compile(), so If/IfElse/While run as native Python control
+# flow. Code objects are cached by a structural hash of the function subtree:
+# recompiling an edited program only translates the functions that changed.
+# A function that calls itself runs inside "while True:" and its self tail
+# calls reassign the parameters and go round again, as tail_calls.py does
+# for the IR; an integer-only function also accumulates through + and *
+# (return n * fact(n - 1)), so deep recursion does not hit Python's stack.
+import sys
+import time
+from collections import OrderedDict
+
+from ir import AST_BINARY_OPS, c_divide
+from traversal import subtree_hash, trampoline, walk
+from vm import RunResult, VMError, format_printf
+
+PYTHON_OPERATORS = {
+    'PLUS': '+', 'MINUS': '-', 'TIMES': '*',
+    'EQ': '==', 'NEQ': '!=', 'LT': '<', 'GT': '>', 'LE': '<=', 'GE': '>=',
+}
+COMPARISONS = {'EQ', 'NEQ', 'LT', 'GT', 'LE', 'GE'}
+ACCUMULATORS = {'PLUS': 0, 'TIMES': 1}    # operator -> identity
+
+# Expressions nested deeper than this are split into temporaries; CPython's
+# parser gives up on very deep nesting
+MAX_NESTING = 40
+INDENT = '    '
+
+class JITError(Exception):
+    pass
+
+# Same key the AST renderer caches drawings under
+function_hash = subtree_hash
+
+def integer_only(function, float_functions):
+    """Whether a non-void function never touches a float or a string, as
+    IRGenerator decides for program.integer_functions."""
+    if function.children[0].value in ('void', 'float'):
+        return False
+    for node, _ in walk(function):
+        if node.type == 'StringLiteral' or (node.type == 'Literal' and isinstance(node.value, float)):
+            return False
+        if node.type in ('VarDecl', 'Param') and node.children[0].value == 'float':
+            return False
+        if node.type == 'Call' and node.children[0].value in float_functions:
+            return False
+    return True
+
+def _has_call(node):
+    return any(current.type == 'Call' for current, _ in walk(node))
+
+class CodeCache:
+    """LRU of (source, code object) pairs keyed by function_hash."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+code_cache = CodeCache()
+
+class FunctionTranslator:
+    """Python source for one Function node.
+
+    Expression handlers return (text, nesting, has_call); statement handlers
+    append indented lines. Identifiers get a prefix (v_ variables, f_
+    functions) so C names never clash with Python keywords or builtins.
+    integer says the function only handles ints, which makes + and *
+    accumulation exact.
+    """
+
+    def __init__(self, node, integer=False):
+        self.node = node
+        self.integer = integer
+        self.lines = []
+        self.depth = 1
+        self.temp_count = 0
+        self.condition = None
+        self._handlers = {}
+        self.looped = False       # body runs inside "while True:" for tail calls
+        self.accumulate = None    # 'PLUS' or 'TIMES' when tail calls accumulate
+        self.loop_depth = 0       # C while loops around the current statement
+        self.block_tail = True    # whether the Block being entered ends the function
+        self.stmt_tail = False    # whether the statement being entered does
+        self.tail_calls = 0
+        self.escapes = 0          # tail calls that break out of C loops
+
+    def translate(self):
+        node = self.node
+        return_type = node.children[0].value
+        name = node.children[1].value
+        params = []
+        if len(node.children) > 3 and node.children[2].type == 'Params':
+            params = [param.children[1].value for param in node.children[2].children]
+        self.void = return_type == 'void'
+        self.name, self.params = name, params
+
+        self.lines.append(f"def f_{name}({', '.join('v_' + p for p in params)}):")
+        self.scan_tail_calls(node.children[-1])
+        if self.looped:
+            if self.accumulate:
+                self.line(f"_acc = {ACCUMULATORS[self.accumulate]}")
+            self.line("while True:")
+            self.depth += 1
+        top = len(self.lines)
+        # Reading a variable before assigning it gives 0, as in the VM (and
+        # again on every tail call, as in a fresh frame)
+        names = sorted({n.value for n, _ in walk(node.children[-1]) if n.type == 'Variable'}
+                       | {n.children[0].value for n, _ in walk(node.children[-1]) if n.type == 'Assignment'}
+                       | {n.children[1].value for n, _ in walk(node.children[-1]) if n.type == 'VarDecl'})
+        local_names = [n for n in names if n not in params]
+        if local_names:
+            self.line(' = '.join('v_' + n for n in local_names) + ' = 0')
+        self.block_tail = True
+        trampoline(node.children[-1], self._dispatch)
+        self.line("return" if self.void else f"return {self.fold('0')}")
+        if self.escapes:
+            self.lines.insert(top, INDENT * self.depth + "_again = False")
+        return "\n".join(self.lines) + "\n"
+
+    # -- tail calls ------------------------------------------------------------
+
+    def self_call(self, node):
+        return (node is not None and node.type == 'Call' and node.children[0].value == self.name
+                and len(node.children[1].children if len(node.children) > 1 else ()) == len(self.params))
+
+    def accumulation(self, node):
+        """(operator, other operand, call) for "other op f(..)" with a
+        call-free other operand, else None."""
+        if node.type not in ACCUMULATORS:
+            return None
+        left, right = node.children
+        if self.self_call(right) and not _has_call(left):
+            return node.type, left, right
+        if self.self_call(left) and not _has_call(right):
+            return node.type, right, left
+        return None
+
+    def scan_tail_calls(self, body):
+        """Set looped when the function calls itself, and accumulate when
+        every accumulating return site uses the same operator."""
+        ops = set()
+        for node, _ in walk(body):
+            if node.type == 'Call' and node.children[0].value == self.name:
+                self.looped = True
+            elif node.type == 'Return' and node.children and self.integer:
+                found = self.accumulation(node.children[0])
+                if found is not None:
+                    ops.add(found[0])
+        # Mixed + and * sites cannot share one accumulator
+        if self.looped and len(ops) == 1:
+            self.accumulate = ops.pop()
+
+    def fold(self, text):
+        """A returned value combined with the accumulator."""
+        if self.accumulate is None:
+            return text
+        return f"_acc {PYTHON_OPERATORS[self.accumulate]} {text}"
+
+    def tail_call(self, call):
+        """New parameter values from call's arguments, then back to the top."""
+        args = call.children[1].children if len(call.children) > 1 else []
+        parts = []
+        marks = []
+        for arg in args:
+            parts.append((yield arg))
+            marks.append(len(self.lines))
+        if parts:
+            self.hoist_earlier(parts, marks)
+            self.line(f"{', '.join('v_' + p for p in self.params)} = {', '.join(p[0] for p in parts)}")
+        if self.loop_depth:
+            self.line("_again = True")
+            self.line("break")
+            self.escapes += 1
+        else:
+            self.line("continue")
+        self.tail_calls += 1
+
+    def after_loop(self):
+        # A tail call inside the loop broke out of it: leave the enclosing
+        # loops too, up to the function's own
+        self.line("if _again:")
+        self.line(INDENT + ("break" if self.loop_depth else "continue"))
+
+    def line(self, text):
+        self.lines.append(INDENT * self.depth + text)
+
+    def new_temp(self):
+        self.temp_count += 1
+        return f"_t{self.temp_count}"
+
+    def _dispatch(self, node):
+        handler = self._handlers.get(node.type)
+        if handler is None:
+            if node.type in AST_BINARY_OPS:
+                handler = self.translate_binary
+            else:
+                handler = getattr(self, f'translate_{node.type}', None)
+                if handler is None:
+                    raise JITError(f"Cannot translate {node.type} (line {node.lineno})")
+            self._handlers[node.type] = handler
+        return handler(node)
+
+    def hoist_earlier(self, parts, marks):
+        """Keep left-to-right call order when a later operand emitted
+        statements: earlier operands that call functions move into temps
+        placed before those statements."""
+        for k in range(len(parts) - 2, -1, -1):
+            text, nesting, has_call = parts[k]
+            if has_call and marks[k] < marks[-1]:
+                temp = self.new_temp()
+                self.lines.insert(marks[k], INDENT * self.depth + f"{temp} = {text}")
+                marks[-1] += 1
+                parts[k] = (temp, 0, False)
+
+    def finish(self, text, nesting, has_call):
+        if nesting < MAX_NESTING:
+            return text, nesting, has_call
+        temp = self.new_temp()
+        self.line(f"{temp} = {text}")
+        return temp, 0, False
+
+    def suite(self, node):
+        mark = len(self.lines)
+        self.depth += 1
+        yield node
+        if len(self.lines) == mark:
+            self.line("pass")
+        self.depth -= 1
+
+    # -- statements ------------------------------------------------------------
+
+    def translate_Block(self, node):
+        tail = self.block_tail
+        children = node.children
+        for i, stmt in enumerate(children):
+            following = children[i + 1] if i + 1 < len(children) else None
+            # "f(..); return;" ends the function wherever it is
+            self.stmt_tail = (tail and i + 1 == len(children)) or (
+                following is not None and following.type == 'Return' and not following.children)
+            yield stmt
+
+    def translate_VarDecl(self, node):
+        if len(node.children) > 2:
+            text, _, _ = yield node.children[2]
+            self.line(f"v_{node.children[1].value} = {text}")
+
+    def translate_Assignment(self, node):
+        text, _, _ = yield node.children[1]
+        self.line(f"v_{node.children[0].value} = {text}")
+
+    def translate_ExprStmt(self, node):
+        if self.looped and self.void and self.stmt_tail and self.self_call(node.children[0]):
+            yield from self.tail_call(node.children[0])
+            return
+        text, _, _ = yield node.children[0]
+        self.line(text)
+
+    def translate_Return(self, node):
+        if not node.children:
+            self.line("return" if self.void else f"return {self.fold('0')}")
+            return
+        value = node.children[0]
+        if self.looped and self.self_call(value):
+            yield from self.tail_call(value)
+            return
+        found = self.accumulation(value) if self.accumulate else None
+        if found is not None and found[0] == self.accumulate:
+            _, other, call = found
+            text, _, _ = yield other
+            self.line(f"_acc = {self.fold(text)}")
+            yield from self.tail_call(call)
+            return
+        text, _, _ = yield value
+        if self.void:
+            self.line(text)
+            self.line("return")
+        else:
+            self.line(f"return {self.fold(text)}")
+
+    def condition_of(self, node):
+        self.condition = node
+        text, _, _ = yield node
+        return text
+
+    def branch(self, node, tail):
+        self.block_tail = self.stmt_tail = tail
+        yield from self.suite(node)
+
+    def translate_If(self, node):
+        tail = self.stmt_tail
+        cond = yield from self.condition_of(node.children[0])
+        self.line(f"if {cond}:")
+        yield from self.branch(node.children[1], tail)
+
+    def translate_IfElse(self, node):
+        tail = self.stmt_tail
+        cond = yield from self.condition_of(node.children[0])
+        self.line(f"if {cond}:")
+        yield from self.branch(node.children[1], tail)
+        self.line("else:")
+        yield from self.branch(node.children[2], tail)
+
+    def loop_body(self, node):
+        escapes = self.escapes
+        self.loop_depth += 1
+        yield from self.branch(node, False)
+        self.loop_depth -= 1
+        return self.escapes > escapes
+
+    def translate_While(self, node):
+        mark = len(self.lines)
+        cond = yield from self.condition_of(node.children[0])
+        if len(self.lines) == mark:
+            self.line(f"while {cond}:")
+            if (yield from self.loop_body(node.children[1])):
+                self.after_loop()
+            return
+        # The condition needed temporaries: re-evaluate them every iteration
+        setup = [INDENT + text for text in self.lines[mark:]]
+        del self.lines[mark:]
+        self.line("while True:")
+        self.lines.extend(setup)
+        self.depth += 1
+        self.line(f"if not ({cond}):")
+        self.line(f"{INDENT}break")
+        self.depth -= 1
+        if (yield from self.loop_body(node.children[1])):
+            self.after_loop()
+
+    # -- expressions -----------------------------------------------------------
+
+    def translate_binary(self, node):
+        is_condition = node is self.condition
+        marks = [len(self.lines)]
+        parts = [(yield node.children[0])]
+        marks.append(len(self.lines))
+        parts.append((yield node.children[1]))
+        marks.append(len(self.lines))
+        self.hoist_earlier(parts, marks[1:])
+        (left, left_nesting, left_call), (right, right_nesting, right_call) = parts
+        nesting = max(left_nesting, right_nesting) + 1
+        if node.type == 'DIVIDE':
+            text = f"_div({left}, {right})"
+        elif node.type in COMPARISONS and not is_condition:
+            text = f"(1 if {left} {PYTHON_OPERATORS[node.type]} {right} else 0)"
+        else:
+            text = f"({left} {PYTHON_OPERATORS[node.type]} {right})"
+        return self.finish(text, nesting, left_call or right_call)
+
+    def translate_Call(self, node):
+        args = node.children[1].children if len(node.children) > 1 else []
+        parts = []
+        marks = []
+        for arg in args:
+            parts.append((yield arg))
+            marks.append(len(self.lines))
+        if parts:
+            self.hoist_earlier(parts, marks)
+        nesting = max((p[1] for p in parts), default=0) + 1
+        text = f"f_{node.children[0].value}({', '.join(p[0] for p in parts)})"
+        return self.finish(text, nesting, True)
+
+    def translate_Literal(self, node):
+        return repr(node.value), 0, False
+
+    translate_Number = translate_Literal
+
+    def translate_StringLiteral(self, node):
+        return repr(node.value), 0, False
+
+    def translate_Variable(self, node):
+        return f"v_{node.value}", 0, False
+
+class JITProgram:
+    """Compiled functions of one program, linked into a fresh namespace per run."""
+
+    def __init__(self, functions, sources, defined, called):
+        self.functions = functions        # name -> code object
+        self.sources = sources            # name -> Python source
+        self.defined = defined
+        self.called = called
+
+    def source(self):
+        return "\n".join(self.sources.values())
+
+    def run(self, entry='main', args=(), max_depth=10000):
+        if entry not in self.defined:
+            raise VMError(f"No function '{entry}' to run")
+        output = []
+
+        def printf(fmt='', *argv):
+            text = format_printf(fmt, argv)
+            output.append(text)
+            return len(text)
+
+        namespace = {'__builtins__': {}, '_div': c_divide, 'f_printf': printf}
+        for name in self.called - self.defined - {'printf'}:
+            namespace[f'f_{name}'] = _undefined(name)
+        for code in self.functions.values():
+            exec(code, namespace)
+
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, max_depth + 100))
+        start = time.perf_counter()
+        try:
+            value = namespace[f'f_{entry}'](*args)
+        except RecursionError:
+            raise VMError("Call stack overflow") from None
+        except TypeError as error:
+            raise VMError(str(error).replace('f_', '')) from error
+        finally:
+            sys.setrecursionlimit(limit)
+        return RunResult(value, 0, time.perf_counter() - start, output)
+
+def _undefined(name):
+    def call(*args):
+        raise VMError(f"Call to undefined function '{name}'")
+    return call
+
+def compile_program(ast, cache=code_cache):
+    """Translate and compile every Function in ast; returns a JITProgram."""
+    functions, sources = {}, {}
+    called = set()
+    float_functions = {function.children[1].value for function in ast.children
+                       if function is not None and function.children[0].value == 'float'}
+    for node, _ in walk(ast):
+        if node.type == 'Call':
+            called.add(node.children[0].value)
+        if node.type != 'Function':
+            continue
+        name = node.children[1].value
+        integer = integer_only(node, float_functions)
+        key = (function_hash(node), integer)
+        entry = cache.get(key) if cache is not None else None
+        if entry is None:
+            source = FunctionTranslator(node, integer).translate()
+            try:
+                code = compile(source, f"<jit {name}>", 'exec')
+            except (SyntaxError, RecursionError, MemoryError) as error:
+                raise JITError(f"{name}: {error}") from error
+            entry = (source, code)
+            if cache is not None:
+                cache.put(key, entry)
+        sources[name], functions[name] = entry
+    return JITProgram(functions, sources, set(functions), called)
+
+__all__ = ['JITError', 'JITProgram', 'CodeCache', 'FunctionTranslator', 'compile_program',
+           'function_hash', 'code_cache', 'integer_only']
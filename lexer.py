@@ -1,5 +1,167 @@
 # lexer.py
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from functools import partial
 import ply.lex as lex
+from names import canonical
+
+class Token:
+    """Detached token record (no reference back to the PLY lexer or source text).
+
+    Mutable because PLY's error recovery writes to the lookahead token; the
+    lexer slot is only ever filled on the token handed to p_error.
+    """
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'lexer')
+
+    def __init__(self, type, value, lineno, lexpos):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __repr__(self):
+        return f"Token({self.type}, {self.value!r}, {self.lineno}, {self.lexpos})"
+
+class TokenSource:
+    """Replays already-lexed tokens to ply.yacc in place of a lexer.
+
+    Accepts a list (lex once, parse and display the same tokens) or any
+    iterator, e.g. CLexer.tokenize() to stream tokens lazily.
+    """
+
+    def __init__(self, tokens):
+        # next(it, None) signals end of input the way PLY expects
+        self.token = partial(next, iter(tokens), None)
+
+    def input(self, data):
+        raise TypeError("TokenSource replays tokens; it does not lex text")
+
+class TokenStore:
+    """Columnar token storage for display and search.
+
+    One machine-sized array per field instead of an object per token; token
+    types and values are stored as codes into tables of distinct entries,
+    so a search only has to look at each distinct value once. Indexing and
+    iteration hand out Token records, so a store can stand in for the list
+    it was built from.
+    """
+
+    # Selections kept per store, so paging through a filter does not rescan
+    MAX_SELECTIONS = 8
+
+    def __init__(self):
+        self.type_names = []
+        self.values = []
+        self.types = array('B')
+        self.value_ids = array('I')
+        self.lines = array('I')
+        self.positions = array('I')
+        self._type_codes = {}
+        self._value_codes = {}
+        self._histogram = None
+        self._selections = {}
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """Build from a sequence of tokens (it is read more than once)."""
+        store = cls()
+        type_codes, value_codes = store._type_codes, store._value_codes
+        type_names, values = store.type_names, store.values
+        types, value_ids = [], []
+        for tok in tokens:
+            code = type_codes.get(tok.type)
+            if code is None:
+                code = type_codes[tok.type] = len(type_names)
+                type_names.append(tok.type)
+            value = tok.value
+            key = (value.__class__, value)
+            value_id = value_codes.get(key)
+            if value_id is None:
+                value_id = value_codes[key] = len(values)
+                values.append(value)
+            types.append(code)
+            value_ids.append(value_id)
+        store.types = array('B', types)
+        store.value_ids = array('I', value_ids)
+        store.lines = array('I', [tok.lineno for tok in tokens])
+        store.positions = array('I', [tok.lexpos for tok in tokens])
+        return store
+
+    def append(self, type, value, lineno, lexpos):
+        code = self._type_codes.get(type)
+        if code is None:
+            code = self._type_codes[type] = len(self.type_names)
+            self.type_names.append(type)
+        # Keyed on the value's type too: 1, 1.0 and True are equal dict keys
+        key = (value.__class__, value)
+        value_id = self._value_codes.get(key)
+        if value_id is None:
+            value_id = self._value_codes[key] = len(self.values)
+            self.values.append(value)
+        self.types.append(code)
+        self.value_ids.append(value_id)
+        self.lines.append(lineno)
+        self.positions.append(lexpos)
+        self._histogram = None
+        self._selections.clear()
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, i):
+        return Token(self.type_names[self.types[i]], self.values[self.value_ids[i]],
+                     self.lines[i], self.positions[i])
+
+    def __iter__(self):
+        type_names, values = self.type_names, self.values
+        for code, value_id, line, pos in zip(self.types, self.value_ids, self.lines, self.positions):
+            yield Token(type_names[code], values[value_id], line, pos)
+
+    def histogram(self):
+        """Token count per type name, most frequent first."""
+        if self._histogram is None:
+            counts = Counter(self.types)
+            self._histogram = {self.type_names[code]: n for code, n in counts.most_common()}
+        return self._histogram
+
+    def select(self, types=None, text=None):
+        """Indices of tokens whose type is in types and whose value contains
+        text (case-insensitive); None means no constraint."""
+        key = (tuple(sorted(types)) if types is not None else None, text or None)
+        selection = self._selections.get(key)
+        if selection is not None:
+            return selection
+
+        codes = None
+        if types is not None:
+            codes = {self._type_codes[name] for name in types if name in self._type_codes}
+        value_ids = None
+        if text:
+            needle = text.lower()
+            value_ids = {i for i, value in enumerate(self.values) if needle in str(value).lower()}
+
+        if codes is None and value_ids is None:
+            selection = range(len(self))
+        elif value_ids is None:
+            selection = array('I', (i for i, code in enumerate(self.types) if code in codes))
+        elif codes is None:
+            selection = array('I', (i for i, v in enumerate(self.value_ids) if v in value_ids))
+        else:
+            selection = array('I', (i for i, (code, v) in enumerate(zip(self.types, self.value_ids))
+                                    if code in codes and v in value_ids))
+
+        if len(self._selections) >= self.MAX_SELECTIONS:
+            self._selections.pop(next(iter(self._selections)))
+        self._selections[key] = selection
+        return selection
+
+    def rows(self, indices):
+        """Display rows for the given token indices only."""
+        type_names, values = self.type_names, self.values
+        return [{"#": i, "Type": type_names[self.types[i]],
+                 "Value": str(values[self.value_ids[i]]), "Line": self.lines[i]}
+                for i in indices]
 
 class CLexer:
     # Reserved keywords - added 'bool'
@@ -52,12 +214,24 @@ class CLexer:
     def __init__(self):
         self.lexer = lex.lex(module=self)
         self.lexer.lineno = 1  # Initialize line number
+        self.errors = []
 
     def input(self, data):
+        self.lexer.lineno = 1
+        self.errors = []
         self.lexer.input(data)
         
     def token(self):
         return self.lexer.token()
+
+    def tokenize(self, data):
+        """Lex data in one pass, yielding detached Tokens as they are matched."""
+        self.input(data)
+        next_token = self.lexer.token
+        tok = next_token()
+        while tok:
+            yield Token(tok.type, tok.value, tok.lineno, tok.lexpos)
+            tok = next_token()
     
     def t_newline(self, t):
         r'\n+'
@@ -85,13 +259,224 @@ class CLexer:
     def t_ID(self, t):
         r'[a-zA-Z_][a-zA-Z0-9_]*'
         t.type = self.reserved.get(t.value, 'ID')
+        # Identifiers and type keywords: one shared Name per distinct text
+        t.value = canonical(t.value)
         return t
         
     def t_STRING(self, t):
         r'\"([^\\\"]|(\\.))*\"'
+        # Not interned: a literal is data, not a name, and the process-wide
+        # table would keep every literal ever compiled
         t.value = t.value[1:-1]  # Remove quotes
         return t
 
     def t_error(self, t):
-        print(f"Illegal character '{t.value[0]}' at line {t.lineno}")
+        # Collected, not printed: batch workers share the terminal
+        self.errors.append(f"Illegal character '{t.value[0]}' at line {t.lineno}")
         t.lexer.skip(1)
+
+
+class IncrementalLexer:
+    """Keeps the token stream of a source text and re-lexes only the region
+    around an edit.
+
+    Every token carries lexpos/endlexpos (character offsets) and lineno.
+    After an edit the lexer restarts at a token boundary safely before the
+    edit and stops as soon as a new token lines up with an old one (same
+    type, value and shifted offset). The untouched tail is shifted lazily:
+    tokens from index _shift_from onwards still need _dpos/_dline added,
+    which is applied the next time an edit or a read reaches them.
+    """
+
+    # Characters a token match may inspect past its own end (e.g. the FLOAT
+    # rule looks at "12.x" before settling for NUMBER "12")
+    LOOKAHEAD = 2
+
+    def __init__(self):
+        self._clexer = CLexer()
+        lexer = self._clexer.lexer
+        self._report_error = lexer.lexerrorf
+        lexer.lexerrorf = self._on_error
+        self.text = ''
+        self._tokens = []
+        self._shift_from = 0
+        self._dpos = 0
+        self._dline = 0
+        # Offsets of '/*' and '"' that did not open a comment/string; their
+        # match attempts scanned to end of input, so any later edit can
+        # change how they lex
+        self._open_marks = []
+        self._new_marks = []
+        self.relexed = 0
+
+    # -- reading -----------------------------------------------------------
+
+    @property
+    def tokens(self):
+        self._apply_shift(len(self._tokens))
+        return self._tokens
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def _pos(self, i):
+        tok = self._tokens[i]
+        return tok.lexpos + self._dpos if i >= self._shift_from else tok.lexpos
+
+    def _end(self, i):
+        tok = self._tokens[i]
+        return tok.endlexpos + self._dpos if i >= self._shift_from else tok.endlexpos
+
+    def _line(self, i):
+        tok = self._tokens[i]
+        return tok.lineno + self._dline if i >= self._shift_from else tok.lineno
+
+    def _apply_shift(self, upto):
+        # Materialize the pending shift for tokens [_shift_from, upto)
+        dpos, dline = self._dpos, self._dline
+        if dpos or dline:
+            tokens = self._tokens
+            for i in range(self._shift_from, upto):
+                tok = tokens[i]
+                tok.lexpos += dpos
+                tok.endlexpos += dpos
+                tok.lineno += dline
+        if upto >= len(self._tokens):
+            self._shift_from, self._dpos, self._dline = len(self._tokens), 0, 0
+        else:
+            self._shift_from = max(self._shift_from, upto)
+
+    # -- lexing ------------------------------------------------------------
+
+    def lex(self, text):
+        self.text = text
+        self._clexer.input(text)
+        self._new_marks = []
+        self._tokens = list(self._scan(None))
+        self._open_marks = self._new_marks
+        self._shift_from, self._dpos, self._dline = len(self._tokens), 0, 0
+        self.relexed = len(self._tokens)
+        return self._tokens
+
+    def _on_error(self, t):
+        if t.value[0] == '"':
+            self._new_marks.append(t.lexpos)
+        self._report_error(t)
+
+    def _scan(self, prev):
+        lexer = self._clexer.lexer
+        while True:
+            tok = lexer.token()
+            if not tok:
+                return
+            tok.endlexpos = lexer.lexpos
+            if (tok.type == 'TIMES' and prev is not None and prev.type == 'DIVIDE'
+                    and prev.endlexpos == tok.lexpos):
+                self._new_marks.append(prev.lexpos)
+            prev = tok
+            yield tok
+
+    def edit(self, start, end, replacement):
+        """Replace text[start:end] with replacement and update the tokens.
+
+        Returns (index, removed, inserted): the first token index that
+        changed, how many old tokens were dropped and how many new ones took
+        their place.
+        """
+        old_text = self.text
+        if not 0 <= start <= end <= len(old_text):
+            raise ValueError(f"Edit range {start}:{end} outside of text")
+        text = old_text[:start] + replacement + old_text[end:]
+        delta = len(replacement) - (end - start)
+        new_end = start + len(replacement)
+
+        # Restart index: every token before it ends (plus lookahead) before
+        # the edit and is not preceded by an unterminated comment or string
+        limit = start
+        marks = self._open_marks
+        if marks and marks[0] < start:
+            limit = min(limit, marks[0])
+        lo, hi = 0, len(self._tokens)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._end(mid) + self.LOOKAHEAD < limit and self._pos(mid) < limit:
+                lo = mid + 1
+            else:
+                hi = mid
+        restart = lo
+
+        lexer = self._clexer.lexer
+        lexer.input(text)
+        self._clexer.errors = []  # errors holds the re-lexed region's only
+        if restart:
+            lexer.lexpos = self._end(restart - 1)
+            lexer.lineno = self._line(restart - 1)
+            prev = self._tokens[restart - 1]
+        else:
+            lexer.lineno = 1
+            prev = None
+        restart_pos = lexer.lexpos
+
+        self._new_marks = []
+        fresh = []
+        resync = len(self._tokens)
+        dline = 0
+        j = restart
+        for tok in self._scan(prev):
+            if tok.lexpos >= new_end:
+                old_pos = tok.lexpos - delta
+                while j < len(self._tokens) and self._pos(j) < old_pos:
+                    j += 1
+                if j == len(self._tokens):
+                    fresh.append(tok)
+                    break
+                old = self._tokens[j]
+                if (self._pos(j) == old_pos and old.type == tok.type and
+                        old.value == tok.value and self._end(j) + delta == tok.endlexpos):
+                    resync = j
+                    dline = tok.lineno - self._line(j)
+                    break
+            fresh.append(tok)
+        else:
+            j = len(self._tokens)
+        if resync == len(self._tokens):
+            # No resync point: the rest of the file was lexed, finish it
+            fresh.extend(self._scan(fresh[-1] if fresh else prev))
+
+        # Old-coordinate offset where the reused tail begins
+        tail_pos = self._pos(resync) if resync < len(self._tokens) else len(old_text) + 1
+        self._update_marks(restart_pos, tail_pos, delta)
+
+        # Splice, keeping the lazy shift confined to the tail
+        if (self._dpos or self._dline) and resync < self._shift_from:
+            # Edit lies before the pending region: shift the gap eagerly and
+            # fold the new offset into the pending one
+            tokens = self._tokens
+            if delta or dline:
+                for i in range(resync, self._shift_from):
+                    tok = tokens[i]
+                    tok.lexpos += delta
+                    tok.endlexpos += delta
+                    tok.lineno += dline
+            shift_from = self._shift_from
+        else:
+            self._apply_shift(restart)
+            shift_from = resync
+        tokens = self._tokens
+        tokens[restart:resync] = fresh
+        removed = resync - restart
+        self._shift_from = shift_from - removed + len(fresh)
+        self._dpos += delta
+        self._dline += dline
+        if self._shift_from >= len(tokens):
+            self._shift_from, self._dpos, self._dline = len(tokens), 0, 0
+
+        self.text = text
+        self.relexed = len(fresh)
+        return restart, removed, len(fresh)
+
+    def _update_marks(self, restart_pos, tail_pos, delta):
+        marks = self._open_marks
+        lo = bisect_left(marks, restart_pos)
+        hi = bisect_left(marks, tail_pos)
+        self._open_marks = marks[:lo] + self._new_marks + [m + delta for m in marks[hi:]]
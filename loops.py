@@ -0,0 +1,281 @@
+# loops.py
+# Loop optimizations over a FunctionCFG. Natural loops come from back edges
+# (an edge whose target dominates its source); each loop with a preheader
+# (a single outside predecessor that only leads into the header) gets
+# loop-invariant code motion into that preheader, and multiplications of a
+# basic induction variable by a constant become a running sum, advanced
+# right after the variable's increment. Inner loops go first; an enclosing
+# loop waits for the next round, when the analysis sees the moved code.
+from cfg import BLOCK_ENDS, Liveness, PURE_DEFS, defs_uses
+from ir import Kind, NONE, Op
+from ssa import dominators
+
+def dominator_intervals(idom):
+    """(enter, leave) numbers of every block in one walk of the dominator
+    tree, None for unreachable blocks: a dominates b exactly when a's
+    interval contains b's."""
+    intervals = [None] * len(idom)
+    if not idom or idom[0] is None:
+        return intervals
+    children = [[] for _ in idom]
+    for b, parent in enumerate(idom):
+        if parent is not None and parent != b:
+            children[parent].append(b)
+    clock = 0
+    enter = [0] * len(idom)
+    stack = [(0, False)]
+    while stack:
+        b, done = stack.pop()
+        if done:
+            intervals[b] = (enter[b], clock)
+        else:
+            enter[b] = clock
+            stack.append((b, True))
+            stack.extend((child, False) for child in children[b])
+        clock += 1
+    return intervals
+
+def dominates(intervals, a, b):
+    """Whether block a dominates block b, given dominator_intervals."""
+    outer, inner = intervals[a], intervals[b]
+    return (outer is not None and inner is not None
+            and outer[0] <= inner[0] and inner[1] <= outer[1])
+
+class Loop:
+    __slots__ = ('header', 'blocks', 'exits', 'preheader', 'entry_point')
+
+    def __init__(self, cfg, header, blocks):
+        self.header = header
+        self.blocks = blocks      # block indexes, header included
+        self.exits = {succ.index for b in blocks for succ in cfg.blocks[b].succs
+                      if succ.index not in blocks}
+        # Code entering the loop goes before the preheader's closing goto,
+        # or at its end when it falls into the header
+        self.preheader = None
+        self.entry_point = NONE
+        outside = [pred for pred in cfg.blocks[header].preds if pred.index not in blocks]
+        if len(outside) == 1 and len(outside[0].succs) == 1:
+            pred = outside[0]
+            last = cfg.code[pred.end - 1]
+            if last[0] == Op.GOTO:
+                self.preheader, self.entry_point = pred, pred.end - 1
+            elif last[0] not in BLOCK_ENDS:
+                self.preheader, self.entry_point = pred, pred.end
+
+    def __repr__(self):
+        return f"Loop(B{self.header}, {sorted(self.blocks)})"
+
+def natural_loops(cfg, idom):
+    """Loops by header, smallest (innermost) first; back edges to the same
+    header share one loop."""
+    intervals = dominator_intervals(idom)
+    position = {block.index: i for i, block in enumerate(cfg.reverse_postorder())}
+    bodies = {}
+    for block in cfg.blocks:
+        if idom[block.index] is None:
+            continue
+        for succ in block.succs:
+            # A back edge's target dominates its source, so it comes first
+            # in reverse postorder; forward edges need no dominance check
+            if position[succ.index] > position[block.index] \
+                    or not dominates(intervals, succ.index, block.index):
+                continue
+            body = bodies.setdefault(succ.index, {succ.index})
+            stack = [block.index]
+            while stack:
+                b = stack.pop()
+                if b not in body:
+                    body.add(b)
+                    stack.extend(pred.index for pred in cfg.blocks[b].preds
+                                 if idom[pred.index] is not None)
+    loops = [Loop(cfg, header, body) for header, body in bodies.items()]
+    loops.sort(key=lambda loop: len(loop.blocks))
+    return loops
+
+def optimize_loops(cfg, max_rounds=4):
+    """Hoist invariants and strength-reduce induction variables in every
+    loop of cfg, rebuilding it after each round that changed something.
+    Returns (hoisted instructions, reduced multiplications)."""
+    hoisted = reduced = 0
+    for _ in range(max_rounds):
+        idom = dominators(cfg)
+        loops = natural_loops(cfg, idom)
+        if not loops:
+            break
+        liveness = Liveness(cfg)
+        inserts = {}              # instruction index -> instructions to put before it
+        changed = []
+        for loop in loops:
+            if loop.preheader is None or any(header in loop.blocks for header in changed):
+                continue
+            pass_ = LoopPass(cfg, loop, liveness, inserts)
+            moved, rewritten = pass_.hoist_invariants(), pass_.reduce_induction_variables()
+            if moved or rewritten:
+                changed.append(loop.header)
+                hoisted += moved
+                reduced += rewritten
+        if not changed:
+            break
+        code = []
+        for i, instr in enumerate(cfg.code):
+            code.extend(inserts.get(i, ()))
+            code.append(instr)
+        cfg.code = code
+        cfg.rebuild()
+    return hoisted, reduced
+
+class LoopPass:
+    """Both transformations for one loop, against analysis of the code as it
+    was at the start of the round; new instructions are collected in
+    inserts and deleted ones set to None."""
+
+    def __init__(self, cfg, loop, liveness, inserts):
+        self.cfg = cfg
+        self.loop = loop
+        self.liveness = liveness
+        self.inserts = inserts
+        self.kinds = cfg.operands.kinds
+        self.blocks = [cfg.blocks[b] for b in sorted(loop.blocks)]
+        self.defs = {}            # variable -> indexes of the loop's instructions defining it
+        for block in self.blocks:
+            for i, instr in cfg.instructions(block):
+                d, _ = defs_uses(self.kinds, instr)
+                if d != NONE:
+                    self.defs.setdefault(d, []).append(i)
+        self._local = {}
+
+    def single_def(self, v):
+        """Index of v's only definition in the loop, or None."""
+        sites = self.defs.get(v)
+        return sites[0] if sites is not None and len(sites) == 1 else None
+
+    def is_local(self, v):
+        """v is not live into the loop nor out of it: every read of v in the
+        loop sees a definition from the same iteration."""
+        local = self._local.get(v)
+        if local is None:
+            cfg, liveness = self.cfg, self.liveness
+            local = self._local[v] = not liveness.is_live_in(cfg.blocks[self.loop.header], v) \
+                and not any(liveness.is_live_in(cfg.blocks[e], v) for e in self.loop.exits)
+        return local
+
+    def int_constant(self, operand):
+        operands = self.cfg.operands
+        return operands.kinds[operand] == Kind.CONST and type(operands.values[operand]) is int
+
+    # -- invariant code motion -------------------------------------------------
+
+    def hoist_invariants(self):
+        code = self.cfg.code
+        invariant = set()
+        order = []
+        changed = True
+        while changed:
+            changed = False
+            for block in self.blocks:
+                for i, instr in self.cfg.instructions(block):
+                    if i in invariant or instr[0] not in PURE_DEFS:
+                        continue
+                    d, used = defs_uses(self.kinds, instr)
+                    if self.single_def(d) != i or not self.is_local(d):
+                        continue
+                    if all(v not in self.defs or self.single_def(v) in invariant for v in used):
+                        invariant.add(i)
+                        order.append(i)
+                        changed = True
+        # Operands are marked before their users, so order is a valid schedule
+        entry = self.inserts.setdefault(self.loop.entry_point, [])
+        for i in order:
+            entry.append(code[i])
+            code[i] = None
+        return len(order)
+
+    # -- induction variables ---------------------------------------------------
+
+    def step(self, var, instr):
+        """c when instr computes var + c or var - c (as -c) for an int constant."""
+        op, _, a, b = instr
+        if op == Op.ADD:
+            if a == var and self.int_constant(b):
+                return self.cfg.operands.values[b]
+            if b == var and self.int_constant(a):
+                return self.cfg.operands.values[a]
+        elif op == Op.SUB and a == var and self.int_constant(b):
+            return -self.cfg.operands.values[b]
+        return None
+
+    def initial_value(self, var):
+        """The int constant the preheader last sets var to, or None. Only
+        such variables are reduced, so the running products stay exact."""
+        code = self.cfg.code
+        preheader = self.loop.preheader
+        for i in range(preheader.end - 1, preheader.start - 1, -1):
+            instr = code[i]
+            if instr is not None and defs_uses(self.kinds, instr)[0] == var:
+                if instr[0] == Op.COPY and self.int_constant(instr[2]):
+                    return self.cfg.operands.values[instr[2]]
+                return None
+        return None
+
+    def induction_variables(self):
+        """Basic induction variables: var -> (initial value, step, index of
+        its update).
+
+        The update is var = var +- c, or var = t with t = var +- c computed
+        earlier in the same iteration.
+        """
+        code = self.cfg.code
+        header = self.cfg.blocks[self.loop.header]
+        found = {}
+        for var, sites in self.defs.items():
+            if len(sites) != 1 or code[sites[0]] is None:
+                continue
+            update = code[sites[0]]
+            step = self.step(var, update)
+            if step is None and update[0] == Op.COPY:
+                source = self.single_def(update[2])
+                if source is not None and code[source] is not None \
+                        and not self.liveness.is_live_in(header, update[2]):
+                    step = self.step(var, code[source])
+            if step is not None:
+                initial = self.initial_value(var)
+                if initial is not None:
+                    found[var] = (initial, step, sites[0])
+        return found
+
+    def reduce_induction_variables(self):
+        ivs = self.induction_variables()
+        if not ivs:
+            return 0
+        cfg = self.cfg
+        code, operands = cfg.code, cfg.operands
+        sums = {}                 # (variable, factor) -> running product temp
+        reduced = 0
+        for block in self.blocks:
+            for i, instr in cfg.instructions(block):
+                op, dst, a, b = instr
+                if op != Op.MUL:
+                    continue
+                if a in ivs and self.int_constant(b):
+                    var, factor = a, b
+                elif b in ivs and self.int_constant(a):
+                    var, factor = b, a
+                else:
+                    continue
+                if dst == var:
+                    continue
+                key = (var, operands.values[factor])
+                product = sums.get(key)
+                if product is None:
+                    product = sums[key] = operands.new_temp()
+                    initial, step, update = ivs[var]
+                    self.inserts.setdefault(self.loop.entry_point, []).append(
+                        (Op.COPY, product, operands.intern(Kind.CONST, initial * key[1]), NONE))
+                    self.inserts.setdefault(update + 1, []).append(
+                        (Op.ADD, product, product, operands.intern(Kind.CONST, step * key[1])))
+                code[i] = (Op.COPY, dst, product, NONE)
+                reduced += 1
+        return reduced
+
+__all__ = ['Loop', 'LoopPass', 'natural_loops', 'optimize_loops', 'dominates',
+           'dominator_intervals']
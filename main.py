@@ -1,35 +1,19 @@
 import streamlit as st
-from lexer import CLexer
-from parser import CParser, ASTNode
-from semantic import SemanticAnalyzer
-from ir import IRGenerator
-from optimizer import optimize_ast
-from codegen import CodeGenerator
+from contextlib import ExitStack
+from compile_cache import CompileCache, make_key
+from pipeline import compile_source
+from tracing import tracer
+from jit import JITError, compile_program
+from vm import VM, VMError
 from visualizer import (
     visualize_tokens,
     visualize_ast,
+    visualize_ast_outline,
     visualize_symbol_table,
     visualize_ir,
     visualize_final_code
 )
 
-def display_ast(node, depth=0):
-    if not node:
-        return ""
-    
-    indent = "  " * depth
-    result = f"{indent}- {node.type}"
-    
-    if node.value is not None:
-        result += f": {node.value}"
-    
-    result += "\n"
-    
-    for child in node.children:
-        result += display_ast(child, depth + 1)
-    
-    return result
-
 def display_symbol_table(symbol_table, depth=0):
     if not symbol_table:
         return ""
@@ -46,16 +30,30 @@ def display_symbol_table(symbol_table, depth=0):
     
     return result
 
-def display_ir(ir_code):
-    if not ir_code:
-        return "No IR generated"
-    return "\n".join(ir_code)
-
 def display_asm(asm_code):
     if not asm_code:
         return "No assembly generated"
     return "\n".join(asm_code)
 
+def display_trace(panel, recording):
+    rows = recording.summary()
+    with panel:
+        st.subheader("⏱️ Phase Timings")
+        phases = [row for row in rows if row['category'] == 'phase' and row['span'] != 'compile']
+        if phases:
+            st.bar_chart({'ms': {row['span']: row['total_ms'] for row in phases}})
+        st.dataframe([{key: round(value, 3) if isinstance(value, float) else value
+                       for key, value in row.items()} for row in rows])
+        st.download_button("Download Chrome trace", recording.dumps(),
+                           file_name="compile_trace.json", mime="application/json")
+
+def stop():
+    # st.stop() ends the script run; show the timings recorded so far first
+    trace_scope.close()
+    if trace is not None:
+        display_trace(trace_panel, trace)
+    st.stop()
+
 st.set_page_config(page_title="Mini C Compiler", layout="wide")
 st.title("🛠️ C-like Compiler with Visual Phases")
 
@@ -79,68 +77,136 @@ int main() {
 }
 """)
 
+@st.cache_resource
+def get_compile_cache():
+    # One cache per Streamlit server process, shared across reruns and sessions
+    return CompileCache()
+
+compile_cache = get_compile_cache()
+
+with st.sidebar:
+    st.header("⚙️ Options")
+    options = {
+        'optimize': st.checkbox("Run optimizer", value=True),
+        'ir_optimize': st.checkbox("Optimize IR", value=True),
+    }
+    trace_enabled = st.checkbox("Trace phases", value=False,
+                                help="Record per-phase spans for this run (bypasses the cache)")
+
 if st.button("🚀 Compile Now"):
+    st.session_state.compiled_source = code_input
+
+source = st.session_state.get('compiled_source')
+result = None
+trace = None
+# Kept open through rendering so the visualizer spans land in the same trace
+trace_scope = ExitStack()
+if source is not None:
+    if trace_enabled:
+        trace = trace_scope.enter_context(tracer.record())
+        result = compile_cache.put(make_key(source, options), compile_source(source, options))
+    else:
+        result = compile_cache.get_or_compile(source, options, compile_source)
+trace_panel = st.container()
+
+with st.sidebar:
+    st.header("🗄️ Compile Cache")
+    stats = compile_cache.stats()
+    st.caption(f"{stats['hits']} hits · {stats['misses']} misses · "
+               f"{stats['evictions']} evictions · {stats['bytes'] / 1024:.1f} KB")
+    if len(compile_cache):
+        st.table(compile_cache.entry_info())
+    if st.button("Clear cache"):
+        compile_cache.clear()
+
+if result is not None:
     col1, col2 = st.columns([1, 1])
     
     with col1:
         st.subheader("🔹 Lexical Analysis")
-        lexer = CLexer()
-        lexer.input(code_input)
-        tokens = []
-        while True:
-            tok = lexer.token()
-            if not tok:
-                break
-            tokens.append(tok)
-        visualize_tokens(tokens, stream=True)
+        visualize_tokens(result.tokens, stream=True)
         
         st.subheader("🔹 Syntax Analysis (AST)")
-        parser = CParser()
-        ast = parser.parse(code_input)
-        
-        if parser.errors:
+        if result.failed_phase == 'parse':
             st.error("Parser Errors:")
-            for error in parser.errors:
+            for error in result.errors:
                 st.error(error)
-            st.stop()
+            stop()
             
-        visualize_ast(ast, stream=True)
-        st.text(display_ast(ast))
+        visualize_ast(result.ast, stream=True)
+        visualize_ast_outline(result.ast)
     
     with col2:
-        if ast:
-            st.subheader("🔹 Semantic Analysis")
-            analyzer = SemanticAnalyzer()
-            analyzer.analyze(ast)
-            
-            if analyzer.errors:
-                st.error("Semantic Errors:")
-                for error in analyzer.errors:
-                    st.error(error)
-                st.stop()
-                
-            visualize_symbol_table(analyzer.global_scope, stream=True)
-            st.success("✅ Semantic analysis passed!")
-            
-            st.subheader("🔹 Optimization")
-            optimized_ast, removed_count = optimize_ast(ast)
-            st.info(f"Optimization removed {removed_count} nodes")
-            visualize_ast(optimized_ast, stream=True)
-            st.text(display_ast(optimized_ast))
-            
-            st.subheader("🔹 Intermediate Code")
-            ir_generator = IRGenerator()
-            ir_generator.generate(optimized_ast)
-            ir_code = ir_generator.get_code()
-            visualize_ir(ir_code, stream=True)
-            st.text(display_ir(ir_code))
-            
-            st.subheader("🔹 Final Code Generation")
-            code_generator = CodeGenerator(ir_code)
-            asm_code = code_generator.generate()
-            visualize_final_code(asm_code, stream=True)
-            st.code(display_asm(asm_code), language='asm')
+        st.subheader("🔹 Semantic Analysis")
+        if result.failed_phase == 'semantic':
+            st.error("Semantic Errors:")
+            for error in result.errors:
+                st.error(error)
+            stop()
             
-            st.success("✅ Compilation Successful!")
+        visualize_symbol_table(result.symbol_table, stream=True)
+        st.success("✅ Semantic analysis passed!")
+        
+        st.subheader("🔹 Optimization")
+        rewrites = {rule: count for rule, count in result.optimization_stats.items() if count}
+        st.info(f"Optimization applied {sum(rewrites.values())} rewrites")
+        if rewrites:
+            st.table([{"Rule": rule, "Rewrites": count} for rule, count in rewrites.items()])
+        visualize_ast(result.optimized_ast, stream=True, key='optimized_ast')
+        visualize_ast_outline(result.optimized_ast, key='optimized_ast')
+        
+        st.subheader("🔹 Intermediate Code")
+        if result.ir_stats:
+            ir_stats = result.ir_stats
+            st.info(f"IR optimizer: {ir_stats['instructions_before']} → {ir_stats['instructions_after']} instructions "
+                    f"({ir_stats['tail_calls']} tail calls turned into jumps, "
+                    f"{ir_stats['sccp_constants']} constants and {ir_stats['sccp_branches']} branches folded, "
+                    f"{ir_stats['sccp_unreachable']} unreachable removed, "
+                    f"{ir_stats['licm_hoisted']} hoisted out of loops, "
+                    f"{ir_stats['iv_reduced']} multiplications strength-reduced, "
+                    f"{ir_stats['copies_propagated']} copies propagated, {ir_stats['cse']} CSE, "
+                    f"{ir_stats['dead_stores']} dead stores removed, "
+                    f"{ir_stats['peephole_jumps']} jumps and {ir_stats['peephole_labels']} labels simplified)")
+        visualize_ir(result.ir_code, stream=True)
+        
+        st.subheader("🔹 Final Code Generation")
+        if result.codegen_errors:
+            # Integer-only backend: no assembly, but the program still runs below
+            st.warning("No x86-64 code for this program:")
+            for error in result.codegen_errors:
+                st.warning(error)
         else:
-            st.warning("No AST generated - cannot proceed to next phases")
+            spilled = sum(stats['spilled'] for stats in result.allocation_stats)
+            st.caption(f"Linear-scan allocation: {spilled} spilled intervals in "
+                       f"{sum(stats['seconds'] for stats in result.allocation_stats) * 1e3:.2f} ms")
+            visualize_final_code(result.asm_code, stream=True)
+            st.code(display_asm(result.asm_code), language='asm')
+        
+        st.success("✅ Compilation Successful!")
+
+    st.subheader("🔹 Execution")
+    with st.expander("Bytecode"):
+        st.code("\n".join(result.bytecode.disassemble()))
+    engine = st.radio("Engine", ["Bytecode VM", "Python JIT"], horizontal=True)
+    max_steps = st.number_input("Step limit (VM only)", min_value=1000, value=10_000_000, step=1_000_000)
+    if st.button("▶️ Run main()"):
+        try:
+            if engine == "Bytecode VM":
+                run = VM(result.bytecode, max_steps=max_steps).run('main')
+            else:
+                run = compile_program(result.optimized_ast).run('main')
+        except (VMError, JITError) as error:
+            st.error(f"Runtime error: {error}")
+        else:
+            st.success(f"main() returned {run.value}")
+            if run.steps:
+                st.caption(f"{run.steps:,} instructions in {run.seconds * 1e3:.1f} ms "
+                           f"({run.steps_per_second / 1e6:.2f} M instructions/s)")
+            else:
+                st.caption(f"{run.seconds * 1e3:.1f} ms")
+            if run.output:
+                st.text("".join(run.output))
+
+if trace is not None:
+    trace_scope.close()
+    display_trace(trace_panel, trace)
@@ -0,0 +1,91 @@
+# names.py
+# Process-wide interning of identifiers and type names. The lexer replaces
+# every such token value with the canonical Name for its text: a str that
+# also carries a small integer id. All occurrences of a name share one
+# object, so tokens and AST nodes store a pointer instead of a fresh string,
+# equality is an identity check, and tables that only need a key (scopes,
+# constant maps) index by the id. The text is still there for display,
+# f-strings and hashing like any other str.
+# The table refers to its Names weakly: a name is dropped once no token or
+# tree holds it, so a long-running process (the Streamlit app) keeps only
+# the names of the results it still caches. Ids are never reused, so an id
+# kept past its Name cannot come to mean another text. Ids handed out for a
+# plain str (name_id on a hand-built tree, the analyzer's builtins) have no
+# Name for the caller to hold, so those Names are kept for good.
+import threading
+import weakref
+
+class Name(str):
+    """Canonical interned text; name.id identifies it in its NameTable."""
+
+    def __reduce__(self):
+        # Re-intern on unpickling (e.g. results sent back from a worker process)
+        return (_restore, (str(self),))
+
+class NameTable:
+    def __init__(self, seed=()):
+        self._by_text = {}        # text -> weak reference to its Name
+        self._by_id = {}          # id -> weak reference to its Name
+        self._pinned = set()      # Names kept for the life of the table
+        self._next_id = 0
+        self._lock = threading.Lock()
+        for text in seed:
+            self.intern(text)
+
+    def __len__(self):
+        """Names currently alive."""
+        return len(self._by_id)
+
+    def canonical(self, text):
+        """The shared Name for text, created on first use."""
+        ref = self._by_text.get(text)
+        name = ref() if ref is not None else None
+        if name is None:
+            with self._lock:
+                ref = self._by_text.get(text)
+                name = ref() if ref is not None else None
+                if name is None:
+                    name = Name(text)
+                    name.id = self._next_id
+                    self._next_id += 1
+                    text = str(text)
+                    ref = weakref.KeyedRef(name, self._forget, (text, name.id))
+                    self._by_text[text] = ref
+                    self._by_id[name.id] = ref
+        return name
+
+    def _forget(self, ref):
+        # The Name died; a newer Name for the same text may already be listed
+        text, name_id = ref.key
+        if self._by_text.get(text) is ref:
+            del self._by_text[text]
+        self._by_id.pop(name_id, None)
+
+    def intern(self, text):
+        """Id of text, valid for as long as the table lives."""
+        name = self.canonical(text)
+        self._pinned.add(name)
+        return name.id
+
+    def text(self, name_id):
+        return self._by_id[name_id]()
+
+# Type keywords get the lowest ids
+TYPE_NAMES = ('int', 'float', 'char', 'bool', 'void')
+
+names = NameTable(TYPE_NAMES)
+canonical = names.canonical
+intern = names.intern
+
+def _restore(text):
+    return names.canonical(text)
+
+def name_id(value):
+    """Id of an identifier from the lexer, or of any other str (e.g. a tree
+    built by hand) by interning it on the spot."""
+    try:
+        return value.id
+    except AttributeError:
+        return names.intern(value)
+
+__all__ = ['Name', 'NameTable', 'names', 'canonical', 'intern', 'name_id', 'TYPE_NAMES']
@@ -1,27 +1,238 @@
+from interprocedural import EVAL_BUDGET, CallGraph, Evaluator, Inliner, Unevaluable
+from ir import c_divide
+from names import name_id
 from parser import ASTNode
+from tracing import tracer
+from traversal import transform, walk
+
+LITERALS = {'Literal', 'Number'}
+
+# Rule names reported by Optimizer.optimize
+RULES = ('constant_fold', 'constant_propagation', 'reassociate',
+         'strength_reduction', 'dead_code', 'branch_fold', 'inline', 'call_eval')
+
+def fold_binary(op, a, b):
+    if op == 'PLUS': return a + b
+    elif op == 'MINUS': return a - b
+    elif op == 'TIMES': return a * b
+    elif op == 'DIVIDE': return c_divide(a, b)
+    elif op == 'EQ': return int(a == b)
+    elif op == 'NEQ': return int(a != b)
+    elif op == 'LT': return int(a < b)
+    elif op == 'GT': return int(a > b)
+    elif op == 'LE': return int(a <= b)
+    elif op == 'GE': return int(a >= b)
+    raise ValueError(f"Unknown operator {op}")
+
+def assigned_names(node):
+    """Ids (names.name_id) of the variables assigned or declared in node."""
+    names = set()
+    for current, _ in walk(node):
+        if current.type == 'Assignment':
+            names.add(name_id(current.children[0].value))
+        elif current.type == 'VarDecl':
+            names.add(name_id(current.children[1].value))
+    return names
+
+def has_call(node):
+    return any(current.type == 'Call' for current, _ in walk(node))
 
 class Optimizer:
-    def __init__(self):
+    def __init__(self, inline=True, eval_budget=EVAL_BUDGET):
+        self.inline = inline
+        self.eval_budget = eval_budget
         self.constants = {}
         self.removed_count = 0
+        self.stats = dict.fromkeys(RULES, 0)
+        self._evaluator = None
+        self._rules = {
+            'PLUS': (self._rule_fold, self._rule_reassociate, self._rule_strength),
+            'TIMES': (self._rule_fold, self._rule_reassociate, self._rule_strength),
+            'MINUS': (self._rule_fold, self._rule_strength),
+            'DIVIDE': (self._rule_fold, self._rule_strength),
+            'EQ': (self._rule_fold,), 'NEQ': (self._rule_fold,),
+            'LT': (self._rule_fold,), 'GT': (self._rule_fold,),
+            'LE': (self._rule_fold,), 'GE': (self._rule_fold,),
+            'Block': (self._rule_dead_code,),
+            'If': (self._rule_branch,),
+            'IfElse': (self._rule_branch,),
+            'Call': (self._rule_call,),
+        }
 
     def optimize(self, node):
+        """Fused rewrite: one post-order walk applying every local rule.
+
+        Each rewritten node goes back on a worklist and is re-examined until
+        no rule fires, so a rewrite that exposes another opportunity (e.g.
+        x * 1 + 2 + 3 -> x + 2 + 3 -> x + 5) is taken in the same walk.
+        Parents are visited after their children, so they always see the
+        simplified subtrees. Returns the tree and per-rule rewrite counts.
+
+        On a whole Program, small functions are first inlined at their call
+        statements, and calls to pure functions whose arguments fold to
+        constants are evaluated during the walk (see interprocedural.py).
+        """
+        self.constants = {}
+        self.stats = dict.fromkeys(RULES, 0)
+        self._assigned = []
+        self._else_branches = []
+        self._evaluator = None
+        with tracer.span('Optimizer.optimize', 'optimizer') as span:
+            if node is not None and node.type == 'Program' and (self.inline or self.eval_budget):
+                graph = CallGraph(node)
+                if self.inline:
+                    with tracer.span('Optimizer.inline', 'optimizer'):
+                        self.stats['inline'] = Inliner(graph).run(node)
+                if self.eval_budget:
+                    self._evaluator = Evaluator(graph, self.eval_budget)
+            node = transform(node, pre=self._enter, post=self._leave)
+            span.set(rewrites=sum(self.stats.values()))
+        return node, self.stats
+
+    # -- fused rewriter ------------------------------------------------------
+
+    def _enter(self, node):
+        node_type = node.type
+        if node_type == 'Variable':
+            value = self.constants.get(name_id(node.value))
+            if value is not None:
+                self.stats['constant_propagation'] += 1
+                return ASTNode('Literal', value=value, lineno=node.lineno)
+        elif node_type == 'Function':
+            self.constants = {}
+        elif node_type == 'While':
+            # The condition and body run with values from any iteration
+            names = assigned_names(node)
+            for name in names:
+                self.constants.pop(name, None)
+            self._assigned.append(set(names))
+        elif node_type == 'If' or node_type == 'IfElse':
+            self._assigned.append(set())
+            if node_type == 'IfElse':
+                self._else_branches.append((node.children[2], dict(self.constants)))
+        elif self._else_branches and self._else_branches[-1][0] == node:
+            # Entering the else block: forget what the then block assigned
+            self.constants = self._else_branches.pop()[1]
+        return node
+
+    def _leave(self, node):
+        node_type = node.type
+        if node_type == 'VarDecl' or node_type == 'Assignment':
+            self._record(node)
+        elif node_type == 'While' or node_type == 'If' or node_type == 'IfElse':
+            # Join point: anything assigned inside is no longer known
+            names = self._assigned.pop()
+            for name in names:
+                self.constants.pop(name, None)
+            if self._assigned:
+                self._assigned[-1].update(names)
+        return self._simplify(node)
+
+    def _record(self, node):
+        if node.type == 'VarDecl':
+            var_name = name_id(node.children[1].value)
+            expr = node.children[2] if len(node.children) > 2 else None
+        else:
+            var_name, expr = name_id(node.children[0].value), node.children[1]
+        if self._assigned:
+            self._assigned[-1].add(var_name)
+        if expr is not None and expr.type in LITERALS:
+            self.constants[var_name] = expr.value
+        else:
+            self.constants.pop(var_name, None)
+
+    def _simplify(self, node):
+        worklist = [node]
+        while worklist:
+            node = worklist.pop()
+            rules = self._rules.get(node.type)
+            if rules is None:
+                return node
+            for rule in rules:
+                new_node = rule(node)
+                if new_node is not None:
+                    worklist.append(new_node)
+                    break
+        return node
+
+    def _rule_fold(self, node):
+        left, right = node.children
+        if left.type in LITERALS and right.type in LITERALS:
+            try:
+                result = fold_binary(node.type, left.value, right.value)
+            except Exception:
+                return None
+            self.stats['constant_fold'] += 1
+            return ASTNode('Literal', value=result, lineno=node.lineno)
+        return None
+
+    def _rule_call(self, node):
+        # A pure function applied to constants is replaced by its result
+        args = node.children[1].children
+        if self._evaluator is None or not all(arg is not None and arg.type in LITERALS for arg in args):
+            return None
+        try:
+            value = self._evaluator.evaluate(node.children[0].value, [arg.value for arg in args])
+        except Unevaluable:
+            return None
+        self.stats['call_eval'] += 1
+        return ASTNode('Literal', value=value, lineno=node.lineno)
+
+    def _rule_reassociate(self, node):
+        # (x op c1) op c2 -> x op (c1 op c2) for integer + and *
+        left, right = node.children
+        if (right.type in LITERALS and type(right.value) is int and left.type == node.type
+                and left.children[1].type in LITERALS and type(left.children[1].value) is int):
+            self.stats['reassociate'] += 1
+            constant = self._simplify(ASTNode(node.type, children=[left.children[1], right],
+                                              lineno=node.lineno))
+            return ASTNode(node.type, children=[left.children[0], constant], lineno=node.lineno)
+        return None
+
+    def _rule_strength(self, node):
+        result = self._reduce(node)
+        if result is node:
+            return None
+        self.stats['strength_reduction'] += 1
+        return result
+
+    def _rule_dead_code(self, node):
+        for i, child in enumerate(node.children):
+            if child is not None and child.type == 'Return' and i + 1 < len(node.children):
+                self.stats['dead_code'] += len(node.children) - i - 1
+                node.children = node.children[:i + 1]
+                return node
+        return None
+
+    def _rule_branch(self, node):
+        cond = node.children[0]
+        if cond.type in LITERALS:
+            self.stats['branch_fold'] += 1
+            if cond.value:
+                return node.children[1]
+            if node.type == 'IfElse':
+                return node.children[2]
+            return ASTNode('Block', children=[], lineno=node.lineno)
+        return None
+
+    # -- separate passes -------------------------------------------------------
+
+    def optimize_passes(self, node):
+        """The original four full-tree walks, run once each in fixed order."""
         self.constants = {}
         self.removed_count = 0
         
-        node = self.constant_folding(node)
-        node = self.constant_propagation(node)
-        node = self.dead_code_elimination(node)
-        node = self.strength_reduction(node)
+        for run_pass in (self.constant_folding, self.constant_propagation,
+                         self.dead_code_elimination, self.strength_reduction):
+            with tracer.span(f'Optimizer.{run_pass.__name__}', 'optimizer'):
+                node = run_pass(node)
         
         return node, self.removed_count
 
     def constant_folding(self, node):
-        if node is None or not hasattr(node, 'children'):
-            return node
-
-        node.children = [self.constant_folding(child) for child in node.children]
+        return transform(node, post=self._fold)
 
+    def _fold(self, node):
         if node.type in {'PLUS', 'MINUS', 'TIMES', 'DIVIDE', 
                          'EQ', 'NEQ', 'LT', 'GT', 'LE', 'GE'}:
             left = node.children[0]
@@ -29,21 +240,7 @@ class Optimizer:
             
             if left.type in {'Literal', 'Number'} and right.type in {'Literal', 'Number'}:
                 try:
-                    a = left.value
-                    b = right.value
-                    result = None
-                    
-                    if node.type == 'PLUS': result = a + b
-                    elif node.type == 'MINUS': result = a - b
-                    elif node.type == 'TIMES': result = a * b
-                    elif node.type == 'DIVIDE': result = a / b if b != 0 else 0
-                    elif node.type == 'EQ': result = int(a == b)
-                    elif node.type == 'NEQ': result = int(a != b)
-                    elif node.type == 'LT': result = int(a < b)
-                    elif node.type == 'GT': result = int(a > b)
-                    elif node.type == 'LE': result = int(a <= b)
-                    elif node.type == 'GE': result = int(a >= b)
-                    
+                    result = fold_binary(node.type, left.value, right.value)
                     return ASTNode('Literal', value=result, lineno=node.lineno)
                 except Exception:
                     pass
@@ -56,38 +253,32 @@ class Optimizer:
         return node
 
     def constant_propagation(self, node):
-        if node is None or not hasattr(node, 'children'):
-            return node
+        return transform(node, pre=self._propagate)
 
-        if node.type == 'Declaration' and len(node.children) > 2:
-            var_name = node.children[1].value
+    def _propagate(self, node):
+        if node.type == 'VarDecl' and len(node.children) > 2:
+            var_name = name_id(node.children[1].value)
             expr = node.children[2]
             if expr.type in {'Literal', 'Number'}:
                 self.constants[var_name] = expr.value
 
         elif node.type == 'Assignment':
-            var_name = node.children[0].value
+            var_name = name_id(node.children[0].value)
             expr = node.children[1]
             if expr.type in {'Literal', 'Number'}:
                 self.constants[var_name] = expr.value
             elif var_name in self.constants:
                 del self.constants[var_name]
 
-        elif node.type == 'Variable' and node.value in self.constants:
-            return ASTNode('Literal', value=self.constants[node.value], lineno=node.lineno)
+        elif node.type == 'Variable' and name_id(node.value) in self.constants:
+            return ASTNode('Literal', value=self.constants[name_id(node.value)], lineno=node.lineno)
 
-        if hasattr(node, 'children'):
-            node.children = [self.constant_propagation(child) for child in node.children]
-        
         return node
 
     def dead_code_elimination(self, node):
-        if node is None or not hasattr(node, 'children'):
-            return node
+        return transform(node, post=self._eliminate)
 
-        if hasattr(node, 'children'):
-            node.children = [self.dead_code_elimination(child) for child in node.children]
-        
+    def _eliminate(self, node):
         if node.type == 'Block':
             new_children = []
             found_return = False
@@ -126,12 +317,9 @@ class Optimizer:
         return node
 
     def strength_reduction(self, node):
-        if node is None or not hasattr(node, 'children'):
-            return node
-
-        if hasattr(node, 'children'):
-            node.children = [self.strength_reduction(child) for child in node.children]
+        return transform(node, post=self._reduce)
 
+    def _reduce(self, node):
         if node.type == 'PLUS':
             left, right = node.children
             if left.type in {'Literal', 'Number'} and left.value == 0:
@@ -149,8 +337,9 @@ class Optimizer:
             if (left.type in {'Literal', 'Number'} and left.value == 1) or \
                (right.type in {'Literal', 'Number'} and right.value == 1):
                 return right if left.value == 1 else left
-            elif (left.type in {'Literal', 'Number'} and left.value == 0) or \
-                 (right.type in {'Literal', 'Number'} and right.value == 0):
+            elif (left.type in {'Literal', 'Number'} and left.value == 0 and not has_call(right)) or \
+                 (right.type in {'Literal', 'Number'} and right.value == 0 and not has_call(left)):
+                # A call multiplied by 0 still has to run
                 return ASTNode('Literal', value=0, lineno=node.lineno)
         
         elif node.type == 'DIVIDE':
@@ -161,6 +350,7 @@ class Optimizer:
         return node
 
 def optimize_ast(ast):
+    """Optimize ast in place; returns (ast, per-rule rewrite counts)."""
     optimizer = Optimizer()
     optimized_ast = optimizer.optimize(ast)
-    return optimized_ast
\ No newline at end of file
+    return optimized_ast
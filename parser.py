@@ -1,10 +1,23 @@
 # parser.py
+import copy
+import os
+import sys
 import ply.yacc as yacc
-from lexer import CLexer
+from lexer import CLexer, TokenSource
+from tracing import tracer
+
+# LALR tables are written next to this file as parsetab.py. PLY stores the
+# grammar signature (productions, precedence, tokens) in the table module and
+# regenerates it automatically whenever the p_* docstrings change.
+TABLE_MODULE = 'parsetab'
+TABLE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 class ASTNode:
+    # No per-instance __dict__: large programs allocate millions of nodes
+    __slots__ = ('type', 'children', 'value', 'lineno')
+
     def __init__(self, type_, children=None, value=None, lineno=None):
-        self.type = type_
+        self.type = sys.intern(type_)
         self.children = children if children is not None else []
         self.value = value
         self.lineno = lineno
@@ -24,6 +37,9 @@ class CParser:
         ('left', 'TIMES', 'DIVIDE'),
     )
 
+    # First LRParser built in this process; later instances reuse its tables
+    _template = None
+
     def __init__(self):
         self.lexer = CLexer()
         self.parser = None
@@ -32,22 +48,57 @@ class CParser:
 
     def _build_parser(self):
         try:
-            self.parser = yacc.yacc(module=self, start='program', debug=False, write_tables=False)
+            if CParser._template is None:
+                self.parser = yacc.yacc(module=self, start='program', debug=False,
+                                        write_tables=True, tabmodule=TABLE_MODULE,
+                                        outputdir=TABLE_DIR)
+                CParser._template = self.parser
+            else:
+                self.parser = self._bind_tables(CParser._template)
         except Exception as e:
             self.errors.append(f"Parser construction failed: {str(e)}")
             raise
 
-    def parse(self, code):
+    def _bind_tables(self, template):
+        # Productions carry the bound p_* callables, so each instance gets its
+        # own copies pointing at its own methods (and its own self.errors).
+        productions = [copy.copy(prod) for prod in template.productions]
+        for prod in productions:
+            if prod.func:
+                prod.callable = getattr(self, prod.func)
+        tables = _Tables(productions, template.action, template.goto)
+        return yacc.LRParser(tables, self.p_error)
+
+    def parse(self, code=None, tokens=None):
+        """Parse source text, or tokens that were already lexed.
+
+        With code the text is lexed on demand as the parser pulls tokens,
+        nothing is buffered. tokens may be a list (e.g. kept for display)
+        or an iterator such as CLexer.tokenize(code); they are replayed
+        without lexing the text again. errors holds the syntax errors, led
+        by the lexer's when the text was lexed here; whoever lexed replayed
+        tokens has their lexer errors.
+        """
         if not self.parser:
             self.errors.append("Parser not initialized")
             return None
-            
-        self.lexer.input(code)
-        try:
-            return self.parser.parse(code, lexer=self.lexer.lexer)
-        except Exception as e:
-            self.errors.append(f"Parsing failed: {str(e)}")
-            return None
+
+        self.errors = []
+        if tokens is not None:
+            source = TokenSource(tokens)
+        else:
+            # input() also resets lineno, which ply.yacc's own input() would not
+            self.lexer.input(code)
+            source = self.lexer.lexer
+        with tracer.span('CParser.parse', replay=tokens is not None):
+            try:
+                return self.parser.parse(lexer=source)
+            except Exception as e:
+                self.errors.append(f"Parsing failed: {str(e)}")
+                return None
+            finally:
+                if tokens is None:
+                    self.errors[:0] = self.lexer.errors
 
     # Simplified grammar to avoid conflicts
     def p_program(self, p):
@@ -184,7 +235,8 @@ class CParser:
                 | expr LE expr
                 | expr GT expr
                 | expr GE expr'''
-        p[0] = ASTNode(p[2], children=[p[1], p[3]], lineno=p.lineno(2))
+        # Operator nodes are named after the token (PLUS, LT, ...)
+        p[0] = ASTNode(p.slice[2].type, children=[p[1], p[3]], lineno=p.lineno(2))
 
     def p_expr_group(self, p):
         '''expr : LPAREN expr RPAREN'''
@@ -214,8 +266,8 @@ class CParser:
         '''args : 
                 | expr
                 | args COMMA expr'''
-        if len(p) == 1:  # No arguments
-            p[0] = ASTNode('Args', children=[], lineno=p.lineno(1))
+        if len(p) == 1:  # No arguments (an empty production has no line of its own)
+            p[0] = ASTNode('Args', children=[])
         elif len(p) == 2:  # Single argument
             p[0] = ASTNode('Args', children=[p[1]], lineno=p.lineno(1))
         else:  # Multiple arguments
@@ -224,13 +276,25 @@ class CParser:
 
     def p_error(self, p):
         if p:
-            error_msg = f"Syntax error at '{p.value}' (line {p.lineno})"
-            self.errors.append(error_msg)
-            print(error_msg)
+            self.errors.append(f"Syntax error at '{p.value}' (line {p.lineno})")
         else:
-            error_msg = "Syntax error at end of input"
-            self.errors.append(error_msg)
-            print(error_msg)
+            self.errors.append("Syntax error at end of input")
+
+class _Tables:
+    # Minimal stand-in for ply.yacc.LRTable accepted by LRParser
+    def __init__(self, productions, action, goto):
+        self.lr_productions = productions
+        self.lr_action = action
+        self.lr_goto = goto
+
+_shared_parser = None
+
+def get_parser():
+    """Return the process-wide CParser, building it on first use."""
+    global _shared_parser
+    if _shared_parser is None:
+        _shared_parser = CParser()
+    return _shared_parser
 
 # Export ASTNode for other modules
-__all__ = ['CParser', 'ASTNode']
+__all__ = ['CParser', 'ASTNode', 'get_parser']
@@ -6,9 +6,9 @@ _tabversion = '3.10'
 
 _lr_method = 'LALR'
 
-_lr_signature = 'DIVIDE EQUALS ID LPAREN MINUS NUMBER PLUS PRINT RPAREN TIMESprogram : stmt_liststmt_list : stmt stmt_list\n| stmtstmt : declaration\n| assignment\n| print_stmtdeclaration : ID EQUALS exprassignment : ID EQUALS exprprint_stmt : PRINT IDexpr : expr PLUS expr\n| expr MINUS expr\n| expr TIMES expr\n| expr DIVIDE exprexpr : NUMBERexpr : ID'
+_lr_signature = 'programleftEQNEQleftLTLEGTGEleftPLUSMINUSleftTIMESDIVIDEBOOL CHAR COMMA DIVIDE ELSE EQ EQUALS FLOAT FLOATTYPE FOR GE GT ID IF INT LBRACE LE LPAREN LT MINUS NEQ NUMBER PLUS RBRACE RETURN RPAREN SEMI STRING TIMES VOID WHILEprogram : function_listfunction_list : function\n                         | function_list functionfunction : type ID LPAREN RPAREN block\n                    | type ID LPAREN params RPAREN blockparams : param\n                  | params COMMA paramparam : type IDblock : LBRACE statements RBRACEstatements : \n                      | statements statementstatement : var_decl\n                     | assignment\n                     | expr_stmt\n                     | return_stmt\n                     | if_stmt\n                     | while_stmt\n                     | blockvar_decl : type ID SEMI\n                    | type ID EQUALS expr SEMIassignment : ID EQUALS expr SEMIexpr_stmt : expr SEMIreturn_stmt : RETURN SEMI\n                       | RETURN expr SEMIif_stmt : IF LPAREN expr RPAREN block\n                   | IF LPAREN expr RPAREN block ELSE blockwhile_stmt : WHILE LPAREN expr RPAREN blocktype : INT\n                | FLOATTYPE\n                | VOID\n                | CHAR\n                | BOOLexpr : expr PLUS expr\n                | expr MINUS expr\n                | expr TIMES expr\n                | expr DIVIDE expr\n                | expr EQ expr\n                | expr NEQ expr\n                | expr LT expr\n                | expr LE expr\n                | expr GT expr\n                | expr GE exprexpr : LPAREN expr RPARENexpr : NUMBER\n                | FLOATexpr : IDexpr : STRINGexpr : ID LPAREN args RPARENargs : \n                | expr\n                | args COMMA expr'
     
-_lr_action_items = {'ID':([0,3,4,5,6,8,10,11,12,13,14,15,16,17,18,19,20,21,22,],[7,7,-4,-5,-6,11,12,-9,-15,-7,-14,12,12,12,12,-10,-11,-12,-13,]),'PRINT':([0,3,4,5,6,11,12,13,14,19,20,21,22,],[8,8,-4,-5,-6,-9,-15,-7,-14,-10,-11,-12,-13,]),'$end':([1,2,3,4,5,6,9,11,12,13,14,19,20,21,22,],[0,-1,-3,-4,-5,-6,-2,-9,-15,-7,-14,-10,-11,-12,-13,]),'EQUALS':([7,],[10,]),'NUMBER':([10,15,16,17,18,],[14,14,14,14,14,]),'PLUS':([12,13,14,19,20,21,22,],[-15,15,-14,15,15,15,15,]),'MINUS':([12,13,14,19,20,21,22,],[-15,16,-14,16,16,16,16,]),'TIMES':([12,13,14,19,20,21,22,],[-15,17,-14,17,17,17,17,]),'DIVIDE':([12,13,14,19,20,21,22,],[-15,18,-14,18,18,18,18,]),}
+_lr_action_items = {'INT':([0,2,3,10,12,18,19,21,22,23,25,26,27,28,29,30,31,32,33,47,58,64,79,84,89,91,92,94,],[5,5,-2,-3,5,-4,-10,5,5,-5,-9,-11,-12,-13,-14,-15,-16,-17,-18,-22,-23,-19,-24,-21,-20,-25,-27,-26,]),'FLOATTYPE':([0,2,3,10,12,18,19,21,22,23,25,26,27,28,29,30,31,32,33,47,58,64,79,84,89,91,92,94,],[6,6,-2,-3,6,-4,-10,6,6,-5,-9,-11,-12,-13,-14,-15,-16,-17,-18,-22,-23,-19,-24,-21,-20,-25,-27,-26,]),'VOID':([0,2,3,10,12,18,19,21,22,23,25,26,27,28,29,30,31,32,33,47,58,64,79,84,89,91,92,94,],[7,7,-2,-3,7,-4,-10,7,7,-5,-9,-11,-12,-13,-14,-15,-16,-17,-18,-22,-23,-19,-24,-21,-20,-25,-27,-26,]),'CHAR':([0,2,3,10,12,18,19,21,22,23,25,26,27,28,29,30,31,32,33,47,58,64,79,84,89,91,92,94,],[8,8,-2,-3,8,-4,-10,8,8,-5,-9,-11,-12,-13,-14,-15,-16,-17,-18,-22,-23,-19,-24,-21,-20,-25,-27,-26,]),'BOOL':([0,2,3,10,12,18,19,21,22,23,25,26,27,28,29,30,31,32,33,47,58,64,79,84,89,91,92,94,],[9,9,-2,-3,9,-4,-10,9,9,-5,-9,-11,-12,-13,-14,-15,-16,-17,-18,-22,-23,-19,-24,-21,-20,-25,-27,-26,]),'$end':([1,2,3,10,18,23,25,],[0,-1,-2,-3,-4,-5,-9,]),'ID':([4,5,6,7,8,9,13,19,22,25,26,27,28,29,30,31,32,33,34,37,39,45,46,47,48,49,50,51,52,53,54,55,56,57,58,61,63,64,65,79,84,86,89,91,92,94,],[11,-28,-29,-30,-31,-32,17,-10,35,-9,-11,-12,-13,-14,-15,-16,-17,-18,44,60,60,60,60,-22,60,60,60,60,60,60,60,60,60,60,-23,60,60,-19,60,-24,-21,60,-20,-25,-27,-26,]),'LPAREN':([11,19,22,25,26,27,28,29,30,31,32,33,35,37,38,39,40,45,46,47,48,49,50,51,52,53,54,55,56,57,58,60,61,63,64,65,79,84,86,89,91,92,94,],[12,-10,39,-9,-11,-12,-13,-14,-15,-16,-17,-18,46,39,61,39,63,39,39,-22,39,39,39,39,39,39,39,39,39,39,-23,46,39,39,-19,39,-24,-21,39,-20,-25,-27,-26,]),'RPAREN':([12,15,16,17,24,41,42,43,46,60,62,67,68,69,70,71,72,73,74,75,76,77,78,80,81,82,85,90,],[14,20,-6,-8,-7,-44,-45,-47,-49,-46,81,85,-50,-33,-34,-35,-36,-37,-38,-39,-40,-41,-42,87,-43,88,-48,-51,]),'LBRACE':([14,19,20,22,25,26,27,28,29,30,31,32,33,47,58,64,79,84,87,88,89,91,92,93,94,],[19,-10,19,19,-9,-11,-12,-13,-14,-15,-16,-17,-18,-22,-23,-19,-24,-21,19,19,-20,-25,-27,19,-26,]),'COMMA':([15,16,17,24,41,42,43,46,60,67,68,69,70,71,72,73,74,75,76,77,78,81,85,90,],[21,-6,-8,-7,-44,-45,-47,-49,-46,86,-50,-33,-34,-35,-36,-37,-38,-39,-40,-41,-42,-43,-48,-51,]),'RBRACE':([19,22,25,26,27,28,29,30,31,32,33,47,58,64,79,84,89,91,92,94,],[-10,25,-9,-11,-12,-13,-14,-15,-16,-17,-18,-22,-23,-19,-24,-21,-20,-25,-27,-26,]),'RETURN':([19,22,25,26,27,28,29,30,31,32,33,47,58,64,79,84,89,91,92,94,],[-10,37,-9,-11,-12,-13,-14,-15,-16,-17,-18,-22,-23,-19,-24,-21,-20,-25,-27,-26,]),'IF':([19,22,25,26,27,28,29,30,31,32,33,47,58,64,79,84,89,91,92,94,],[-10,38,-9,-11,-12,-13,-14,-15,-16,-17,-18,-22,-23,-19,-24,-21,-20,-25,-27,-26,]),'WHILE':([19,22,25,26,27,28,29,30,31,32,33,47,58,64,79,84,89,91,92,94,],[-10,40,-9,-11,-12,-13,-14,-15,-16,-17,-18,-22,-23,-19,-24,-21,-20,-25,-27,-26,]),'NUMBER':([19,22,25,26,27,28,29,30,31,32,33,37,39,45,46,47,48,49,50,51,52,53,54,55,56,57,58,61,63,64,65,79,84,86,89,91,92,94,],[-10,41,-9,-11,-12,-13,-14,-15,-16,-17,-18,41,41,41,41,-22,41,41,41,41,41,41,41,41,41,41,-23,41,41,-19,41,-24,-21,41,-20,-25,-27,-26,]),'FLOAT':([19,22,25,26,27,28,29,30,31,32,33,37,39,45,46,47,48,49,50,51,52,53,54,55,56,57,58,61,63,64,65,79,84,86,89,91,92,94,],[-10,42,-9,-11,-12,-13,-14,-15,-16,-17,-18,42,42,42,42,-22,42,42,42,42,42,42,42,42,42,42,-23,42,42,-19,42,-24,-21,42,-20,-25,-27,-26,]),'STRING':([19,22,25,26,27,28,29,30,31,32,33,37,39,45,46,47,48,49,50,51,52,53,54,55,56,57,58,61,63,64,65,79,84,86,89,91,92,94,],[-10,43,-9,-11,-12,-13,-14,-15,-16,-17,-18,43,43,43,43,-22,43,43,43,43,43,43,43,43,43,43,-23,43,43,-19,43,-24,-21,43,-20,-25,-27,-26,]),'ELSE':([25,91,],[-9,93,]),'EQUALS':([35,44,],[45,65,]),'SEMI':([35,36,37,41,42,43,44,59,60,66,69,70,71,72,73,74,75,76,77,78,81,83,85,],[-46,47,58,-44,-45,-47,64,79,-46,84,-33,-34,-35,-36,-37,-38,-39,-40,-41,-42,-43,89,-48,]),'PLUS':([35,36,41,42,43,59,60,62,66,68,69,70,71,72,73,74,75,76,77,78,80,81,82,83,85,90,],[-46,48,-44,-45,-47,48,-46,48,48,48,-33,-34,-35,-36,48,48,48,48,48,48,48,-43,48,48,-48,48,]),'MINUS':([35,36,41,42,43,59,60,62,66,68,69,70,71,72,73,74,75,76,77,78,80,81,82,83,85,90,],[-46,49,-44,-45,-47,49,-46,49,49,49,-33,-34,-35,-36,49,49,49,49,49,49,49,-43,49,49,-48,49,]),'TIMES':([35,36,41,42,43,59,60,62,66,68,69,70,71,72,73,74,75,76,77,78,80,81,82,83,85,90,],[-46,50,-44,-45,-47,50,-46,50,50,50,50,50,-35,-36,50,50,50,50,50,50,50,-43,50,50,-48,50,]),'DIVIDE':([35,36,41,42,43,59,60,62,66,68,69,70,71,72,73,74,75,76,77,78,80,81,82,83,85,90,],[-46,51,-44,-45,-47,51,-46,51,51,51,51,51,-35,-36,51,51,51,51,51,51,51,-43,51,51,-48,51,]),'EQ':([35,36,41,42,43,59,60,62,66,68,69,70,71,72,73,74,75,76,77,78,80,81,82,83,85,90,],[-46,52,-44,-45,-47,52,-46,52,52,52,-33,-34,-35,-36,-37,-38,-39,-40,-41,-42,52,-43,52,52,-48,52,]),'NEQ':([35,36,41,42,43,59,60,62,66,68,69,70,71,72,73,74,75,76,77,78,80,81,82,83,85,90,],[-46,53,-44,-45,-47,53,-46,53,53,53,-33,-34,-35,-36,-37,-38,-39,-40,-41,-42,53,-43,53,53,-48,53,]),'LT':([35,36,41,42,43,59,60,62,66,68,69,70,71,72,73,74,75,76,77,78,80,81,82,83,85,90,],[-46,54,-44,-45,-47,54,-46,54,54,54,-33,-34,-35,-36,54,54,-39,-40,-41,-42,54,-43,54,54,-48,54,]),'LE':([35,36,41,42,43,59,60,62,66,68,69,70,71,72,73,74,75,76,77,78,80,81,82,83,85,90,],[-46,55,-44,-45,-47,55,-46,55,55,55,-33,-34,-35,-36,55,55,-39,-40,-41,-42,55,-43,55,55,-48,55,]),'GT':([35,36,41,42,43,59,60,62,66,68,69,70,71,72,73,74,75,76,77,78,80,81,82,83,85,90,],[-46,56,-44,-45,-47,56,-46,56,56,56,-33,-34,-35,-36,56,56,-39,-40,-41,-42,56,-43,56,56,-48,56,]),'GE':([35,36,41,42,43,59,60,62,66,68,69,70,71,72,73,74,75,76,77,78,80,81,82,83,85,90,],[-46,57,-44,-45,-47,57,-46,57,57,57,-33,-34,-35,-36,57,57,-39,-40,-41,-42,57,-43,57,57,-48,57,]),}
 
 _lr_action = {}
 for _k, _v in _lr_action_items.items():
@@ -17,7 +17,7 @@ for _k, _v in _lr_action_items.items():
       _lr_action[_x][_k] = _y
 del _lr_action_items
 
-_lr_goto_items = {'program':([0,],[1,]),'stmt_list':([0,3,],[2,9,]),'stmt':([0,3,],[3,3,]),'declaration':([0,3,],[4,4,]),'assignment':([0,3,],[5,5,]),'print_stmt':([0,3,],[6,6,]),'expr':([10,15,16,17,18,],[13,19,20,21,22,]),}
+_lr_goto_items = {'program':([0,],[1,]),'function_list':([0,],[2,]),'function':([0,2,],[3,10,]),'type':([0,2,12,21,22,],[4,4,13,13,34,]),'params':([12,],[15,]),'param':([12,21,],[16,24,]),'block':([14,20,22,87,88,93,],[18,23,33,91,92,94,]),'statements':([19,],[22,]),'statement':([22,],[26,]),'var_decl':([22,],[27,]),'assignment':([22,],[28,]),'expr_stmt':([22,],[29,]),'return_stmt':([22,],[30,]),'if_stmt':([22,],[31,]),'while_stmt':([22,],[32,]),'expr':([22,37,39,45,46,48,49,50,51,52,53,54,55,56,57,61,63,65,86,],[36,59,62,66,68,69,70,71,72,73,74,75,76,77,78,80,82,83,90,]),'args':([46,],[67,]),}
 
 _lr_goto = {}
 for _k, _v in _lr_goto_items.items():
@@ -27,19 +27,55 @@ for _k, _v in _lr_goto_items.items():
 del _lr_goto_items
 _lr_productions = [
   ("S' -> program","S'",1,None,None,None),
-  ('program -> stmt_list','program',1,'p_program','parser.py',6),
-  ('stmt_list -> stmt stmt_list','stmt_list',2,'p_stmt_list','parser.py',10),
-  ('stmt_list -> stmt','stmt_list',1,'p_stmt_list','parser.py',11),
-  ('stmt -> declaration','stmt',1,'p_stmt','parser.py',18),
-  ('stmt -> assignment','stmt',1,'p_stmt','parser.py',19),
-  ('stmt -> print_stmt','stmt',1,'p_stmt','parser.py',20),
-  ('declaration -> ID EQUALS expr','declaration',3,'p_declaration','parser.py',24),
-  ('assignment -> ID EQUALS expr','assignment',3,'p_assignment','parser.py',28),
-  ('print_stmt -> PRINT ID','print_stmt',2,'p_print_stmt','parser.py',32),
-  ('expr -> expr PLUS expr','expr',3,'p_expr_binop','parser.py',36),
-  ('expr -> expr MINUS expr','expr',3,'p_expr_binop','parser.py',37),
-  ('expr -> expr TIMES expr','expr',3,'p_expr_binop','parser.py',38),
-  ('expr -> expr DIVIDE expr','expr',3,'p_expr_binop','parser.py',39),
-  ('expr -> NUMBER','expr',1,'p_expr_number','parser.py',43),
-  ('expr -> ID','expr',1,'p_expr_id','parser.py',47),
+  ('program -> function_list','program',1,'p_program','parser.py',81),
+  ('function_list -> function','function_list',1,'p_function_list','parser.py',85),
+  ('function_list -> function_list function','function_list',2,'p_function_list','parser.py',86),
+  ('function -> type ID LPAREN RPAREN block','function',5,'p_function','parser.py',94),
+  ('function -> type ID LPAREN params RPAREN block','function',6,'p_function','parser.py',95),
+  ('params -> param','params',1,'p_params','parser.py',111),
+  ('params -> params COMMA param','params',3,'p_params','parser.py',112),
+  ('param -> type ID','param',2,'p_param','parser.py',120),
+  ('block -> LBRACE statements RBRACE','block',3,'p_block','parser.py',127),
+  ('statements -> <empty>','statements',0,'p_statements','parser.py',131),
+  ('statements -> statements statement','statements',2,'p_statements','parser.py',132),
+  ('statement -> var_decl','statement',1,'p_statement','parser.py',140),
+  ('statement -> assignment','statement',1,'p_statement','parser.py',141),
+  ('statement -> expr_stmt','statement',1,'p_statement','parser.py',142),
+  ('statement -> return_stmt','statement',1,'p_statement','parser.py',143),
+  ('statement -> if_stmt','statement',1,'p_statement','parser.py',144),
+  ('statement -> while_stmt','statement',1,'p_statement','parser.py',145),
+  ('statement -> block','statement',1,'p_statement','parser.py',146),
+  ('var_decl -> type ID SEMI','var_decl',3,'p_var_decl','parser.py',150),
+  ('var_decl -> type ID EQUALS expr SEMI','var_decl',5,'p_var_decl','parser.py',151),
+  ('assignment -> ID EQUALS expr SEMI','assignment',4,'p_assignment','parser.py',165),
+  ('expr_stmt -> expr SEMI','expr_stmt',2,'p_expr_stmt','parser.py',172),
+  ('return_stmt -> RETURN SEMI','return_stmt',2,'p_return_stmt','parser.py',176),
+  ('return_stmt -> RETURN expr SEMI','return_stmt',3,'p_return_stmt','parser.py',177),
+  ('if_stmt -> IF LPAREN expr RPAREN block','if_stmt',5,'p_if_stmt','parser.py',184),
+  ('if_stmt -> IF LPAREN expr RPAREN block ELSE block','if_stmt',7,'p_if_stmt','parser.py',185),
+  ('while_stmt -> WHILE LPAREN expr RPAREN block','while_stmt',5,'p_while_stmt','parser.py',192),
+  ('type -> INT','type',1,'p_type','parser.py',196),
+  ('type -> FLOATTYPE','type',1,'p_type','parser.py',197),
+  ('type -> VOID','type',1,'p_type','parser.py',198),
+  ('type -> CHAR','type',1,'p_type','parser.py',199),
+  ('type -> BOOL','type',1,'p_type','parser.py',200),
+  ('expr -> expr PLUS expr','expr',3,'p_expr_binop','parser.py',204),
+  ('expr -> expr MINUS expr','expr',3,'p_expr_binop','parser.py',205),
+  ('expr -> expr TIMES expr','expr',3,'p_expr_binop','parser.py',206),
+  ('expr -> expr DIVIDE expr','expr',3,'p_expr_binop','parser.py',207),
+  ('expr -> expr EQ expr','expr',3,'p_expr_binop','parser.py',208),
+  ('expr -> expr NEQ expr','expr',3,'p_expr_binop','parser.py',209),
+  ('expr -> expr LT expr','expr',3,'p_expr_binop','parser.py',210),
+  ('expr -> expr LE expr','expr',3,'p_expr_binop','parser.py',211),
+  ('expr -> expr GT expr','expr',3,'p_expr_binop','parser.py',212),
+  ('expr -> expr GE expr','expr',3,'p_expr_binop','parser.py',213),
+  ('expr -> LPAREN expr RPAREN','expr',3,'p_expr_group','parser.py',217),
+  ('expr -> NUMBER','expr',1,'p_expr_number','parser.py',221),
+  ('expr -> FLOAT','expr',1,'p_expr_number','parser.py',222),
+  ('expr -> ID','expr',1,'p_expr_id','parser.py',226),
+  ('expr -> STRING','expr',1,'p_expr_string','parser.py',230),
+  ('expr -> ID LPAREN args RPAREN','expr',4,'p_expr_call','parser.py',234),
+  ('args -> <empty>','args',0,'p_args','parser.py',241),
+  ('args -> expr','args',1,'p_args','parser.py',242),
+  ('args -> args COMMA expr','args',3,'p_args','parser.py',243),
 ]
@@ -0,0 +1,149 @@
+# peephole.py
+# Windowed clean-up of a function's instruction stream. Jumps are first
+# threaded through labels that only lead to another goto, and every label
+# in a run of adjacent labels is replaced by the run's first. One sweep then
+# pushes instructions onto an output stack and rewrites its top: a jump to
+# the label being pushed is popped, "if c goto L; goto M; L:" becomes
+# "if not c goto M", code after an unconditional jump up to the next live
+# label is dropped, labels nothing jumps to are dropped, and "t = ...; x = t"
+# with t read nowhere else defines x directly. Each round is linear in the
+# function's length; a round can expose more work (a dropped label joins two
+# runs of labels), so rounds repeat until one changes nothing.
+from cfg import JUMPS, PURE_DEFS, defs_uses
+from ir import Kind, NONE, Op
+
+INVERSE = {Op.IF_FALSE: Op.IF_TRUE, Op.IF_TRUE: Op.IF_FALSE}
+FOLDABLE = PURE_DEFS + (Op.CALL,)     # definitions a following copy can be folded into
+
+def jump_target(instr):
+    return instr[2] if instr[0] == Op.GOTO else instr[3]
+
+def retarget(instr, label):
+    op, dst, a, b = instr
+    return (op, dst, label, b) if op == Op.GOTO else (op, dst, a, label)
+
+def peephole(cfg, max_rounds=None):
+    """Simplify cfg.code in place and rebuild cfg if anything changed.
+    Returns (jumps threaded or removed, labels dropped, copies folded,
+    unreachable instructions dropped)."""
+    totals = [0, 0, 0, 0]
+    rounds = 0
+    while max_rounds is None or rounds < max_rounds:
+        rounds += 1
+        window = Peephole(cfg.operands.kinds, [instr for instr in cfg.code if instr is not None])
+        counts = window.run()
+        if not any(counts):
+            break
+        cfg.code = window.out
+        totals = [total + count for total, count in zip(totals, counts)]
+    if any(totals):
+        cfg.rebuild()
+    return tuple(totals)
+
+class Peephole:
+    """One round over a function's instructions; the result is in out."""
+
+    def __init__(self, kinds, code):
+        self.kinds = kinds
+        self.code = code
+        self.out = []
+        self.refs = {}            # label -> jumps to it
+        self.reads = {}           # temp -> instructions reading it
+        self.jumps = self.labels = self.copies = self.dropped = 0
+
+    def thread(self):
+        """Point every jump at the final label of its goto chain, using the
+        first label of that label's run."""
+        code = self.code
+        head = {}                 # label -> first label of its run
+        lands = {}                # label -> index of the first instruction after its run
+        run = []
+        for i, instr in enumerate(code):
+            if instr[0] == Op.LABEL:
+                run.append(instr[2])
+                head[instr[2]] = run[0]
+            elif run:
+                for label in run:
+                    lands[label] = i
+                run = []
+        final = {}
+        for i, instr in enumerate(code):
+            if instr[0] not in JUMPS:
+                continue
+            label = jump_target(instr)
+            target = final.get(label)
+            if target is None:
+                chain = [label]
+                seen = {label}
+                while True:
+                    at = lands.get(chain[-1])
+                    if at is None or code[at][0] != Op.GOTO:
+                        break
+                    next_label = code[at][2]
+                    if next_label in seen:
+                        break
+                    known = final.get(next_label)
+                    if known is not None:
+                        chain.append(known)
+                        break
+                    chain.append(next_label)
+                    seen.add(next_label)
+                target = head[chain[-1]]
+                for link in chain:
+                    final[link] = target
+            if target != label:
+                code[i] = retarget(instr, target)
+                self.jumps += 1
+            self.refs[target] = self.refs.get(target, 0) + 1
+
+    def run(self):
+        self.thread()
+        kinds, refs, reads = self.kinds, self.refs, self.reads
+        for instr in self.code:
+            for v in defs_uses(kinds, instr)[1]:
+                reads[v] = reads.get(v, 0) + 1
+        out = self.out
+        for instr in self.code:
+            op = instr[0]
+            if op == Op.LABEL:
+                self.push_label(instr)
+            elif out and out[-1][0] in (Op.GOTO, Op.RETURN) and op != Op.RETURN:
+                # Unreachable: nothing jumps past the previous unconditional
+                # jump. A function's RETURN stays so every function ends in one.
+                if op in JUMPS:
+                    refs[jump_target(instr)] -= 1
+                self.dropped += 1
+            elif op == Op.COPY and kinds[instr[2]] == Kind.TEMP and reads[instr[2]] == 1 \
+                    and out and out[-1][1] == instr[2] and out[-1][0] in FOLDABLE:
+                prev = out[-1]
+                out[-1] = (prev[0], instr[1], prev[2], prev[3])
+                self.copies += 1
+            else:
+                out.append(instr)
+        return self.jumps, self.labels, self.copies, self.dropped
+
+    def push_label(self, instr):
+        out, refs = self.out, self.refs
+        label = instr[2]
+        while out:
+            top = out[-1]
+            if top[0] in JUMPS and jump_target(top) == label:
+                # A jump to the next instruction
+                out.pop()
+                refs[label] -= 1
+                self.jumps += 1
+            elif top[0] == Op.GOTO and len(out) > 1 and out[-2][0] in INVERSE \
+                    and out[-2][3] == label:
+                # if c goto L; goto M; L:  ->  if not c goto M; L:
+                out.pop()
+                out[-1] = (INVERSE[out[-1][0]], NONE, out[-1][2], top[2])
+                refs[label] -= 1
+                self.jumps += 1
+            else:
+                break
+        if refs.get(label, 0):
+            out.append(instr)
+        else:
+            self.labels += 1
+
+__all__ = ['FOLDABLE', 'INVERSE', 'Peephole', 'jump_target', 'peephole', 'retarget']
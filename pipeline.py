@@ -0,0 +1,136 @@
+# pipeline.py
+from lexer import CLexer, TokenStore
+from parser import get_parser
+from semantic_analyzer import SemanticAnalyzer
+from optimizer import optimize_ast
+from intermediate_code_generator import IRGenerator
+from ir_optimizer import optimize_ir
+from vm import assemble
+from codegen import CodeGenerator, CodegenError
+from tracing import tracer
+from traversal import clone, walk
+
+DEFAULT_OPTIONS = {
+    'optimize': True,
+    'ir_optimize': True,
+    # Buffer the token stream in CompileResult.tokens; when off, the parser
+    # pulls tokens straight from the lexer and nothing is kept
+    'keep_tokens': True,
+}
+
+class CompileResult:
+    """Artifacts produced by each compiler phase for one source text."""
+
+    def __init__(self, source, options):
+        self.source = source
+        self.options = options
+        self.tokens = []
+        self.ast = None
+        self.symbol_table = None
+        self.optimized_ast = None
+        self.optimization_stats = {}
+        self.ir = None
+        self.ir_stats = {}
+        self.ir_code = []
+        self.bytecode = None
+        self.asm_code = []
+        self.allocation_stats = []
+        # The x86-64 backend only handles int values; when it gives up the
+        # compile still succeeds (the VM and the JIT run the program) and
+        # asm_code stays empty
+        self.codegen_errors = []
+        self.errors = []
+        self.failed_phase = None
+
+    @property
+    def ok(self):
+        return self.failed_phase is None
+
+    def fail(self, phase, errors):
+        self.failed_phase = phase
+        self.errors = list(errors)
+        return self
+
+def lex_source(code, lexer=None):
+    return list((lexer or CLexer()).tokenize(code))
+
+def compile_source(code, options=None):
+    options = dict(DEFAULT_OPTIONS, **(options or {}))
+    result = CompileResult(code, options)
+
+    with tracer.span('compile', 'phase', chars=len(code)):
+        return _compile_phases(code, result, options)
+
+def _count_nodes(ast):
+    # Only paid for while a trace is being recorded
+    return sum(1 for _ in walk(ast)) if tracer.active and ast is not None else None
+
+def _compile_phases(code, result, options):
+    span = tracer.span
+    parser = get_parser()
+    if options['keep_tokens']:
+        # Lex once: the buffered tokens are replayed to the parser, then kept
+        # in columnar form for display.
+        # The lexer is too hot for a span per token; the phase span carries the count
+        with span('lex', 'phase') as s:
+            tokens = lex_source(code, parser.lexer)
+            s.set(tokens=len(tokens))
+        lex_errors = parser.lexer.errors
+        with span('parse', 'phase') as s:
+            result.ast = parser.parse(tokens=tokens)
+            s.set(nodes=_count_nodes(result.ast))
+        errors = lex_errors + parser.errors
+        # Columnar copy for the views: a few bytes per token instead of an object
+        with span('token_store', 'phase'):
+            result.tokens = TokenStore.from_tokens(tokens)
+        del tokens
+    else:
+        with span('parse', 'phase') as s:
+            result.ast = parser.parse(code)
+            s.set(nodes=_count_nodes(result.ast))
+        errors = parser.errors
+    if errors:
+        return result.fail('parse', errors)
+    if result.ast is None:
+        return result.fail('parse', ["No AST generated"])
+
+    with span('semantic', 'phase'):
+        analyzer = SemanticAnalyzer()
+        analyzer.analyze(result.ast)
+    if analyzer.errors:
+        return result.fail('semantic', analyzer.errors)
+    result.symbol_table = analyzer.global_scope
+
+    with span('optimize', 'phase') as s:
+        # The optimizer rewrites the tree in place, keep the parsed AST intact
+        optimized_ast = clone(result.ast)
+        if options['optimize']:
+            optimized_ast, result.optimization_stats = optimize_ast(optimized_ast)
+        result.optimized_ast = optimized_ast
+        s.set(nodes=_count_nodes(optimized_ast), rewrites=sum(result.optimization_stats.values()))
+
+    with span('irgen', 'phase') as s:
+        ir_generator = IRGenerator()
+        ir_generator.generate(optimized_ast)
+        result.ir = ir_generator.get_ir()
+        s.set(instructions=len(result.ir))
+    if options['ir_optimize']:
+        with span('ir_optimize', 'phase') as s:
+            result.ir, result.ir_stats = optimize_ir(result.ir)
+            s.set(instructions=len(result.ir))
+    result.ir_code = result.ir.to_text()
+    with span('assemble', 'phase') as s:
+        result.bytecode = assemble(result.ir)
+        s.set(instructions=len(result.bytecode))
+
+    with span('codegen', 'phase') as s:
+        code_generator = CodeGenerator(result.ir)
+        try:
+            result.asm_code = code_generator.generate()
+        except CodegenError as error:
+            result.codegen_errors = [str(error)]
+            s.set(error=str(error))
+            return result
+        s.set(lines=len(result.asm_code))
+    result.allocation_stats = code_generator.allocation_stats
+    return result
@@ -1,35 +1,353 @@
+# semantic_analyzer.py
+# Scope and type checking over the parser's ASTNode tree in one pass.
+# Names resolve through a flat table of shadow stacks (name -> innermost
+# binding last), so a lookup is one dict access however deep the scopes
+# nest; leaving a scope pops exactly the names it declared. Every symbol
+# gets a numeric id. The tree is not annotated: later phases keep resolving
+# variables by name (interned ids, names.py), and a declared type says
+# nothing about the value at run time (the VM and the JIT never convert), so
+# they have no use for the checker's types either. Those phases keep one
+# storage slot per name in a function, so a variable that shadows an outer
+# one is renamed (declaration and every use) to a name no other node of the
+# program carries.
+# Scope tables and shadow stacks are keyed by interned name id (names.py).
+from names import canonical, name_id
+from traversal import trampoline, walk
+
+COMPARISONS = {'EQ', 'NEQ', 'LT', 'GT', 'LE', 'GE'}
+ARITHMETIC = {'PLUS', 'MINUS', 'TIMES', 'DIVIDE'}
+
+class Symbol:
+    __slots__ = ('id', 'name', 'kind', 'type', 'scope_level', 'params', 'lineno', 'unique')
+
+    def __init__(self, id, name, kind, type, scope_level, params=None, lineno=None):
+        self.id = id
+        self.name = name
+        self.kind = kind              # 'variable', 'parameter', 'function' or 'builtin'
+        self.type = type              # declared type; the return type for functions
+        self.scope_level = scope_level
+        self.params = params          # [(type, name)] for functions, None if variadic
+        self.lineno = lineno
+        self.unique = None            # name given to the nodes when this shadows a variable
+
+    @property
+    def is_function(self):
+        return self.kind in ('function', 'builtin')
+
+    @property
+    def parameters(self):
+        return self.params or []
+
+    def __str__(self):
+        if self.is_function:
+            params = "..." if self.params is None else ", ".join(f"{t} {n}" for t, n in self.params)
+            return f"#{self.id} {self.type} {self.name}({params})"
+        return f"#{self.id} {self.type} {self.name} ({self.kind})"
+
+    def __repr__(self):
+        return f"Symbol({self})"
+
+class Scope:
+    def __init__(self, scope_level, parent=None, owner=None):
+        self.scope_level = scope_level
+        self.parent = parent
+        self.owner = owner            # name of the enclosing function, None for globals
+        self.symbols = {}             # name id -> Symbol
+        self.children = []
+        if parent is not None:
+            parent.children.append(self)
+
+    def lookup(self, name):
+        """Walk the parent chain; the analyzer itself resolves through its
+        shadow stacks instead."""
+        key = name_id(name)
+        scope = self
+        while scope is not None:
+            symbol = scope.symbols.get(key)
+            if symbol is not None:
+                return symbol
+            scope = scope.parent
+        return None
+
+    def walk(self):
+        """This scope and all nested ones, outermost first."""
+        stack = [self]
+        while stack:
+            scope = stack.pop()
+            yield scope
+            stack.extend(reversed(scope.children))
+
+# Functions the VM and the JIT provide without a definition
+BUILTINS = (('printf', 'int', None),)
+
 class SemanticAnalyzer:
     def __init__(self):
-        self.symbol_table = {}
+        self.errors = []
+        self.global_scope = None
+        self.symbols = []             # indexed by Symbol.id
+        self._bindings = {}           # name id -> stack of visible Symbols
+        self._scope = None
+        self._function = None
+        self._handlers = {}
+        self._root = None
+        self._taken = None            # texts in the program, built on first shadowing
+        self._serial = 0
+        for name, return_type, params in BUILTINS:
+            self._bind(Symbol(len(self.symbols), name, 'builtin', return_type, -1, params),
+                       name_id(name))
 
     def analyze(self, ast):
-        return self.check_statements(ast)
-
-    def check_statements(self, stmts):
-        for stmt in stmts:
-            if stmt[0] == 'declaration':
-                self.check_declaration(stmt)
-            elif stmt[0] == 'assignment':
-                self.check_assignment(stmt)
-            elif stmt[0] == 'print':
-                self.check_print(stmt)
-            else:
-                print("Semantic Error: Unknown statement type:", stmt[0])
-        return True
+        self.errors = []
+        if ast is None:
+            return False
+        self._root = ast
+        trampoline(ast, self._dispatch)
+        return not self.errors
+
+    def error(self, message, node):
+        if node is not None and node.lineno is not None:
+            message = f"{message} (line {node.lineno})"
+        self.errors.append(message)
+
+    # -- scopes and symbols ----------------------------------------------------
+
+    def _bind(self, symbol, key):
+        self.symbols.append(symbol)
+        stack = self._bindings.get(key)
+        if stack is None:
+            self._bindings[key] = [symbol]
+        else:
+            stack.append(symbol)
+        return symbol
 
-    def check_declaration(self, stmt):
-        var_name = stmt[1]
-        if var_name in self.symbol_table:
-            print(f"Semantic Error: Variable '{var_name}' already declared.")
+    def push_scope(self, owner=None):
+        parent = self._scope
+        if parent is None:
+            self._scope = Scope(0)
         else:
-            self.symbol_table[var_name] = True
+            self._scope = Scope(parent.scope_level + 1, parent,
+                                owner if owner is not None else parent.owner)
+        return self._scope
+
+    def pop_scope(self):
+        scope = self._scope
+        bindings = self._bindings
+        for key in scope.symbols:
+            stack = bindings[key]
+            stack.pop()
+            if not stack:
+                del bindings[key]
+        self._scope = scope.parent
+
+    def declare(self, name_node, kind, type_, params=None):
+        """Bind the name in name_node in the current scope; None if it is
+        already declared there."""
+        name = name_node.value
+        key = name_id(name)
+        scope = self._scope
+        if key in scope.symbols:
+            if scope.symbols[key].is_function:
+                self.error(f"Function '{name}' already defined", name_node)
+            else:
+                self.error(f"Variable '{name}' already declared in this scope", name_node)
+            return None
+        outer = self._bindings.get(key)
+        symbol = self._bind(Symbol(len(self.symbols), name, kind, type_, scope.scope_level,
+                                   params, name_node.lineno), key)
+        scope.symbols[key] = symbol
+        if outer and not outer[-1].is_function and not symbol.is_function:
+            symbol.unique = name_node.value = self.fresh(name)
+        return symbol
+
+    def fresh(self, name):
+        """A name for a shadowing variable that no node of the program uses."""
+        if self._taken is None:
+            self._taken = {node.value for node, _ in walk(self._root)
+                           if isinstance(node.value, str)}
+        while True:
+            self._serial += 1
+            fresh = f"{name}_{self._serial}"
+            if fresh not in self._taken:
+                self._taken.add(fresh)
+                return canonical(fresh)
+
+    def resolve(self, name):
+        stack = self._bindings.get(name_id(name))
+        return stack[-1] if stack else None
+
+    # -- traversal -------------------------------------------------------------
+
+    # Statement handlers are generators that yield child nodes (see
+    # traversal.trampoline); expression handlers return the expression type.
+    def _dispatch(self, node):
+        if node is None:
+            return None
+        handler = self._handlers.get(node.type)
+        if handler is None:
+            if node.type in ARITHMETIC or node.type in COMPARISONS:
+                handler = self.check_binary
+            else:
+                handler = getattr(self, f'check_{node.type}', self.check_default)
+            self._handlers[node.type] = handler
+        return handler(node)
+
+    def check_default(self, node):
+        for child in node.children:
+            yield child
+
+    def check_Program(self, node):
+        self.global_scope = self.push_scope()
+        # Declare every function first so calls may precede definitions
+        for function in node.children:
+            return_type = function.children[0].value
+            params = []
+            if function.children[2].type == 'Params':
+                params = [(param.children[0].value, param.children[1].value)
+                          for param in function.children[2].children]
+            self.declare(function.children[1], 'function', return_type, params)
+        for function in node.children:
+            yield function
+        self.pop_scope()
+
+    def check_Function(self, node):
+        name_node = node.children[1]
+        symbol = self.resolve(name_node.value)
+        previous = self._function
+        self._function = symbol
+        # Parameters and the outermost block share one scope, as in C
+        self.push_scope(owner=name_node.value)
+        if node.children[2].type == 'Params':
+            for param in node.children[2].children:
+                self.check_declared_type(param.children[0].value, param.children[1])
+                self.declare(param.children[1], 'parameter', param.children[0].value)
+        for stmt in node.children[-1].children:
+            yield stmt
+        self.pop_scope()
+        self._function = previous
+
+    def check_Block(self, node):
+        self.push_scope()
+        for stmt in node.children:
+            yield stmt
+        self.pop_scope()
+
+    def check_declared_type(self, type_, name_node):
+        if type_ == 'void':
+            self.error(f"Variable '{name_node.value}' declared void", name_node)
+
+    def check_VarDecl(self, node):
+        type_, name_node = node.children[0].value, node.children[1]
+        self.check_declared_type(type_, name_node)
+        if len(node.children) > 2:
+            value_type = yield node.children[2]
+            self.check_assignable(value_type, name_node.value, name_node)
+        # Declared after its initializer: "int x = x;" reads an outer x
+        self.declare(name_node, 'variable', type_)
+
+    def check_Assignment(self, node):
+        name_node = node.children[0]
+        symbol = self.resolve(name_node.value)
+        value_type = yield node.children[1]
+        if symbol is None:
+            self.error(f"Undeclared variable '{name_node.value}'", name_node)
+            return
+        if symbol.is_function:
+            self.error(f"Cannot assign to function '{name_node.value}'", name_node)
+            return
+        self.check_assignable(value_type, name_node.value, name_node)
+        if symbol.unique is not None:
+            name_node.value = symbol.unique
+
+    def check_assignable(self, value_type, name, node):
+        if value_type == 'void':
+            self.error(f"Void value assigned to '{name}'", node)
+        elif value_type == 'string':
+            self.error(f"String literal assigned to '{name}'", node)
+
+    def check_Return(self, node):
+        function = self._function
+        returns_void = function is not None and function.type == 'void'
+        if node.children:
+            value_type = yield node.children[0]
+            if returns_void:
+                self.error(f"Return with a value in void function '{function.name}'", node)
+            elif value_type in ('void', 'string'):
+                self.error(f"Invalid return value of type {value_type}", node)
+        elif function is not None and not returns_void:
+            self.error(f"Return without a value in function '{function.name}' "
+                       f"returning {function.type}", node)
+
+    def check_condition(self, cond_type, node):
+        if cond_type in ('void', 'string'):
+            self.error(f"Condition of type {cond_type}", node)
+
+    def check_If(self, node):
+        self.check_condition((yield node.children[0]), node)
+        yield node.children[1]
+
+    def check_IfElse(self, node):
+        self.check_condition((yield node.children[0]), node)
+        yield node.children[1]
+        yield node.children[2]
+
+    def check_While(self, node):
+        self.check_condition((yield node.children[0]), node)
+        yield node.children[1]
+
+    # -- expressions -----------------------------------------------------------
+
+    def check_Call(self, node):
+        name_node, args = node.children[0], node.children[1]
+        arg_types = []
+        for arg in args.children:
+            arg_type = yield arg
+            if arg_type == 'void':
+                self.error(f"Void value passed to '{name_node.value}'", arg)
+            arg_types.append(arg_type)
+
+        symbol = self.resolve(name_node.value)
+        if symbol is None:
+            self.error(f"Undeclared function '{name_node.value}'", name_node)
+            return None
+        if not symbol.is_function:
+            self.error(f"'{name_node.value}' is not a function", name_node)
+            return None
+        if symbol.params is not None:
+            if len(arg_types) != len(symbol.params):
+                self.error(f"Function '{symbol.name}' expects {len(symbol.params)} "
+                           f"argument(s), got {len(arg_types)}", node)
+            elif 'string' in arg_types:
+                self.error(f"String literal passed to '{symbol.name}'", node)
+        return symbol.type
+
+    def check_binary(self, node):
+        left = yield node.children[0]
+        right = yield node.children[1]
+        for operand_type in (left, right):
+            if operand_type in ('void', 'string'):
+                self.error(f"Invalid operand of type {operand_type} for {node.type}", node)
+        if node.type in COMPARISONS:
+            return 'int'
+        if left == 'float' or right == 'float':
+            return 'float'
+        return 'int'
+
+    def check_Literal(self, node):
+        return 'float' if isinstance(node.value, float) else 'int'
+
+    def check_StringLiteral(self, node):
+        return 'string'
 
-    def check_assignment(self, stmt):
-        var_name = stmt[1]
-        if var_name not in self.symbol_table:
-            print(f"Semantic Error: Variable '{var_name}' not declared.")
+    def check_Variable(self, node):
+        symbol = self.resolve(node.value)
+        if symbol is None:
+            self.error(f"Undeclared variable '{node.value}'", node)
+            return None
+        if symbol.is_function:
+            self.error(f"Function '{node.value}' used as a variable", node)
+            return None
+        if symbol.unique is not None:
+            node.value = symbol.unique
+        return symbol.type
 
-    def check_print(self, stmt):
-        var_name = stmt[1]
-        if var_name not in self.symbol_table:
-            print(f"Semantic Error: Variable '{var_name}' not declared.")
+__all__ = ['SemanticAnalyzer', 'Symbol', 'Scope', 'BUILTINS']
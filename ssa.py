@@ -0,0 +1,393 @@
+# ssa.py
+# Static single assignment form over a FunctionCFG, and sparse conditional
+# constant propagation (Wegman & Zadeck) on top of it. Dominators come from
+# the iterative algorithm of Cooper, Harvey and Kennedy; phis go on the
+# iterated dominance frontiers of each variable's definitions, semi-pruned:
+# only variables read before being written in some block get any.
+# The SSA form is an overlay. Instructions keep their operands and SSAForm
+# records the value each definition creates and each use reads, so leaving
+# SSA is writing the propagated constants back into cfg.code.
+from cfg import PURE_DEFS, defs_uses
+from ir import FOLDS, Kind, NONE, Op
+
+BRANCHES = (Op.IF_FALSE, Op.IF_TRUE)
+
+def dominators(cfg):
+    """Immediate dominator (block index) of every block. The entry block is
+    its own; blocks unreachable from the entry get None."""
+    order = cfg.reverse_postorder()
+    position = [0] * len(cfg.blocks)
+    for i, block in enumerate(order):
+        position[block.index] = i
+    idom = [None] * len(cfg.blocks)
+    if not order:
+        return idom
+    idom[0] = 0
+    changed = True
+    while changed:
+        changed = False
+        for block in order[1:]:
+            new = None
+            for pred in block.preds:
+                p = pred.index
+                if idom[p] is None:
+                    continue
+                if new is None:
+                    new = p
+                    continue
+                # Walk both fingers up the tree to their common ancestor
+                while p != new:
+                    while position[p] > position[new]:
+                        p = idom[p]
+                    while position[new] > position[p]:
+                        new = idom[new]
+            if idom[block.index] != new:
+                idom[block.index] = new
+                changed = True
+    return idom
+
+def dominance_frontiers(cfg, idom):
+    """Set of frontier block indexes per block."""
+    frontiers = [set() for _ in cfg.blocks]
+    for block in cfg.blocks:
+        b = block.index
+        if idom[b] is None or len(block.preds) < 2:
+            continue
+        for pred in block.preds:
+            runner = pred.index
+            if idom[runner] is None:
+                continue
+            while runner != idom[b]:
+                frontiers[runner].add(b)
+                runner = idom[runner]
+    return frontiers
+
+class Phi:
+    __slots__ = ('block', 'var', 'value', 'args')
+
+    def __init__(self, block, var):
+        self.block = block        # block index
+        self.var = var            # variable operand
+        self.value = NONE         # SSA value the phi defines
+        self.args = {}            # predecessor block index -> SSA value
+
+    def __repr__(self):
+        args = ", ".join(f"B{pred}: v{value}" for pred, value in self.args.items())
+        return f"v{self.value} = phi({args})"
+
+class SSAForm:
+    """SSA values, phis and def-use links of one function.
+
+    Every definition is a numbered value: an instruction writing a variable,
+    a phi, or the value a variable holds on entry when a use is reached by
+    no definition. origins[v] is the defining instruction index, the Phi,
+    or None for entry values; users[v] lists the instruction indexes and
+    Phis reading v. def_value[i] is the value instruction i defines, and
+    use_a[i] / use_b[i] the values its a and b operands read (NONE where
+    the operand is not a variable).
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.idom = dominators(cfg)
+        self.frontiers = dominance_frontiers(cfg, self.idom)
+        self.block_of = [0] * len(cfg.code)
+        for block in cfg.blocks:
+            for i in range(block.start, block.end):
+                self.block_of[i] = block.index
+        self.origins = []
+        self.users = []
+        self.def_value = [NONE] * len(cfg.code)
+        self.use_a = [NONE] * len(cfg.code)
+        self.use_b = [NONE] * len(cfg.code)
+        self.phis = self._place_phis()
+        self._rename()
+
+    def _new_value(self, origin):
+        self.origins.append(origin)
+        self.users.append([])
+        return len(self.origins) - 1
+
+    def _place_phis(self):
+        cfg, idom = self.cfg, self.idom
+        kinds = cfg.operands.kinds
+        def_blocks = {}           # variable -> indexes of blocks writing it
+        upward = set()            # variables read before written in some block
+        for block in cfg.blocks:
+            if idom[block.index] is None:
+                continue
+            written = set()
+            for _, instr in cfg.instructions(block):
+                d, used = defs_uses(kinds, instr)
+                for v in used:
+                    if v not in written:
+                        upward.add(v)
+                if d != NONE and d not in written:
+                    written.add(d)
+                    def_blocks.setdefault(d, []).append(block.index)
+
+        phis = [[] for _ in cfg.blocks]
+        for var in sorted(upward):
+            defined = set(def_blocks.get(var, ()))
+            placed = set()
+            work = list(defined)
+            while work:
+                for f in self.frontiers[work.pop()]:
+                    if f not in placed:
+                        placed.add(f)
+                        phis[f].append(Phi(f, var))
+                        if f not in defined:
+                            defined.add(f)
+                            work.append(f)
+        return phis
+
+    def _rename(self):
+        cfg = self.cfg
+        kinds = cfg.operands.kinds
+        users = self.users
+        children = [[] for _ in cfg.blocks]
+        for block in cfg.blocks:
+            parent = self.idom[block.index]
+            if parent is not None and parent != block.index:
+                children[parent].append(block.index)
+
+        stacks = {}               # variable -> values, innermost definition last
+
+        def current(var):
+            stack = stacks.get(var)
+            if not stack:
+                # Reached by no definition: the entry value, never popped
+                stack = stacks[var] = [self._new_value(None)]
+            return stack[-1]
+
+        pushed_by = {}
+        walk = [0] if cfg.blocks else []
+        while walk:
+            b = walk.pop()
+            if b < 0:
+                # Leaving ~b's dominator subtree
+                for var in pushed_by.pop(~b):
+                    stacks[var].pop()
+                continue
+            pushed = []
+            for phi in self.phis[b]:
+                phi.value = self._new_value(phi)
+                stacks.setdefault(phi.var, []).append(phi.value)
+                pushed.append(phi.var)
+            block = cfg.blocks[b]
+            for i, instr in cfg.instructions(block):
+                d, used = defs_uses(kinds, instr)
+                _, _, a, b_operand = instr
+                if a in used:
+                    value = self.use_a[i] = current(a)
+                    users[value].append(i)
+                if b_operand in used:
+                    value = self.use_b[i] = current(b_operand)
+                    users[value].append(i)
+                if d != NONE:
+                    value = self.def_value[i] = self._new_value(i)
+                    stacks.setdefault(d, []).append(value)
+                    pushed.append(d)
+            for succ in block.succs:
+                for phi in self.phis[succ.index]:
+                    value = phi.args[b] = current(phi.var)
+                    users[value].append(phi)
+            pushed_by[b] = pushed
+            walk.append(~b)
+            walk.extend(children[b])
+
+class _Bound:
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+TOP = _Bound('TOP')               # no executable definition seen yet
+BOTTOM = _Bound('BOTTOM')         # not a constant
+
+def is_constant(cell):
+    return cell is not TOP and cell is not BOTTOM
+
+def meet(x, y):
+    if x is TOP:
+        return y
+    if y is TOP or x is y:
+        return x
+    if x is BOTTOM or y is BOTTOM:
+        return BOTTOM
+    # 1, 1.0 and True compare equal but are different constants
+    return x if type(x) is type(y) and x == y else BOTTOM
+
+class ConstantPropagation:
+    """Sparse conditional constant propagation over an SSAForm.
+
+    Only blocks reached along edges found executable are evaluated, and a
+    branch on a constant marks just the edge it takes, so definitions on
+    paths that never run do not spoil the phis they reach. After solving,
+    lattice[v] is TOP, BOTTOM or the constant value v, and executable[b]
+    tells whether block b can run.
+    """
+
+    def __init__(self, ssa):
+        self.ssa = ssa
+        cfg = ssa.cfg
+        self.cfg = cfg
+        self.lattice = [BOTTOM if origin is None else TOP for origin in ssa.origins]
+        self.executable = [False] * len(cfg.blocks)
+        self.edges = set()        # executable (pred index, succ index) edges
+        self._flow = []
+        self._changed = []
+        self._solve()
+
+    def _solve(self):
+        if not self.cfg.blocks:
+            return
+        ssa, lattice = self.ssa, self.lattice
+        flow, changed = self._flow, self._changed
+        flow.append((NONE, 0))
+        while flow or changed:
+            while flow:
+                edge = flow.pop()
+                if edge not in self.edges:
+                    self.edges.add(edge)
+                    self._reach(edge[1])
+            while changed:
+                for user in ssa.users[changed.pop()]:
+                    if isinstance(user, Phi):
+                        if self.executable[user.block]:
+                            self._visit_phi(user)
+                    elif self.executable[ssa.block_of[user]]:
+                        self._visit(user)
+        self._flow = self._changed = None
+
+    def _reach(self, b):
+        for phi in self.ssa.phis[b]:
+            self._visit_phi(phi)
+        if self.executable[b]:
+            return
+        self.executable[b] = True
+        block = self.cfg.blocks[b]
+        last = None
+        for i, instr in self.cfg.instructions(block):
+            self._visit(i)
+            last = instr
+        if last is None or last[0] not in BRANCHES:
+            for succ in block.succs:
+                self._flow.append((b, succ.index))
+
+    def _lower(self, value, cell):
+        old = self.lattice[value]
+        new = meet(old, cell)
+        if new is not old:
+            self.lattice[value] = new
+            self._changed.append(value)
+
+    def operand(self, operand, value):
+        """Lattice cell of an operand read through SSA value (or NONE)."""
+        if value != NONE:
+            return self.lattice[value]
+        if self.cfg.operands.kinds[operand] == Kind.CONST:
+            return self.cfg.operands.values[operand]
+        return BOTTOM
+
+    def _visit_phi(self, phi):
+        cell = TOP
+        for pred, value in phi.args.items():
+            if (pred, phi.block) in self.edges:
+                cell = meet(cell, self.lattice[value])
+                if cell is BOTTOM:
+                    break
+        self._lower(phi.value, cell)
+
+    def _visit(self, i):
+        ssa = self.ssa
+        op, _, a, b = self.cfg.code[i]
+        if op in BRANCHES:
+            cond = self.operand(a, ssa.use_a[i])
+            if cond is TOP:
+                return
+            block = self.cfg.blocks[ssa.block_of[i]]
+            if cond is BOTTOM:
+                targets = block.succs
+            else:
+                targets = [self.branch_target(block, op, b, cond)]
+            for target in targets:
+                if target is not None:
+                    self._flow.append((block.index, target.index))
+            return
+        value = ssa.def_value[i]
+        if value == NONE:
+            return
+        if op == Op.COPY:
+            cell = self.operand(a, ssa.use_a[i])
+        elif op >= Op.ADD:
+            x = self.operand(a, ssa.use_a[i])
+            y = self.operand(b, ssa.use_b[i])
+            if x is BOTTOM or y is BOTTOM:
+                cell = BOTTOM
+            elif x is TOP or y is TOP:
+                cell = TOP
+            else:
+                cell = FOLDS[op](x, y)
+        else:
+            cell = BOTTOM         # parameters and call results
+        self._lower(value, cell)
+
+    def branch_target(self, block, op, label, cond):
+        """Block a conditional jump ending block goes to when its condition
+        is the constant cond (None when it falls off the function)."""
+        if bool(cond) == (op == Op.IF_TRUE):
+            return self.cfg.label_blocks[label]
+        following = block.index + 1
+        return self.cfg.blocks[following] if following < len(self.cfg.blocks) else None
+
+def propagate_constants(cfg):
+    """Run SCCP on cfg and leave SSA by rewriting cfg.code in place.
+
+    Definitions with a constant value become copies of the constant, uses
+    of constant values read the constant, branches on a constant become a
+    goto or disappear, and everything but labels in unreachable blocks is
+    deleted. Returns (rewritten instructions, folded branches, removed
+    unreachable instructions).
+    """
+    ssa = SSAForm(cfg)
+    sccp = ConstantPropagation(ssa)
+    code, operands, lattice = cfg.code, cfg.operands, sccp.lattice
+    kinds = operands.kinds
+    rewritten = branches = removed = 0
+    for block in cfg.blocks:
+        if not sccp.executable[block.index]:
+            for i, instr in cfg.instructions(block):
+                if instr[0] != Op.LABEL:
+                    code[i] = None
+                    removed += 1
+            continue
+        for i, (op, dst, a, b) in cfg.instructions(block):
+            value = ssa.def_value[i]
+            if value != NONE and op in PURE_DEFS and is_constant(lattice[value]):
+                if op != Op.COPY or kinds[a] != Kind.CONST:
+                    code[i] = (Op.COPY, dst, operands.intern(Kind.CONST, lattice[value]), NONE)
+                    rewritten += 1
+                continue
+            if op in BRANCHES:
+                cond = sccp.operand(a, ssa.use_a[i])
+                if is_constant(cond):
+                    taken = bool(cond) == (op == Op.IF_TRUE)
+                    code[i] = (Op.GOTO, NONE, b, NONE) if taken else None
+                    branches += 1
+                    continue
+            new_a, new_b = a, b
+            if ssa.use_a[i] != NONE and is_constant(lattice[ssa.use_a[i]]):
+                new_a = operands.intern(Kind.CONST, lattice[ssa.use_a[i]])
+            if ssa.use_b[i] != NONE and is_constant(lattice[ssa.use_b[i]]):
+                new_b = operands.intern(Kind.CONST, lattice[ssa.use_b[i]])
+            if new_a != a or new_b != b:
+                code[i] = (op, dst, new_a, new_b)
+                rewritten += 1
+    return rewritten, branches, removed
+
+__all__ = ['SSAForm', 'Phi', 'ConstantPropagation', 'propagate_constants',
+           'dominators', 'dominance_frontiers', 'TOP', 'BOTTOM', 'meet']
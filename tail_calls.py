@@ -0,0 +1,164 @@
+# tail_calls.py
+# Tail-call elimination over a FunctionCFG. A call of the function to itself
+# whose result is returned as is becomes a jump: each argument is saved into
+# a temp where it was pushed, the temps are copied into the parameters and
+# control goes back to a label placed right after the PARAM instructions.
+# In an integer-only function a call whose result is added to or multiplied
+# by one other value before being returned (n * fact(n - 1)) is turned into
+# a jump as well; the other value goes into an accumulator, and the single
+# RETURN folds the accumulator into whatever the base case returns.
+from cfg import Liveness
+from ir import Kind, NONE, Op
+
+ACCUMULATORS = {Op.ADD: 0, Op.MUL: 1}    # op -> identity
+
+def eliminate_tail_calls(cfg, integer=False):
+    """Rewrite self tail calls in cfg into jumps, accumulating through +
+    or * when integer is set. Returns (tail calls, accumulated calls)."""
+    return TailCalls(cfg, integer).run()
+
+class TailCalls:
+    def __init__(self, cfg, integer):
+        self.cfg = cfg
+        self.integer = integer
+        code = cfg.code
+        self.func = code[0][2]
+        self.params = []
+        i = 1
+        while i < len(code) and code[i] is not None and code[i][0] == Op.PARAM:
+            self.params.append(code[i][2])
+            i += 1
+        self.body = i             # first instruction after the PARAMs
+        # The generator gives every function one exit, "L: return t"
+        self.ret = self.ret_label = None
+        returns = [i for i, instr in enumerate(code) if instr is not None and instr[0] == Op.RETURN]
+        if len(returns) == 1 and returns[0] > 0 and code[returns[0] - 1] is not None \
+                and code[returns[0] - 1][0] == Op.LABEL:
+            self.ret = code[returns[0]][2]
+            self.ret_label = code[returns[0] - 1][2]
+            self.exit = returns[0]
+
+    def returns_from(self, i):
+        """Whether execution from i reaches the RETURN without changing anything."""
+        code = self.cfg.code
+        followed = set()
+        while i < len(code):
+            instr = code[i]
+            if instr is None or instr[0] == Op.LABEL:
+                i += 1
+            elif instr[0] == Op.GOTO and instr[2] not in followed:
+                followed.add(instr[2])
+                i = self.cfg.label_blocks[instr[2]].start
+            else:
+                return instr[0] == Op.RETURN
+        return False
+
+    def next_index(self, i):
+        code = self.cfg.code
+        i += 1
+        while i < len(code) and code[i] is None:
+            i += 1
+        return i
+
+    def match(self, call):
+        """For a self call at index call: (accumulating instruction index or
+        None, indexes of the instructions between it and the return), or
+        None when its result is not returned."""
+        code = self.cfg.code
+        dst = code[call][1]
+        i = self.next_index(call)
+        if self.ret == NONE:
+            return (None, []) if self.returns_from(i) else None
+        accumulate = None
+        if i < len(code) and code[i][0] in ACCUMULATORS and self.integer:
+            op, value, a, b = code[i]
+            if (a == dst) != (b == dst) and self.cfg.operands.kinds[value] == Kind.TEMP:
+                accumulate, dst = i, value
+                i = self.next_index(i)
+        if i < len(code) and code[i] == (Op.COPY, self.ret, dst, NONE):
+            j = self.next_index(i)
+            if self.returns_from(j):
+                # Only the jump replacing the call reaches a goto right here
+                return accumulate, [i, j] if code[j][0] == Op.GOTO else [i]
+        return None
+
+    def sites(self):
+        """(call index, argument push indexes, match) for every self tail call."""
+        code = self.cfg.code
+        operands = self.cfg.operands
+        pending = []              # indexes of ARGs not yet taken by a call
+        found = []
+        for i in range(self.body, len(code)):
+            instr = code[i]
+            if instr is None:
+                continue
+            if instr[0] == Op.ARG:
+                pending.append(i)
+            elif instr[0] == Op.CALL:
+                count = operands.values[instr[3]]
+                if count > len(pending):
+                    return []
+                args = pending[len(pending) - count:]
+                del pending[len(pending) - count:]
+                if instr[2] == self.func and count == len(self.params):
+                    matched = self.match(i)
+                    if matched is not None:
+                        found.append((i, args, matched))
+        return found
+
+    def run(self):
+        if self.ret is None:
+            return 0, 0
+        sites = self.sites()
+        if not sites:
+            return 0, 0
+        cfg = self.cfg
+        code, operands = cfg.code, cfg.operands
+        ops = {code[accumulate][0] for _, _, (accumulate, _) in sites if accumulate is not None}
+        if len(ops) > 1:
+            # Mixed + and * sites cannot share one accumulator
+            sites = [site for site in sites if site[2][0] is None]
+            ops = set()
+        # Registers start at 0 in a fresh frame; what the body may read
+        # before writing it has to be 0 again on every jump back
+        liveness = Liveness(cfg)
+        entry_live = liveness.live_in[0]
+        reset = [v for v, bit in liveness.bit.items()
+                 if entry_live >> bit & 1 and v not in self.params]
+        zero = operands.intern(Kind.CONST, 0)
+        entry = operands.new_label()
+        inserts = {self.body: [(Op.LABEL, NONE, entry, NONE)]}   # index -> instructions to put before it
+        acc = None
+        if ops:
+            op = ops.pop()
+            acc = operands.new_temp()
+            inserts[self.body].insert(0, (Op.COPY, acc, operands.intern(Kind.CONST, ACCUMULATORS[op]), NONE))
+            inserts[self.exit] = [(op, self.ret, acc, self.ret)]
+        accumulated = 0
+        for call, args, (accumulate, tail) in sites:
+            temps = []
+            for i in args:
+                temp = operands.new_temp()
+                code[i] = (Op.COPY, temp, code[i][2], NONE)
+                temps.append(temp)
+            jump = inserts.setdefault(call, [])
+            if accumulate is not None:
+                op, _, a, b = code[accumulate]
+                jump.append((op, acc, acc, b if a == code[call][1] else a))
+                code[accumulate] = None
+                accumulated += 1
+            jump.extend((Op.COPY, param, temp, NONE) for param, temp in zip(self.params, temps))
+            jump.extend((Op.COPY, v, zero, NONE) for v in reset)
+            jump.append((Op.GOTO, NONE, entry, NONE))
+            code[call] = None
+            for i in tail:
+                code[i] = None
+        rewritten = []
+        for i, instr in enumerate(code):
+            rewritten.extend(inserts.get(i, ()))
+            rewritten.append(instr)
+        cfg.code = rewritten
+        cfg.rebuild()
+        return len(sites), accumulated
+
+__all__ = ['ACCUMULATORS', 'TailCalls', 'eliminate_tail_calls']
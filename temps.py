@@ -0,0 +1,105 @@
+# temps.py
+# Temporaries of one FunctionCFG. IRGenerator recycles temps within each
+# statement, so one temp can carry several unrelated values; split_temps
+# gives every value of a block-local temp its own name again, which is the
+# form the optimizations expect (one definition per temp). compact_temps
+# goes the other way once the optimizations are done: temps are renumbered
+# densely per function and a block-local temp takes the lowest number free
+# at its definition, so the count is bounded by the live temps at any point
+# rather than by the function's size. Temps live across blocks keep a number
+# of their own.
+import heapq
+
+from cfg import defs_uses, exposed_temps, temp_deaths
+from ir import Kind, NONE
+
+def _rename(instr, used, a, b, d):
+    op, dst, old_a, old_b = instr
+    if d != dst or (old_a in used and a != old_a) or (old_b in used and b != old_b):
+        return (op, d, a if old_a in used else old_a, b if old_b in used else old_b)
+    return instr
+
+def split_temps(cfg):
+    """One name per value for block-local temps written more than once.
+    Returns the number of new temps."""
+    code, operands = cfg.code, cfg.operands
+    kinds = operands.kinds
+    exposed = exposed_temps(kinds, code)
+    writes = {}
+    for instr in code:
+        if instr is not None:
+            d = defs_uses(kinds, instr)[0]
+            if d != NONE and kinds[d] == Kind.TEMP:
+                writes[d] = writes.get(d, 0) + 1
+    shared = {t for t, count in writes.items() if count > 1 and t not in exposed}
+    if not shared:
+        return 0
+    seen = set()
+    current = {}              # shared temp -> its name for the value being read
+    split = 0
+    for i, instr in enumerate(code):
+        if instr is None:
+            continue
+        d, used = defs_uses(kinds, instr)
+        a = current.get(instr[2], instr[2])
+        b = current.get(instr[3], instr[3])
+        if d in shared:
+            if d in seen:
+                current[d] = operands.new_temp()
+                split += 1
+            else:
+                seen.add(d)
+                current[d] = d
+            d = current[d]
+        code[i] = _rename(instr, used, a, b, d)
+    return split
+
+def compact_temps(cfg):
+    """Renumber cfg's temps densely, reusing a block-local temp's number
+    once its value is dead. Returns (temps before, temps after)."""
+    code, operands = cfg.code, cfg.operands
+    kinds = operands.kinds
+    exposed = exposed_temps(kinds, code)
+    deaths, dead_defs = temp_deaths(kinds, code, exposed)
+    numbers = {}              # exposed temp -> its fixed number
+    for instr in code:
+        if instr is None:
+            continue
+        for operand in instr[1:]:
+            if operand in exposed and operand not in numbers:
+                numbers[operand] = len(numbers) + 1
+    before = set(numbers)
+    free = []                 # numbers of dead block-local values, lowest first
+    top = len(numbers)
+    current = {}              # block-local temp -> number holding its value
+
+    def renumbered(operand):
+        number = current.get(operand) or numbers.get(operand)
+        return operand if number is None else operands.intern(Kind.TEMP, number)
+
+    for i, instr in enumerate(code):
+        if instr is None:
+            continue
+        d, used = defs_uses(kinds, instr)
+        a, b = renumbered(instr[2]), renumbered(instr[3])
+        for v in set(deaths[i]):
+            heapq.heappush(free, current.pop(v))
+        if d != NONE and kinds[d] == Kind.TEMP:
+            before.add(d)
+            if d not in numbers:
+                if free:
+                    number = heapq.heappop(free)
+                else:
+                    top += 1
+                    number = top
+                if i in dead_defs:
+                    heapq.heappush(free, number)
+                else:
+                    current[d] = number
+                d = operands.intern(Kind.TEMP, number)
+            else:
+                d = renumbered(d)
+        code[i] = _rename(instr, used, a, b, d)
+    return len(before), top
+
+__all__ = ['compact_temps', 'split_temps']
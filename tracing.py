@@ -0,0 +1,160 @@
+# tracing.py
+# Span-based instrumentation of the compiler phases. Spans are only recorded
+# inside tracer.record(); everywhere else tracer.span() hands back a shared
+# no-op object, so instrumented code pays one attribute check per span.
+# Recordings are per thread (Streamlit runs each session in its own thread)
+# and export as Chrome trace JSON (chrome://tracing, Perfetto).
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    __slots__ = ('recording', 'name', 'category', 'args', 'start')
+
+    def __init__(self, recording, name, category, args):
+        self.recording = recording
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.recording.add(self.name, self.category, self.start,
+                           time.perf_counter_ns() - self.start, self.args)
+        return False
+
+    def set(self, **args):
+        """Attach counts known only at the end (tokens, nodes, instructions)."""
+        self.args.update(args)
+
+class Recording:
+    """Completed spans of one traced run, in the order they ended."""
+
+    def __init__(self):
+        self.origin = time.perf_counter_ns()
+        self.tid = threading.get_ident()
+        self.events = []          # (name, category, start ns, duration ns, args)
+
+    def add(self, name, category, start, duration, args):
+        self.events.append((name, category, start, duration, args))
+
+    def to_chrome_trace(self):
+        pid = os.getpid()
+        return {
+            'traceEvents': [
+                {'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': self.tid,
+                 'ts': (start - self.origin) / 1000, 'dur': duration / 1000,
+                 'args': {key: value for key, value in args.items()}}
+                for name, category, start, duration, args in self.events
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+    def dumps(self):
+        return json.dumps(self.to_chrome_trace(), default=str)
+
+    def summary(self):
+        """Per span name: calls, total and self time in ms, and summed counts.
+
+        Self time excludes time spent in spans nested inside, so the rows
+        of one category add up to the wall time they cover.
+        """
+        rows = {}
+        child_time = [0] * len(self.events)
+        # Parents end after their children: walk by start time with a stack
+        order = sorted(range(len(self.events)), key=lambda i: (self.events[i][2], -self.events[i][3]))
+        stack = []
+        for i in order:
+            _, _, start, duration, _ = self.events[i]
+            while stack and self.events[stack[-1]][2] + self.events[stack[-1]][3] <= start:
+                stack.pop()
+            if stack:
+                child_time[stack[-1]] += duration
+            stack.append(i)
+        for i, (name, category, _, duration, args) in enumerate(self.events):
+            row = rows.get(name)
+            if row is None:
+                row = rows[name] = {'span': name, 'category': category, 'calls': 0,
+                                    'total_ms': 0.0, 'self_ms': 0.0}
+            row['calls'] += 1
+            row['total_ms'] += duration / 1e6
+            row['self_ms'] += (duration - child_time[i]) / 1e6
+            for key, value in args.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    row[key] = row.get(key, 0) + value
+        return sorted(rows.values(), key=lambda row: -row['total_ms'])
+
+class Tracer:
+    def __init__(self):
+        self.active = 0           # number of open recordings, any thread
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def recording(self):
+        return getattr(self._local, 'recording', None) if self.active else None
+
+    def span(self, name, category='compiler', **args):
+        if not self.active:
+            return NULL_SPAN
+        recording = getattr(self._local, 'recording', None)
+        if recording is None:
+            return NULL_SPAN
+        return Span(recording, name, category, args)
+
+    @contextmanager
+    def record(self):
+        """Collect spans from this thread into a fresh Recording."""
+        previous = getattr(self._local, 'recording', None)
+        recording = Recording()
+        self._local.recording = recording
+        with self._lock:
+            self.active += 1
+        try:
+            yield recording
+        finally:
+            with self._lock:
+                self.active -= 1
+            self._local.recording = previous
+
+    def traced(self, name=None, category='compiler'):
+        """Decorator recording a span around every call of a function."""
+        def decorate(fn):
+            span_name = name or fn.__qualname__
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.active:
+                    return fn(*args, **kwargs)
+                with self.span(span_name, category):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+tracer = Tracer()
+span = tracer.span
+record = tracer.record
+traced = tracer.traced
+
+__all__ = ['Tracer', 'Recording', 'Span', 'tracer', 'span', 'record', 'traced', 'NULL_SPAN']
@@ -0,0 +1,113 @@
+# traversal.py
+# Explicit-stack tree walkers shared by the optimizer, IR generator and the
+# display code. None of them recurse, so tree depth is bounded only by memory.
+import hashlib
+from types import GeneratorType
+from parser import ASTNode
+
+def walk(root):
+    """Yield (node, depth) in pre-order, skipping None children."""
+    if root is None:
+        return
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        yield node, depth
+        children = node.children
+        for i in range(len(children) - 1, -1, -1):
+            if children[i] is not None:
+                stack.append((children[i], depth + 1))
+
+def transform(root, pre=None, post=None):
+    """Rewrite a tree bottom-up and/or top-down.
+
+    pre(node) runs before a node's children are visited and post(node)
+    after; either may return a replacement node (or None). The children of
+    a pre() replacement are the ones visited. Child lists are rebuilt from
+    the returned nodes and assigned back to node.children.
+    """
+    if root is None:
+        return None
+    if pre is not None:
+        root = pre(root)
+        if root is None:
+            return None
+
+    # Frame: [node, original children, next index, rewritten children]
+    stack = [[root, root.children, 0, []]]
+    while True:
+        frame = stack[-1]
+        node, children, i, out = frame
+        if i < len(children):
+            frame[2] = i + 1
+            child = children[i]
+            if child is not None and pre is not None:
+                child = pre(child)
+            if child is None:
+                out.append(None)
+            elif child.children:
+                stack.append([child, child.children, 0, []])
+            else:
+                out.append(post(child) if post is not None else child)
+            continue
+
+        stack.pop()
+        node.children = out
+        if post is not None:
+            node = post(node)
+        if not stack:
+            return node
+        stack[-1][3].append(node)
+
+def trampoline(root, dispatch):
+    """Run a generator-based recursive visitor without Python recursion.
+
+    dispatch(node) returns either a finished result or a generator. A
+    generator yields child nodes and is sent each child's result; the value
+    it returns is the node's result.
+    """
+    value = dispatch(root)
+    if not isinstance(value, GeneratorType):
+        return value
+
+    stack = [value]
+    value = None
+    while stack:
+        try:
+            child = stack[-1].send(value)
+        except StopIteration as stop:
+            stack.pop()
+            value = stop.value
+            continue
+        value = dispatch(child)
+        if isinstance(value, GeneratorType):
+            stack.append(value)
+            value = None
+    return value
+
+def clone(root):
+    """Deep copy of a tree as plain ASTNode objects."""
+    if root is None:
+        return None
+    new_root = ASTNode(root.type, value=root.value, lineno=root.lineno)
+    stack = [(root, new_root)]
+    while stack:
+        node, copy = stack.pop()
+        for child in node.children:
+            if child is None:
+                copy.children.append(None)
+                continue
+            child_copy = ASTNode(child.type, value=child.value, lineno=child.lineno)
+            copy.children.append(child_copy)
+            if child.children:
+                stack.append((child, child_copy))
+    return new_root
+
+def subtree_hash(node):
+    """Structural hash of a subtree: node types, values and shape."""
+    digest = hashlib.sha256()
+    for current, depth in walk(node):
+        digest.update(f"{depth}:{current.type}:{current.value!r}:{len(current.children)};".encode('utf-8'))
+    return digest.hexdigest()
+
+__all__ = ['walk', 'transform', 'trampoline', 'clone', 'subtree_hash']
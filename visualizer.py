@@ -1,50 +1,192 @@
-from graphviz import Digraph
+from collections import OrderedDict, deque
+from itertools import islice
+from graphviz import Digraph, ExecutableNotFound
+import subprocess
 import streamlit as st
+from lexer import TokenStore
+from tracing import traced
+from traversal import subtree_hash, walk
 
-def visualize_ast(ast_node, filename='ast', format='png', gui=False, stream=False):
-    if ast_node is None:
-        if stream:
-            st.error("❌ AST is empty or invalid.")
-        return None
+# Rows materialized per page; everything outside the window stays unrendered
+TOKEN_PAGE_SIZE = 200
+IR_PAGE_SIZE = 300
+AST_PAGE_SIZE = 300
+
+# Level of detail for AST graphs: deeper nodes, and nodes past the budget,
+# are drawn as one summary node per collapsed subtree
+AST_MAX_DEPTH = 8
+AST_MAX_NODES = 150
+OVERVIEW = "(whole program)"
 
+def subtree_sizes(root):
+    """Node count of every subtree, keyed by id(node)."""
+    order = [node for node, _ in walk(root)]
+    sizes = {}
+    for node in reversed(order):
+        sizes[id(node)] = 1 + sum(sizes[id(c)] for c in node.children if c is not None)
+    return sizes
+
+def node_label(node):
+    if node.type == 'Function':
+        return f"Function\n{node.children[1].value}"
+    if node.value is not None:
+        return f"{node.type}\n{node.value}"
+    return node.type
+
+def lod_graph(root, max_depth=AST_MAX_DEPTH, max_nodes=AST_MAX_NODES, format='png'):
+    """Graphviz graph of root with at most about max_nodes boxes.
+
+    Nodes are laid out breadth first, so the budget goes to the levels
+    closest to the root; a node whose children would exceed the depth or
+    node budget becomes a summary ("Block: 312 nodes").
+    """
+    sizes = subtree_sizes(root)
     dot = Digraph(comment='Abstract Syntax Tree', format=format)
     dot.attr('node', shape='box', style='filled', fillcolor='lightblue')
     dot.attr('edge', color='gray40')
 
-    counter = [0]
-    
-    def add_nodes_edges(node, parent_id=None):
-        if node is None:
-            return
-            
-        node_id = str(counter[0])
-        counter[0] += 1
-        
-        if hasattr(node, 'value') and node.value is not None:
-            label = f"{node.type}\n{str(node.value)}"
+    queue = deque([(root, 0, None)])
+    emitted = 0
+    while queue:
+        node, depth, parent_id = queue.popleft()
+        node_id = str(emitted)
+        emitted += 1
+        children = [c for c in node.children if c is not None]
+        if children and (depth + 1 > max_depth or emitted + len(queue) + len(children) > max_nodes):
+            dot.node(node_id, f"{node_label(node)}\n{sizes[id(node)]} nodes",
+                     style='filled,dashed', fillcolor='lightgray')
         else:
-            label = node.type
-            
-        dot.node(node_id, label)
-        
+            dot.node(node_id, node_label(node))
+            queue.extend((child, depth + 1, node_id) for child in children)
         if parent_id is not None:
             dot.edge(parent_id, node_id)
-        
-        if hasattr(node, 'children'):
-            for child in node.children:
-                if child is not None:
-                    add_nodes_edges(child, node_id)
-    
-    add_nodes_edges(ast_node)
-    
-    if stream:
-        st.subheader("🎯 Abstract Syntax Tree Visualization")
-        st.graphviz_chart(dot.source)
+    return dot
+
+def overview_graph(root, max_nodes=AST_MAX_NODES):
+    """Program node plus one summary box per function."""
+    return lod_graph(root, max_depth=1, max_nodes=max_nodes)
+
+class RenderedGraph:
+    __slots__ = ('source', 'svg')
+
+    def __init__(self, source):
+        self.source = source
+        self.svg = None
+
+class RenderCache:
+    """LRU of rendered AST graphs keyed by subtree hash and detail level, so
+    functions that did not change between compiles are not laid out again."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Cleared once the Graphviz binary turns out to be missing
+        self.can_render_svg = True
+
+    def render(self, node, max_depth=AST_MAX_DEPTH, max_nodes=AST_MAX_NODES):
+        key = (subtree_hash(node), max_depth, max_nodes)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        dot = lod_graph(node, max_depth, max_nodes)
+        entry = RenderedGraph(dot.source)
+        if self.can_render_svg:
+            # Server-side layout, cached; without the dot binary the browser
+            # lays out the DOT source instead
+            try:
+                entry.svg = dot.pipe(format='svg').decode('utf-8')
+            except (ExecutableNotFound, subprocess.CalledProcessError):
+                self.can_render_svg = False
+        self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+render_cache = RenderCache()
+
+def show_graph(entry):
+    if entry.svg is not None:
+        st.image(entry.svg)
     else:
+        st.graphviz_chart(entry.source)
+
+def page_window(key, total, page_size):
+    """Page picker for a list of total rows; returns the visible (start, stop)."""
+    pages = max(1, -(-total // page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages,
+                               value=1, step=1, key=key)
+    start = (page - 1) * page_size
+    stop = min(start + page_size, total)
+    st.caption(f"Rows {start + 1 if total else 0}–{stop} of {total}")
+    return start, stop
+
+def matching_lines(lines, query):
+    """Indices of lines containing query, case-insensitive."""
+    if not query:
+        return range(len(lines))
+    needle = query.lower()
+    return [i for i, line in enumerate(lines) if needle in line.lower()]
+
+@traced('render.ast', 'render')
+def visualize_ast(ast_node, filename='ast', format='png', gui=False, stream=False,
+                  max_depth=AST_MAX_DEPTH, max_nodes=AST_MAX_NODES, key='ast'):
+    if ast_node is None:
+        if stream:
+            st.error("❌ AST is empty or invalid.")
+        return None
+
+    if not stream:
+        dot = lod_graph(ast_node, max_depth, max_nodes, format)
         dot.render(filename, cleanup=True)
-    
-    return dot
+        return dot
 
+    st.subheader("🎯 Abstract Syntax Tree Visualization")
+    functions = {child.children[1].value: child for child in ast_node.children
+                 if child is not None and child.type == 'Function'}
+    col_function, col_depth, col_nodes = st.columns([2, 1, 1])
+    choice = col_function.selectbox("Expand function", [OVERVIEW] + list(functions),
+                                    key=f"{key}_function")
+    max_depth = col_depth.number_input("Max depth", min_value=1, value=max_depth,
+                                       key=f"{key}_depth")
+    max_nodes = col_nodes.number_input("Node budget", min_value=10, value=max_nodes, step=50,
+                                       key=f"{key}_nodes")
+
+    if choice == OVERVIEW:
+        entry = RenderedGraph(overview_graph(ast_node, int(max_nodes)).source)
+    else:
+        entry = render_cache.render(functions[choice], int(max_depth), int(max_nodes))
+    show_graph(entry)
+    st.caption(f"Render cache: {render_cache.hits} hits · {render_cache.misses} misses")
+    return entry
+
+def ast_outline(root, start, stop):
+    """Indented outline lines for the pre-order nodes start..stop-1 of root."""
+    lines = []
+    for node, depth in islice(walk(root), start, stop):
+        line = f"{'  ' * depth}- {node.type}"
+        if node.value is not None:
+            line += f": {node.value}"
+        lines.append(line)
+    return lines
+
+@traced('render.ast_outline', 'render')
+def visualize_ast_outline(ast_node, key='ast'):
+    # Text form of the tree, one page of nodes at a time like the IR view
+    if ast_node is None:
+        return
+    with st.expander("AST outline"):
+        total = sum(1 for _ in walk(ast_node))
+        start, stop = page_window(f"{key}_outline_page", total, AST_PAGE_SIZE)
+        st.text("\n".join(ast_outline(ast_node, start, stop)))
+
+@traced('render.tokens', 'render')
 def visualize_tokens(tokens, stream=False):
     if not tokens:
         if stream:
@@ -53,15 +195,18 @@ def visualize_tokens(tokens, stream=False):
         
     if stream:
         st.subheader("🧾 Tokens")
-        token_data = []
-        for tok in tokens:
-            token_data.append({
-                "Type": tok.type,
-                "Value": tok.value,
-                "Line": tok.lineno
-            })
-        st.table(token_data)
+        store = tokens if isinstance(tokens, TokenStore) else TokenStore.from_tokens(tokens)
+        histogram = store.histogram()
+        st.bar_chart({'tokens': histogram})
+
+        col_types, col_search = st.columns([2, 1])
+        types = col_types.multiselect("Token types", list(histogram), key='tokens_types')
+        text = col_search.text_input("Value contains", key='tokens_search')
+        selection = store.select(types or None, text)
+        start, stop = page_window('tokens_page', len(selection), TOKEN_PAGE_SIZE)
+        st.dataframe(store.rows(selection[start:stop]), hide_index=True)
 
+@traced('render.symbol_table', 'render')
 def visualize_symbol_table(symbol_table, stream=False):
     if symbol_table is None:
         if stream:
@@ -70,26 +215,23 @@ def visualize_symbol_table(symbol_table, stream=False):
         
     if stream:
         st.subheader("🧠 Symbol Table")
-        
-        def display_table(table, depth=0):
-            indent = "&nbsp;" * (depth * 4)
-            html = f"{indent}<b>Scope Level {table.scope_level}:</b><br>"
-            
-            for name, symbol in table.symbols.items():
-                symbol_info = f"{indent}&nbsp;&nbsp;- {name}: {symbol.type}"
-                if hasattr(symbol, 'is_function') and symbol.is_function:
-                    params = ", ".join([f"{p[0]} {p[1]}" for p in symbol.parameters])
-                    symbol_info += f" function({params})"
-                html += symbol_info + "<br>"
-            
-            if table.parent:
-                html += f"{indent}↳ Parent Scope:<br>"
-                html += display_table(table.parent, depth + 1)
-                
-            return html
-        
-        st.markdown(display_table(symbol_table), unsafe_allow_html=True)
+        # One row per symbol, every nested scope included, shown a page at a time
+        rows = []
+        for scope in symbol_table.walk():
+            for symbol in scope.symbols.values():
+                kind = symbol.kind
+                if symbol.is_function:
+                    kind += f"({', '.join(f'{t} {n}' for t, n in symbol.parameters)})"
+                rows.append((symbol.id, symbol.name, symbol.type, kind, scope.scope_level,
+                             scope.owner or "", symbol.lineno))
+        query = st.text_input("Name contains", key='symbols_search')
+        if query:
+            rows = [row for row in rows if query.lower() in row[1].lower()]
+        start, stop = page_window('symbols_page', len(rows), TOKEN_PAGE_SIZE)
+        columns = ("Id", "Name", "Type", "Kind", "Scope", "Function", "Line")
+        st.dataframe([dict(zip(columns, row)) for row in rows[start:stop]], hide_index=True)
 
+@traced('render.ir', 'render')
 def visualize_ir(ir_code, stream=False):
     if not ir_code:
         if stream:
@@ -98,8 +240,14 @@ def visualize_ir(ir_code, stream=False):
         
     if stream:
         st.subheader("⚙️ Intermediate Representation")
-        st.code("\n".join(ir_code), language='text')
+        query = st.text_input("Filter IR lines", key='ir_search')
+        selection = matching_lines(ir_code, query)
+        start, stop = page_window('ir_page', len(selection), IR_PAGE_SIZE)
+        width = len(str(len(ir_code)))
+        st.code("\n".join(f"{i + 1:>{width}}  {ir_code[i]}" for i in selection[start:stop]),
+                language='text')
 
+@traced('render.final_code', 'render')
 def visualize_final_code(code_lines, stream=False):
     if not code_lines:
         if stream:
@@ -108,4 +256,4 @@ def visualize_final_code(code_lines, stream=False):
         
     if stream:
         st.subheader("🧩 Final Assembly Code")
-        st.code("\n".join(code_lines), language='asm')
\ No newline at end of file
+        st.code("\n".join(code_lines), language='asm')
\ No newline at end of file
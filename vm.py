@@ -0,0 +1,404 @@
+# vm.py
+# Register-based bytecode lowered from IRProgram and the interpreter that runs
+# it. Every instruction is four ints (op, d, a, b) in one flat array; each
+# function gets its own register file in which constants are preloaded, so
+# operands are plain register indices and the dispatch loop never looks at
+# operand kinds.
+import sys
+import time
+from array import array
+from enum import IntEnum
+
+from cfg import exposed_temps, function_ranges, temp_deaths
+from ir import Kind, NONE, Op, c_divide
+
+class VMOp(IntEnum):
+    MOVE = 0        # r[d] = r[a]
+    ADD = 1         # r[d] = r[a] + r[b]
+    SUB = 2
+    MUL = 3
+    DIV = 4
+    EQ = 5
+    NE = 6
+    LT = 7
+    GT = 8
+    LE = 9
+    GE = 10
+    JUMP = 11       # pc = d
+    JUMP_IF = 12    # if r[a]: pc = d
+    JUMP_IFNOT = 13
+    JEQ = 14        # if r[a] == r[b]: pc = d
+    JNE = 15
+    JLT = 16
+    JGT = 17
+    JLE = 18
+    JGE = 19
+    ARG = 20        # push r[a]
+    CALL = 21       # r[d] = functions[a](last b pushed values)
+    RETURN = 22     # return r[a], or nothing when a < 0
+
+BINARY = {
+    Op.ADD: VMOp.ADD, Op.SUB: VMOp.SUB, Op.MUL: VMOp.MUL, Op.DIV: VMOp.DIV,
+    Op.EQ: VMOp.EQ, Op.NE: VMOp.NE, Op.LT: VMOp.LT, Op.GT: VMOp.GT,
+    Op.LE: VMOp.LE, Op.GE: VMOp.GE,
+}
+
+# comparison opcode -> (jump when true, jump when false)
+COMPARE_JUMPS = {
+    Op.EQ: (VMOp.JEQ, VMOp.JNE), Op.NE: (VMOp.JNE, VMOp.JEQ),
+    Op.LT: (VMOp.JLT, VMOp.JGE), Op.GE: (VMOp.JGE, VMOp.JLT),
+    Op.GT: (VMOp.JGT, VMOp.JLE), Op.LE: (VMOp.JLE, VMOp.JGT),
+}
+
+WIDTH = 4
+
+class VMError(RuntimeError):
+    pass
+
+class Function:
+    """Entry point and register file layout of one compiled function.
+
+    entry is -1 for functions the program calls but does not define; the VM
+    resolves those against its builtins at call time.
+    """
+    __slots__ = ('name', 'entry', 'params', 'template')
+
+    def __init__(self, name):
+        self.name = name
+        self.entry = -1
+        self.params = []
+        self.template = []
+
+    def frame(self, argv):
+        if len(argv) != len(self.params):
+            raise VMError(f"{self.name}() takes {len(self.params)} arguments, got {len(argv)}")
+        regs = self.template[:]
+        for reg, value in zip(self.params, argv):
+            regs[reg] = value
+        return regs
+
+class Bytecode:
+    def __init__(self):
+        self.code = array('i')
+        self.functions = []
+        self.function_index = {}
+
+    def __len__(self):
+        return len(self.code) // WIDTH
+
+    def function_id(self, name):
+        index = self.function_index.get(name)
+        if index is None:
+            index = self.function_index[name] = len(self.functions)
+            self.functions.append(Function(name))
+        return index
+
+    def emit(self, op, d=0, a=0, b=0):
+        self.code.extend((op, d, a, b))
+        return len(self.code) - WIDTH
+
+    def disassemble(self):
+        code = self.code
+        entries = {f.entry: f for f in self.functions if f.entry >= 0}
+        lines = []
+        for pc in range(0, len(code), WIDTH):
+            if pc in entries:
+                f = entries[pc]
+                lines.append(f"{f.name}: ({len(f.template)} registers, params {f.params})")
+            op, d, a, b = code[pc:pc + WIDTH]
+            op = VMOp(op)
+            if op == VMOp.CALL:
+                operands = f"r{d}, {self.functions[a].name}, {b}"
+            elif op == VMOp.JUMP:
+                operands = f"@{d // WIDTH}"
+            elif op in (VMOp.JUMP_IF, VMOp.JUMP_IFNOT):
+                operands = f"r{a}, @{d // WIDTH}"
+            elif op >= VMOp.JEQ and op <= VMOp.JGE:
+                operands = f"r{a}, r{b}, @{d // WIDTH}"
+            elif op in (VMOp.ARG, VMOp.RETURN):
+                operands = f"r{a}" if a >= 0 else ""
+            elif op == VMOp.MOVE:
+                operands = f"r{d}, r{a}"
+            else:
+                operands = f"r{d}, r{a}, r{b}"
+            lines.append(f"  {pc // WIDTH:5d}  {op.name:<10} {operands}")
+        return lines
+
+class _FunctionAssembler:
+    def __init__(self, bytecode, program, start, end):
+        self.bytecode = bytecode
+        self.program = program
+        self.operands = program.operands
+        self.start = start
+        self.end = end
+        self.function = bytecode.functions[bytecode.function_id(self.operands.value(program.arg1[start]))]
+        self.registers = {}
+        self._deaths = None
+
+    def dies(self, temp, i):
+        """Whether instruction i reads the last use of temp's value, for a
+        temp that is read more than once in the function (recycled)."""
+        if self._deaths is None:
+            program, start, end = self.program, self.start, self.end
+            code = list(zip(program.ops[start:end], program.dst[start:end],
+                            program.arg1[start:end], program.arg2[start:end]))
+            kinds = self.operands.kinds
+            self._deaths = temp_deaths(kinds, code, exposed_temps(kinds, code))[0]
+        return temp in self._deaths[i - self.start]
+
+    def reg(self, operand):
+        reg = self.registers.get(operand)
+        if reg is None:
+            reg = self.registers[operand] = len(self.function.template)
+            kind = self.operands.kinds[operand]
+            value = self.operands.value(operand) if kind in (Kind.CONST, Kind.STRING) else 0
+            self.function.template.append(value)
+        return reg
+
+    def use_counts(self):
+        counts = {}
+        for i in range(self.start, self.end):
+            op, _, a, b = self.program.instruction(i)
+            if op >= Op.COPY or op in (Op.ARG, Op.RETURN, Op.IF_FALSE, Op.IF_TRUE):
+                counts[a] = counts.get(a, 0) + 1
+            if op >= Op.ADD:
+                counts[b] = counts.get(b, 0) + 1
+        return counts
+
+    def assemble(self):
+        bytecode, program, function = self.bytecode, self.program, self.function
+        kinds = self.operands.kinds
+        uses = self.use_counts()
+        labels = {}
+        fixups = []               # (code position of the target slot, label)
+        function.entry = len(bytecode.code)
+
+        i = self.start + 1
+        while i < self.end:
+            op, d, a, b = program.instruction(i)
+            i += 1
+            if op == Op.PARAM:
+                function.params.append(self.reg(a))
+            elif op == Op.LABEL:
+                labels[a] = len(bytecode.code)
+            elif op == Op.COPY:
+                bytecode.emit(VMOp.MOVE, self.reg(d), self.reg(a))
+            elif op >= Op.ADD:
+                # A comparison read only by the branch right after it becomes
+                # a single compare-and-jump
+                if op in COMPARE_JUMPS and i < self.end and kinds[d] == Kind.TEMP:
+                    next_op, _, cond, target = program.instruction(i)
+                    if next_op in (Op.IF_TRUE, Op.IF_FALSE) and cond == d \
+                            and (uses.get(d) == 1 or self.dies(d, i)):
+                        i += 1
+                        jump = COMPARE_JUMPS[op][next_op == Op.IF_FALSE]
+                        pc = bytecode.emit(jump, 0, self.reg(a), self.reg(b))
+                        fixups.append((pc + 1, target))
+                        continue
+                # Likewise "t = a op b; v = t" writes v directly
+                if i < self.end and kinds[d] == Kind.TEMP:
+                    next_op, target, source, _ = program.instruction(i)
+                    if next_op == Op.COPY and source == d and (uses.get(d) == 1 or self.dies(d, i)):
+                        i += 1
+                        d = target
+                bytecode.emit(BINARY[op], self.reg(d), self.reg(a), self.reg(b))
+            elif op == Op.GOTO:
+                fixups.append((bytecode.emit(VMOp.JUMP) + 1, a))
+            elif op in (Op.IF_TRUE, Op.IF_FALSE):
+                jump = VMOp.JUMP_IF if op == Op.IF_TRUE else VMOp.JUMP_IFNOT
+                fixups.append((bytecode.emit(jump, 0, self.reg(a)) + 1, b))
+            elif op == Op.ARG:
+                bytecode.emit(VMOp.ARG, 0, self.reg(a))
+            elif op == Op.CALL:
+                callee = bytecode.function_id(self.operands.value(a))
+                bytecode.emit(VMOp.CALL, self.reg(d), callee, self.operands.value(b))
+            elif op == Op.RETURN:
+                bytecode.emit(VMOp.RETURN, 0, self.reg(a) if a != NONE else -1)
+
+        code = bytecode.code
+        for slot, label in fixups:
+            code[slot] = labels[label]
+
+def assemble(program):
+    """Lower an IRProgram to Bytecode."""
+    bytecode = Bytecode()
+    ranges = function_ranges(program)
+    # Register every defined function first so calls may refer forward
+    for start, _ in ranges:
+        bytecode.function_id(program.operands.value(program.arg1[start]))
+    for start, end in ranges:
+        _FunctionAssembler(bytecode, program, start, end).assemble()
+    return bytecode
+
+def format_printf(fmt, args):
+    """printf() as the builtin implements it: C escapes in the format string
+    are still raw text, conversions go through Python's % operator."""
+    text = str(fmt).replace('\\n', '\n').replace('\\t', '\t')
+    return text % tuple(args) if args else text
+
+class RunResult:
+    def __init__(self, value, steps, seconds, output):
+        self.value = value
+        self.steps = steps
+        self.seconds = seconds
+        self.output = output
+
+    @property
+    def steps_per_second(self):
+        return self.steps / self.seconds if self.seconds else 0.0
+
+class VM:
+    """Runs Bytecode. Calls use an explicit frame stack, never Python recursion."""
+
+    def __init__(self, bytecode, max_steps=None, max_depth=10000):
+        self.bytecode = bytecode
+        self.max_steps = max_steps
+        self.max_depth = max_depth
+        self.output = []
+        self.builtins = {'printf': self._printf}
+
+    def _printf(self, fmt='', *args):
+        text = format_printf(fmt, args)
+        self.output.append(text)
+        return len(text)
+
+    def call_builtin(self, name, argv):
+        builtin = self.builtins.get(name)
+        if builtin is None:
+            raise VMError(f"Call to undefined function '{name}'")
+        try:
+            result = builtin(*argv)
+        except (TypeError, ValueError) as error:
+            raise VMError(f"{name}(): {error}") from error
+        return 0 if result is None else result
+
+    def run(self, entry='main', args=()):
+        index = self.bytecode.function_index.get(entry)
+        if index is None or self.bytecode.functions[index].entry < 0:
+            raise VMError(f"No function '{entry}' to run")
+        self.output = []
+        start = time.perf_counter()
+        value, steps = self._execute(self.bytecode.functions[index], list(args))
+        return RunResult(value, steps, time.perf_counter() - start, self.output)
+
+    def _execute(self, function, argv):
+        code = self.bytecode.code.tolist()
+        functions = self.bytecode.functions
+        limit = self.max_steps if self.max_steps is not None else sys.maxsize
+        max_depth = self.max_depth
+        divide = c_divide
+
+        # Opcodes as plain int locals: IntEnum comparisons are several times slower
+        (MOVE, ADD, SUB, MUL, DIV, EQ, NE, LT, GT, LE, GE, JUMP, JUMP_IF, JUMP_IFNOT,
+         JEQ, JNE, JLT, JGT, JLE, JGE, ARG, CALL, RETURN) = range(len(VMOp))
+
+        regs = function.frame(argv)
+        pc = function.entry
+        frames = []               # (caller registers, return pc, result register)
+        pending = []              # pushed call arguments
+        steps = 0
+        while True:
+            op = code[pc]
+            d = code[pc + 1]
+            a = code[pc + 2]
+            b = code[pc + 3]
+            pc += 4
+            steps += 1
+            if op == MOVE:
+                regs[d] = regs[a]
+            elif op == ADD:
+                regs[d] = regs[a] + regs[b]
+            elif op == JLT:
+                if regs[a] < regs[b]:
+                    pc = d
+                    if steps > limit:
+                        break
+            elif op == JUMP:
+                pc = d
+                if steps > limit:
+                    break
+            elif op == SUB:
+                regs[d] = regs[a] - regs[b]
+            elif op == MUL:
+                regs[d] = regs[a] * regs[b]
+            elif op == JGE:
+                if regs[a] >= regs[b]:
+                    pc = d
+                    if steps > limit:
+                        break
+            elif op == JUMP_IFNOT:
+                if not regs[a]:
+                    pc = d
+            elif op == JUMP_IF:
+                if regs[a]:
+                    pc = d
+                    if steps > limit:
+                        break
+            elif op == JGT:
+                if regs[a] > regs[b]:
+                    pc = d
+                    if steps > limit:
+                        break
+            elif op == JLE:
+                if regs[a] <= regs[b]:
+                    pc = d
+                    if steps > limit:
+                        break
+            elif op == JNE:
+                if regs[a] != regs[b]:
+                    pc = d
+                    if steps > limit:
+                        break
+            elif op == JEQ:
+                if regs[a] == regs[b]:
+                    pc = d
+                    if steps > limit:
+                        break
+            elif op == DIV:
+                regs[d] = divide(regs[a], regs[b])
+            elif op == LT:
+                regs[d] = int(regs[a] < regs[b])
+            elif op == GT:
+                regs[d] = int(regs[a] > regs[b])
+            elif op == LE:
+                regs[d] = int(regs[a] <= regs[b])
+            elif op == GE:
+                regs[d] = int(regs[a] >= regs[b])
+            elif op == EQ:
+                regs[d] = int(regs[a] == regs[b])
+            elif op == NE:
+                regs[d] = int(regs[a] != regs[b])
+            elif op == ARG:
+                pending.append(regs[a])
+            elif op == CALL:
+                callee = functions[a]
+                if b:
+                    argv = pending[-b:]
+                    del pending[-b:]
+                else:
+                    argv = []
+                if callee.entry < 0:
+                    regs[d] = self.call_builtin(callee.name, argv)
+                    continue
+                if len(frames) >= max_depth:
+                    raise VMError(f"Call stack overflow in {callee.name}()")
+                frames.append((regs, pc, d))
+                regs = callee.frame(argv)
+                pc = callee.entry
+                if steps > limit:
+                    break
+            elif op == RETURN:
+                value = regs[a] if a >= 0 else None
+                if not frames:
+                    return value, steps
+                regs, pc, d = frames.pop()
+                regs[d] = value
+            else:
+                raise VMError(f"Bad opcode {op} at {pc // 4 - 1}")
+        raise VMError(f"Step limit of {limit} instructions exceeded")
+
+def run_program(program, entry='main', args=(), max_steps=None):
+    """Assemble and run an IRProgram; returns a RunResult."""
+    return VM(assemble(program), max_steps=max_steps).run(entry, args)
+
+__all__ = ['VMOp', 'VMError', 'Bytecode', 'Function', 'VM', 'RunResult', 'assemble', 'run_program', 'format_printf']